@@ -1,7 +1,9 @@
-from fastapi import Depends, HTTPException, status
+import secrets
+from fastapi import Depends, Header, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from app.auth.jwt_handler import verify_access_token
-from app.database import users_collection
+from app.config import settings
+from app.database import jobs_collection, users_collection
 from bson import ObjectId
 from typing import Optional
 import logging
@@ -58,3 +60,29 @@ async def get_current_user(token: Optional[str] = Depends(oauth2_scheme)):
         )
     
     return user  
+
+async def get_optional_user(token: Optional[str] = Depends(oauth2_scheme)):
+    """The authenticated user, or None for anonymous requests (a bad token is still refused)."""
+    if not token:
+        return None
+    return await get_current_user(token)
+
+async def get_owned_job(job_id: str, current_user: dict = Depends(get_current_user)) -> dict:
+    """The job of the `job_id` path parameter, only for the user who uploaded it."""
+    if not ObjectId.is_valid(job_id):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid job ID")
+    job = await jobs_collection.find_one({"_id": ObjectId(job_id)})
+    if not job:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found")
+    # Jobs uploaded anonymously have no owner and cannot be managed by anyone
+    if not job.get("user_id") or str(job["user_id"]) != str(current_user["_id"]):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Forbidden: You did not upload this job")
+    return job
+
+async def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """Guard for /admin endpoints: the X-Admin-Token header must match settings.ADMIN_TOKEN."""
+    if not settings.ADMIN_TOKEN:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    if not x_admin_token or not secrets.compare_digest(x_admin_token, settings.ADMIN_TOKEN):
+        logger.warning("Admin endpoint called with a missing or invalid token")
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid admin token")
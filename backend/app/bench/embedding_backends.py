@@ -0,0 +1,124 @@
+"""
+Parity check and benchmark for the embedding backends.
+
+Usage (from backend/):
+    python -m app.bench.embedding_backends
+    python -m app.bench.embedding_backends --backends torch int8 onnx --texts samples.txt --rounds 5
+
+Each backend runs in a fresh process so its RSS is measured in isolation.
+For every backend it prints encodes/sec and RSS, and for non-reference
+backends the cosine drift against the fp32 torch vectors on the sample set.
+"""
+import argparse
+import multiprocessing
+import resource
+import time
+from pathlib import Path
+from typing import List
+
+import numpy as np
+
+from app.services.embedding_backends import BACKENDS, load_backend, parity_report
+
+SAMPLE_TEXTS = [
+    "Senior Python developer with 8 years of experience building REST APIs with FastAPI and Django.",
+    "Data scientist skilled in machine learning, deep learning, PyTorch and scikit-learn.",
+    "Frontend engineer: React, TypeScript, Next.js, Tailwind CSS, accessibility and performance.",
+    "DevOps engineer with Docker, Kubernetes, Terraform, AWS and CI/CD pipelines on GitLab.",
+    "Chef de projet digital, gestion d'équipe agile Scrum, relation client et suivi budgétaire.",
+    "We are hiring a backend engineer to design microservices in Java and Spring Boot.",
+    "Looking for a machine learning engineer to deploy NLP models in production on GCP.",
+    "Full-stack developer position: Node.js, MongoDB, React, GraphQL, remote friendly.",
+    "Recherche développeur mobile Flutter / React Native pour application bancaire.",
+    "Business analyst with SQL, Power BI and stakeholder communication experience.",
+]
+
+
+def _rss_mb() -> float:
+    """Current resident set size of this process, in MB."""
+    try:
+        for line in Path("/proc/self/status").read_text().splitlines():
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _run_backend(backend: str, model_name: str, onnx_file: str | None, texts: List[str], rounds: int, batch_size: int) -> dict:
+    rss_before = _rss_mb()
+    started_at = time.perf_counter()
+    model = load_backend(backend, model_name, onnx_file)
+    load_seconds = time.perf_counter() - started_at
+
+    vectors = model.encode(texts, batch_size=batch_size, normalize_embeddings=True)  # warm-up + parity vectors
+
+    started_at = time.perf_counter()
+    for _ in range(rounds):
+        model.encode(texts, batch_size=batch_size, normalize_embeddings=True)
+    elapsed = time.perf_counter() - started_at
+
+    # Single-text latency is what a pairwise /analysis request pays
+    started_at = time.perf_counter()
+    for text in texts:
+        model.encode(text, normalize_embeddings=True)
+    single_ms = (time.perf_counter() - started_at) / len(texts) * 1000
+
+    return {
+        "backend": backend,
+        "load_seconds": round(load_seconds, 2),
+        "encodes_per_sec": round(rounds * len(texts) / elapsed, 1),
+        "single_encode_ms": round(single_ms, 1),
+        "rss_mb": round(_rss_mb(), 1),
+        "rss_model_mb": round(_rss_mb() - rss_before, 1),
+        "vectors": np.asarray(vectors, dtype=np.float32),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare embedding backends (parity + throughput)")
+    parser.add_argument("--backends", nargs="+", default=list(BACKENDS), choices=BACKENDS)
+    parser.add_argument("--model", default="thenlper/gte-base")
+    parser.add_argument("--onnx-file", default=None, help="ONNX file inside the model repo, e.g. onnx/model_qint8_avx512_vnni.onnx")
+    parser.add_argument("--texts", type=Path, help="File with one sample text per line (default: built-in samples)")
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--batch-size", type=int, default=16)
+    args = parser.parse_args()
+
+    texts = SAMPLE_TEXTS
+    if args.texts:
+        texts = [line.strip() for line in args.texts.read_text(encoding="utf-8").splitlines() if line.strip()]
+
+    backends = ["torch"] + [b for b in args.backends if b != "torch"]
+    ctx = multiprocessing.get_context("spawn")
+    results = {}
+    for backend in backends:
+        with ctx.Pool(1) as pool:
+            try:
+                results[backend] = pool.apply(
+                    _run_backend, (backend, args.model, args.onnx_file, texts, args.rounds, args.batch_size)
+                )
+            except Exception as e:
+                print(f"[{backend}] failed: {e}")
+
+    print(f"\n{len(texts)} texts, {args.rounds} rounds, batch size {args.batch_size}\n")
+    header = f"{'backend':<8} {'load s':>7} {'enc/s':>8} {'1-text ms':>10} {'RSS MB':>8} {'model MB':>9}  parity vs torch"
+    print(header)
+    print("-" * len(header))
+    reference = results.get("torch")
+    for backend, result in results.items():
+        parity = ""
+        if reference is not None and backend != "torch":
+            report = parity_report(reference["vectors"], result["vectors"])
+            parity = (
+                f"cos mean {report['vector_cosine_mean']:.4f} min {report['vector_cosine_min']:.4f}, "
+                f"score drift mean {report['score_drift_mean']:.4f} max {report['score_drift_max']:.4f}"
+            )
+        print(
+            f"{backend:<8} {result['load_seconds']:>7} {result['encodes_per_sec']:>8} "
+            f"{result['single_encode_ms']:>10} {result['rss_mb']:>8} {result['rss_model_mb']:>9}  {parity}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+"""
+Fake Ollama: a stand-in for the Ollama chat API, for load and integration tests.
+
+Usage (from backend/):
+    python -m app.bench.fake_ollama --port 11500
+    python -m app.bench.fake_ollama --port 11500 --latency lognormal:1.5:0.4 --token-rate 40 --error-rate 0.02
+
+then start the API and the worker with OLLAMA_API_URL=http://localhost:11500.
+
+POST /api/chat answers deterministically: NER prompts get a canned JSON
+object with exactly the entity types the prompt asks for, any other prompt
+gets a canned markdown CV. Both `stream: true` (NDJSON chunks, one token at
+a time) and `stream: false` are supported. Each request waits a delay drawn
+from the latency distribution before the first token, then emits tokens at
+`token_rate` per second (0 = all at once). A fraction `error_rate` of the
+requests fails with HTTP 500 like an overloaded Ollama.
+
+Latency specs (seconds): fixed:S, uniform:LOW:HIGH, normal:MEAN:SD,
+lognormal:MEDIAN:SIGMA, exponential:MEAN.
+
+In tests, `FakeOllama().transport()` serves the app in-process through
+httpx (see the `fake_ollama` fixture in test/conftest.py), and
+`FakeOllama().serve()` runs it on a real port in a background thread.
+"""
+import argparse
+import asyncio
+import json
+import math
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime, UTC
+from typing import AsyncIterator, Callable, Dict, Iterator, List, Optional
+
+import httpx
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+NER_PROMPT_MARKER = "Named Entity Recognition"
+
+CANNED_ENTITIES: Dict[str, List[str]] = {
+    "PERSON": ["Jane Doe"],
+    "ORGANIZATION": ["ACME Corp", "Globex"],
+    "LOCATION": ["Paris"],
+    "SKILLS": ["Team leadership", "API design"],
+    "TECHNOLOGIES": ["Python", "FastAPI", "MongoDB", "Docker"],
+    "EDUCATION": ["MSc Computer Science"],
+    "EXPERIENCE": ["Backend Developer"],
+    "DATE": ["2020 - 2024"],
+    "CONTACT": ["jane.doe@example.com"],
+}
+
+CANNED_CV = """## Jane Doe
+Paris | jane.doe@example.com
+
+## Professional Summary
+Backend developer with five years of experience building Python APIs and data services.
+
+## Professional Experience
+### Backend Developer - ACME Corp (2020 - 2024)
+- Designed FastAPI services backed by MongoDB serving 2M requests per day
+- Cut p95 latency by 40% with caching and connection pooling
+- Mentored three junior engineers
+
+## Education
+### MSc Computer Science
+
+## Skills
+- Python, FastAPI, MongoDB, Docker
+- API design, team leadership
+"""
+
+_TOKEN = re.compile(r"\s*\S+|\s+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into word-sized tokens that join back to the original."""
+    return _TOKEN.findall(text)
+
+
+def parse_latency(spec: str) -> Callable[[random.Random], float]:
+    """Sampler for a latency spec such as `fixed:0.5` or `lognormal:1.5:0.4` (seconds)."""
+    kind, _, params = spec.partition(":")
+    try:
+        values = [float(p) for p in params.split(":")] if params else []
+    except ValueError:
+        raise ValueError(f"Invalid latency spec '{spec}'")
+
+    samplers = {
+        "fixed": (1, lambda rng, s: s),
+        "uniform": (2, lambda rng, low, high: rng.uniform(low, high)),
+        "normal": (2, lambda rng, mean, sd: rng.gauss(mean, sd)),
+        "lognormal": (2, lambda rng, median, sigma: rng.lognormvariate(math.log(median), sigma)),
+        "exponential": (1, lambda rng, mean: rng.expovariate(1 / mean)),
+    }
+    if kind not in samplers or len(values) != samplers[kind][0]:
+        raise ValueError(f"Invalid latency spec '{spec}' (expected one of: fixed:S, uniform:LOW:HIGH, normal:MEAN:SD, lognormal:MEDIAN:SIGMA, exponential:MEAN)")
+    sample = samplers[kind][1]
+    return lambda rng: max(0.0, sample(rng, *values))
+
+
+@dataclass
+class FakeOllamaConfig:
+    latency: str = "fixed:0"
+    token_rate: float = 0.0
+    error_rate: float = 0.0
+    model: str = "fake-model"
+    seed: int = 0
+
+
+class FakeOllama:
+    """The fake server: its FastAPI app, request counters and ways to run it."""
+
+    def __init__(self, config: Optional[FakeOllamaConfig] = None):
+        self.config = config or FakeOllamaConfig()
+        self.requests = 0
+        self.errors = 0
+        self._rng = random.Random(self.config.seed)
+        self.app = self._build_app()
+
+    def reply_for(self, messages: List[dict]) -> str:
+        """The canned reply for a chat request."""
+        system = next((m.get("content", "") for m in messages if m.get("role") == "system"), "")
+        if NER_PROMPT_MARKER in system:
+            requested = re.findall(r"^\d+\. ([A-Z_]+)\s*$", system, flags=re.MULTILINE)
+            return json.dumps({etype: CANNED_ENTITIES.get(etype, []) for etype in requested or CANNED_ENTITIES})
+        return CANNED_CV
+
+    def _chunk(self, content: str, done: bool) -> dict:
+        return {
+            "model": self.config.model,
+            "created_at": datetime.now(UTC).isoformat(),
+            "message": {"role": "assistant", "content": content},
+            "done": done,
+        }
+
+    def _build_app(self) -> FastAPI:
+        app = FastAPI(title="Fake Ollama")
+
+        @app.get("/api/tags")
+        async def tags() -> dict:
+            return {"models": [{"name": self.config.model}]}
+
+        @app.post("/api/chat")
+        async def chat(request: Request):
+            body = await request.json()
+            self.requests += 1
+            # Sampled per request so the config can be changed while serving
+            latency = parse_latency(self.config.latency)(self._rng)
+            fails = self._rng.random() < self.config.error_rate
+            await asyncio.sleep(latency)
+            if fails:
+                self.errors += 1
+                return JSONResponse(status_code=500, content={"error": "fake ollama: injected failure"})
+
+            tokens = tokenize(self.reply_for(body.get("messages", [])))
+            delay = 1 / self.config.token_rate if self.config.token_rate > 0 else 0.0
+
+            if body.get("stream", True):
+                async def chunks() -> AsyncIterator[str]:
+                    for token in tokens:
+                        if delay:
+                            await asyncio.sleep(delay)
+                        yield json.dumps(self._chunk(token, False)) + "\n"
+                    yield json.dumps(self._chunk("", True)) + "\n"
+
+                return StreamingResponse(chunks(), media_type="application/x-ndjson")
+
+            await asyncio.sleep(delay * len(tokens))
+            return self._chunk("".join(tokens), True)
+
+        return app
+
+    def transport(self) -> httpx.ASGITransport:
+        """httpx transport serving the fake in-process (no socket)."""
+        return httpx.ASGITransport(app=self.app)
+
+    @contextmanager
+    def serve(self, host: str = "127.0.0.1", port: int = 0) -> Iterator[str]:
+        """Run the fake on a real port in a background thread; yields its base URL."""
+        server = uvicorn.Server(uvicorn.Config(self.app, host=host, port=port, log_level="warning"))
+        thread = threading.Thread(target=server.run, daemon=True)
+        thread.start()
+        deadline = time.monotonic() + 10
+        while not server.started:
+            if not thread.is_alive() or time.monotonic() > deadline:
+                raise RuntimeError("Fake Ollama server failed to start")
+            time.sleep(0.01)
+        bound_port = server.servers[0].sockets[0].getsockname()[1]
+        try:
+            yield f"http://{host}:{bound_port}"
+        finally:
+            server.should_exit = True
+            thread.join(timeout=10)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run a fake Ollama /api/chat server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11500)
+    parser.add_argument("--latency", default="fixed:0", help="Delay before the first token, e.g. lognormal:1.5:0.4")
+    parser.add_argument("--token-rate", type=float, default=0.0, help="Tokens per second (0 = no delay)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with HTTP 500")
+    parser.add_argument("--model", default="fake-model")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    parse_latency(args.latency)  # fail fast on a bad spec
+    fake = FakeOllama(FakeOllamaConfig(args.latency, args.token_rate, args.error_rate, args.model, args.seed))
+    uvicorn.run(fake.app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+"""
+Load test for the LLM-dependent endpoints, run against a live API.
+
+Usage (from backend/):
+    python -m app.bench.fake_ollama --port 11500 --latency lognormal:1.5:0.4 --token-rate 40 &
+    OLLAMA_API_URL=http://localhost:11500 uvicorn app.main:app --port 8000 &
+    OLLAMA_API_URL=http://localhost:11500 python -m app.worker --concurrency 4 &
+    python -m app.bench.load_test --scenario job-upload --requests 200 --concurrency 20 --wait-tasks
+    python -m app.bench.load_test --scenario generate-stream --requests 50 --concurrency 10
+
+Scenarios:
+    job-upload       POST /job/upload (text)
+    cv-upload        POST /cv/upload (generated DOCX)
+    generate         POST /generate/ (force=true unless --reuse)
+    generate-stream  POST /generate/stream, also reports time to first token
+
+For the upload scenarios `--wait-tasks` polls /tasks/{task_id} and reports
+the end-to-end time until entity extraction finished. A user is registered
+(or logged in) with --email/--password; the generate scenarios first upload
+one matching CV and job. Prints request counts by status, throughput and
+latency percentiles.
+"""
+import argparse
+import asyncio
+import io
+import time
+import uuid
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+import httpx
+from docx import Document
+
+SAMPLE_JOB = (
+    "Backend Developer (Python). We are looking for a backend developer to build REST APIs "
+    "with FastAPI and MongoDB, deploy services with Docker and Kubernetes, and mentor a small team. "
+    "Experience with CI/CD, caching and performance tuning is a plus. Location: Paris."
+)
+SAMPLE_CV = (
+    "Jane Doe - Backend Developer, Paris. jane.doe@example.com\n\n"
+    "Experience\nBackend Developer - ACME Corp (2020 - 2024)\n"
+    "Built REST APIs with FastAPI and MongoDB, deployed services with Docker and Kubernetes, "
+    "set up CI/CD pipelines, added caching and tuned performance, mentored two developers.\n\n"
+    "Education\nMSc Computer Science, 2019\n\nSkills\nPython, FastAPI, MongoDB, Docker, Kubernetes"
+)
+
+
+@dataclass
+class Results:
+    latencies: List[float] = field(default_factory=list)
+    first_token: List[float] = field(default_factory=list)
+    end_to_end: List[float] = field(default_factory=list)
+    statuses: Counter = field(default_factory=Counter)
+    task_statuses: Counter = field(default_factory=Counter)
+    elapsed: float = 0.0
+
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def _docx_bytes(text: str) -> bytes:
+    document = Document()
+    for paragraph in text.split("\n"):
+        document.add_paragraph(paragraph)
+    buffer = io.BytesIO()
+    document.save(buffer)
+    return buffer.getvalue()
+
+
+async def _login(client: httpx.AsyncClient, email: str, password: str) -> str:
+    response = await client.post("/auth/login", json={"email": email, "password": password})
+    if response.status_code != 200:
+        await client.post("/auth/register", json={"full_name": "Load Test", "email": email, "password": password})
+        response = await client.post("/auth/login", json={"email": email, "password": password})
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+
+async def _upload_job(client: httpx.AsyncClient, ner_mode: str) -> httpx.Response:
+    return await client.post(
+        "/job/upload", params={"ner_mode": ner_mode}, data={"title": "Backend Developer", "text": SAMPLE_JOB}
+    )
+
+
+async def _upload_cv(client: httpx.AsyncClient, ner_mode: str) -> httpx.Response:
+    files = {"file": (f"cv-{uuid.uuid4().hex[:8]}.docx", _docx_bytes(SAMPLE_CV))}
+    return await client.post("/cv/upload", params={"ner_mode": ner_mode}, files=files)
+
+
+async def _wait_for_task(client: httpx.AsyncClient, task_id: str, timeout: float) -> str:
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        response = await client.get(f"/tasks/{task_id}")
+        if response.status_code == 200 and response.json()["status"] in ("succeeded", "failed"):
+            return response.json()["status"]
+        await asyncio.sleep(0.2)
+    return "timeout"
+
+
+async def _one_request(client: httpx.AsyncClient, args: argparse.Namespace, ids: Dict[str, str], results: Results) -> None:
+    started_at = time.perf_counter()
+    if args.scenario in ("job-upload", "cv-upload"):
+        upload = _upload_job if args.scenario == "job-upload" else _upload_cv
+        response = await upload(client, args.ner_mode)
+        results.latencies.append(time.perf_counter() - started_at)
+        results.statuses[response.status_code] += 1
+        task_id = response.json().get("task_id") if response.status_code == 200 else None
+        if args.wait_tasks and task_id:
+            status = await _wait_for_task(client, task_id, args.task_timeout)
+            results.task_statuses[status] += 1
+            results.end_to_end.append(time.perf_counter() - started_at)
+        return
+
+    form = {"cv_id": ids["cv_id"], "job_id": ids["job_id"], "force": str(not args.reuse).lower()}
+    if args.scenario == "generate":
+        response = await client.post("/generate/", data=form)
+        results.statuses[response.status_code] += 1
+    else:
+        async with client.stream("POST", "/generate/stream", data={**form, "format": "ndjson"}) as response:
+            status, first_token = response.status_code, None
+            async for line in response.aiter_lines():
+                if first_token is None and '"event": "token"' in line:
+                    first_token = time.perf_counter() - started_at
+                    results.first_token.append(first_token)
+                if '"event": "error"' in line:
+                    status = "stream-error"
+            results.statuses[status] += 1
+    results.latencies.append(time.perf_counter() - started_at)
+
+
+async def _setup_generation(client: httpx.AsyncClient) -> Dict[str, str]:
+    job = await _upload_job(client, "fast")
+    cv = await _upload_cv(client, "fast")
+    job.raise_for_status()
+    cv.raise_for_status()
+    return {"job_id": job.json()["job_id"], "cv_id": cv.json()["cv_id"]}
+
+
+async def run(args: argparse.Namespace) -> Results:
+    limits = httpx.Limits(max_connections=args.concurrency)
+    timeout = httpx.Timeout(args.timeout)
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=timeout) as client:
+        token = await _login(client, args.email, args.password)
+        client.headers["Authorization"] = f"Bearer {token}"
+        ids = await _setup_generation(client) if args.scenario.startswith("generate") else {}
+
+        results = Results()
+        semaphore = asyncio.Semaphore(args.concurrency)
+
+        async def worker() -> None:
+            async with semaphore:
+                try:
+                    await _one_request(client, args, ids, results)
+                except httpx.HTTPError as e:
+                    results.statuses[type(e).__name__] += 1
+
+        started_at = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(args.requests)))
+        results.elapsed = time.perf_counter() - started_at
+        return results
+
+
+def _print_latencies(label: str, values: List[float]) -> None:
+    if not values:
+        return
+    print(
+        f"{label:<16} p50 {percentile(values, 0.5):7.3f}s  p90 {percentile(values, 0.9):7.3f}s  "
+        f"p95 {percentile(values, 0.95):7.3f}s  p99 {percentile(values, 0.99):7.3f}s  max {max(values):7.3f}s"
+    )
+
+
+def report(args: argparse.Namespace, results: Results) -> None:
+    print(f"\nscenario {args.scenario}: {args.requests} requests, concurrency {args.concurrency}")
+    print(f"elapsed {results.elapsed:.2f}s, throughput {args.requests / results.elapsed:.2f} req/s")
+    print("status  " + ", ".join(f"{status}: {count}" for status, count in sorted(results.statuses.items(), key=str)))
+    if results.task_statuses:
+        print("tasks   " + ", ".join(f"{status}: {count}" for status, count in sorted(results.task_statuses.items())))
+    _print_latencies("response", results.latencies)
+    _print_latencies("first token", results.first_token)
+    _print_latencies("task finished", results.end_to_end)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Load test the LLM-dependent endpoints")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--scenario", choices=["job-upload", "cv-upload", "generate", "generate-stream"], default="job-upload")
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--ner-mode", choices=["llm", "hybrid", "fast"], default="llm")
+    parser.add_argument("--wait-tasks", action="store_true", help="Poll each upload's NER task until it finishes")
+    parser.add_argument("--task-timeout", type=float, default=600.0)
+    parser.add_argument("--reuse", action="store_true", help="Let /generate reuse previous results (no force)")
+    parser.add_argument("--email", default="loadtest@example.com")
+    parser.add_argument("--password", default="loadtest-password")
+    parser.add_argument("--timeout", type=float, default=600.0, help="Per-request timeout (seconds)")
+    args = parser.parse_args(argv)
+
+    report(args, asyncio.run(run(args)))
+
+
+if __name__ == "__main__":
+    main()
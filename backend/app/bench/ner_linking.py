@@ -0,0 +1,111 @@
+"""
+Benchmark for entity linking in ner_service.organize_entities.
+
+Usage (from backend/):
+    python -m app.bench.ner_linking
+    python -m app.bench.ner_linking --pages 10 20 40 --rounds 5 --unmatched 0
+
+Builds synthetic CVs of N pages (~3,000 characters and ~4 experiences per
+page) and times the positional-index linking against the previous
+implementation, which lowercased the whole document again for every
+title x organization/date/location. `--unmatched` adds entities per type
+that do not occur verbatim in the text (names the LLM normalized), listed
+first as the LLM tends to return them. It also reports how many
+experience blocks were linked to their own company.
+"""
+import argparse
+import random
+import time
+from typing import Callable, Dict, List, Tuple
+
+from app.services.ner_service import organize_entities
+
+CHARS_PER_PAGE = 3000
+EXPERIENCES_PER_PAGE = 4
+FILLER = (
+    "Designed and operated services for internal teams, improved reliability and "
+    "latency, mentored junior engineers and reviewed code daily. "
+)
+
+
+def legacy_organize_entities(entities: dict, text: str) -> dict:
+    """The linking used before the positional index (first match anywhere in the text)."""
+    structured = {"EXPERIENCE_BLOCKS": [], "EDUCATION_BLOCKS": []}
+    for title in entities.get("EXPERIENCE", []):
+        block = {"title": title, "company": "", "date": "", "location": ""}
+        for field, candidates in (("company", "ORGANIZATION"), ("date", "DATE"), ("location", "LOCATION")):
+            for candidate in entities.get(candidates, []):
+                if candidate.lower() in text.lower():
+                    block[field] = candidate
+                    break
+        structured["EXPERIENCE_BLOCKS"].append(block)
+    for edu in entities.get("EDUCATION", []):
+        block = {"degree": edu, "school": "", "date": "", "location": ""}
+        for field, candidates in (("school", "ORGANIZATION"), ("date", "DATE"), ("location", "LOCATION")):
+            for candidate in entities.get(candidates, []):
+                if candidate.lower() in text.lower():
+                    block[field] = candidate
+                    break
+        structured["EDUCATION_BLOCKS"].append(block)
+    return structured
+
+
+def synthetic_cv(pages: int, unmatched: int = 0, seed: int = 0) -> Tuple[str, dict, Dict[str, str]]:
+    """A CV of `pages` pages, its entities and the true title -> company mapping."""
+    rng = random.Random(seed)
+    entities = {"EXPERIENCE": [], "ORGANIZATION": [], "DATE": [], "LOCATION": [], "EDUCATION": []}
+    truth: Dict[str, str] = {}
+    parts: List[str] = []
+    for i in range(pages * EXPERIENCES_PER_PAGE):
+        title, company = f"Engineer Level {i}", f"Company{i:03d} Corp"
+        date, location = f"{2000 + i % 25} - {2001 + i % 25}", f"City{i % 37}"
+        header = f"{title} - {company}, {location} ({date})\n"
+        body = FILLER * max(1, (CHARS_PER_PAGE // EXPERIENCES_PER_PAGE - len(header)) // len(FILLER))
+        parts.append(header + body + "\n\n")
+        truth[title] = company
+        entities["EXPERIENCE"].append(title)
+        entities["ORGANIZATION"].append(company)
+        entities["DATE"].append(date)
+        entities["LOCATION"].append(location)
+    rng.shuffle(entities["ORGANIZATION"])
+    entities["DATE"] = list(dict.fromkeys(entities["DATE"]))
+    entities["LOCATION"] = list(dict.fromkeys(entities["LOCATION"]))
+    for kind in ("ORGANIZATION", "DATE", "LOCATION"):
+        entities[kind] = [f"Normalized {kind.title()} {i}" for i in range(unmatched)] + entities[kind]
+    return "".join(parts), entities, truth
+
+
+def _time(link: Callable[[dict, str], dict], entities: dict, text: str, rounds: int) -> Tuple[float, dict]:
+    started_at = time.perf_counter()
+    for _ in range(rounds):
+        structured = link(entities, text)
+    return (time.perf_counter() - started_at) / rounds * 1000, structured
+
+
+def _correct(structured: dict, truth: Dict[str, str]) -> int:
+    return sum(1 for block in structured["EXPERIENCE_BLOCKS"] if truth.get(block["title"]) == block["company"])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark entity linking (positional index vs. legacy)")
+    parser.add_argument("--pages", type=int, nargs="+", default=[1, 10, 20])
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--unmatched", type=int, default=3, help="Entities per type absent from the text")
+    args = parser.parse_args()
+
+    header = f"{'pages':>5} {'chars':>8} {'titles':>6} {'legacy ms':>10} {'index ms':>9} {'speedup':>8} {'linked ok (legacy/index)':>26}"
+    print(header)
+    print("-" * len(header))
+    for pages in args.pages:
+        text, entities, truth = synthetic_cv(pages, args.unmatched)
+        legacy_ms, legacy = _time(legacy_organize_entities, entities, text, args.rounds)
+        index_ms, indexed = _time(organize_entities, entities, text, args.rounds)
+        titles = len(entities["EXPERIENCE"])
+        print(
+            f"{pages:>5} {len(text):>8} {titles:>6} {legacy_ms:>10.1f} {index_ms:>9.1f} "
+            f"{legacy_ms / index_ms:>7.1f}x {f'{_correct(legacy, truth)}/{_correct(indexed, truth)} of {titles}':>26}"
+        )
+
+
+if __name__ == "__main__":
+    main()
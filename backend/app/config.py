@@ -1,3 +1,4 @@
+from typing import Literal, Optional
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
@@ -11,9 +12,80 @@ class Settings(BaseSettings):
     # Ollama-related
     OLLAMA_API_URL: str
     OLLAMA_MODEL: str
+    OLLAMA_MAX_CONNECTIONS: int = 10  # pooled keep-alive connections to Ollama
+    OLLAMA_CONNECT_TIMEOUT: float = 5.0
+    OLLAMA_GENERATE_TIMEOUT: float = 500.0  # tailored CV generation
+    OLLAMA_NER_TIMEOUT: float = 300.0  # entity extraction
+    # "llm" (default): the LLM extracts every entity type; opt-in "hybrid": SKILLS, TECHNOLOGIES,
+    # DATE and CONTACT come from the local gazetteer/regex tier and the LLM is
+    # asked only for the rest; "fast": local tier only, no LLM call
+    NER_MODE: Literal["llm", "hybrid", "fast"] = "llm"
+    # LLM admission control (services/llm_scheduler.py), per process
+    LLM_MAX_CONCURRENCY: int = 2  # LLM calls in flight at once
+    LLM_QUEUE_LIMIT_INTERACTIVE: int = 8  # waiting calls per priority class before HTTP 429
+    LLM_QUEUE_LIMIT_NER: int = 32
+    LLM_QUEUE_LIMIT_BATCH: int = 64
+    NER_CACHE_ENABLED: bool = True  # reuse entities for identical texts (ner_cache collection)
+    NER_CHUNK_CHARS: int = 6000  # longer texts are split into chunks extracted in parallel (0 = never split)
+    NER_CHUNK_CONCURRENCY: int = 4  # concurrent LLM calls per document
+
+    # Token for /admin endpoints (X-Admin-Token header); admin endpoints are disabled when unset
+    ADMIN_TOKEN: Optional[str] = None
     MONGODB_URL: str
     DATABASE_NAME: str
 
+    # CV / job file uploads, streamed to disk (utils/uploads.py)
+    UPLOAD_MAX_BYTES: int = 25 * 1024 * 1024  # larger uploads get HTTP 413
+    UPLOAD_CHUNK_SIZE: int = 1024 * 1024
+    # Bulk uploads (services/bulk_upload.py)
+    BULK_UPLOAD_MAX_FILES: int = 1000  # files per request, ZIP entries included
+    BULK_UPLOAD_MAX_ARCHIVE_BYTES: int = 500 * 1024 * 1024  # per ZIP archive
+    BULK_UPLOAD_CONCURRENCY: int = 8  # files extracted (text, embedding, fast NER) at once
+    # Text extraction process pool (utils/extract_text.py)
+    EXTRACT_WORKERS: int = 2  # processes (0 = extract in a thread of the API process)
+    EXTRACT_TIMEOUT: float = 60.0  # seconds per document before HTTP 422
+    EXTRACT_MAX_TASKS_PER_WORKER: int = 100  # documents before a worker process is replaced
+    PDF_MAX_PAGES: int = 50  # pages read from a CV PDF (0 = all); job postings are read whole
+    PDF_PAGES_PER_TASK: int = 20  # longer PDFs are split into page ranges extracted in parallel (0 = never split)
+
+    # Embedding model used for CV/job similarity
+    EMBEDDING_MODEL_NAME: str = "thenlper/gte-base"
+    EMBEDDING_MODEL_VERSION: str = "1"
+    # "torch" (fp32 reference), "int8" (dynamic quantization) or "onnx" (onnxruntime)
+    EMBEDDING_BACKEND: Literal["torch", "int8", "onnx"] = "torch"
+    EMBEDDING_ONNX_FILE: Optional[str] = None  # e.g. "onnx/model_qint8_avx512_vnni.onnx"
+    EMBEDDING_BATCH_SIZE: int = 16
+    # Micro-batching of concurrent encode requests
+    EMBEDDING_MAX_BATCH_SIZE: int = 32
+    EMBEDDING_MAX_WAIT_MS: float = 5.0
+    EMBEDDING_WARMUP: bool = True  # load + warm the model in the background at startup
+    EMBEDDING_WORKERS: int = 1  # inference threads
+    EMBEDDING_TORCH_THREADS: int = 0  # torch intra-op threads (0 = torch default)
+    EMBEDDING_QUEUE_SIZE: int = 32  # pending encode calls before HTTP 503
+    # "truncate" embeds the first 3000 characters, "chunked" embeds
+    # section-aligned chunks and pools them into one vector
+    EMBEDDING_MODE: Literal["truncate", "chunked"] = "truncate"
+    EMBEDDING_CHUNK_CHARS: int = 1500
+    EMBEDDING_CHUNK_OVERLAP: int = 200
+    EMBEDDING_POOLING: Literal["mean", "max", "attention"] = "mean"
+    EMBEDDING_ATTENTION_TEMPERATURE: float = 0.1
+
+    # Approximate nearest neighbour index over job embeddings
+    ANN_N_LISTS: int = 0  # 0 = sqrt(corpus size)
+    ANN_NPROBE: int = 8  # more lists probed = better recall, slower queries
+    ANN_EXACT_THRESHOLD: int = 5000  # exact search below this many vectors
+    ANN_SNAPSHOT_DIR: str = "indexes"
+    ANN_SNAPSHOT_EVERY: int = 100  # mutations between snapshots (0 = only on shutdown)
+    ANN_RECONCILE_SECONDS: float = 60.0  # max age of the index's view of deletes/inserts made by other processes
+
+    # Background task queue (python -m app.worker)
+    TASK_MAX_ATTEMPTS: int = 3
+    TASK_VISIBILITY_TIMEOUT: float = 600.0  # seconds a lease lasts without a heartbeat
+    TASK_RETRY_BASE_DELAY: float = 5.0  # backoff: base * 2^(attempt-1), with jitter
+    TASK_RETRY_MAX_DELAY: float = 300.0
+    TASK_POLL_INTERVAL: float = 1.0  # idle worker sleep between claims
+    TASK_WORKER_CONCURRENCY: int = 2  # tasks run at once per worker process
+
     model_config = {
         "env_file": ".env",
         "extra": "forbid" 
@@ -24,4 +24,14 @@ certifications_collection = db.get_collection("certifications")
 cvs_collection = db.get_collection("cvs")
 jobs_collection = db.get_collection("jobs")
 tailored_cvs_collection = db.get_collection("tailored_cvs")
-exports_collection = db.get_collection("exports")
\ No newline at end of file
+exports_collection = db.get_collection("exports")
+
+#! Embedding cache (one vector per chunk hash)
+embedding_chunks_collection = db.get_collection("embedding_chunks")
+section_embeddings_collection = db.get_collection("section_embeddings")
+
+#! NER result cache (one entry per text hash + model + prompt version)
+ner_cache_collection = db.get_collection("ner_cache")
+
+#! Durable background task queue (see services/task_queue.py)
+tasks_collection = db.get_collection("tasks")
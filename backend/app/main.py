@@ -1,4 +1,6 @@
 
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.routes import (
@@ -16,11 +18,43 @@ from app.routes import (
     generate_routes,
     similarity_routes,
     analysis_routes,
-    export_routes
+    export_routes,
+    metrics_routes,
+    health_routes,
+    task_routes,
+    admin_routes
 )
 from app.auth import auth_routes
+from app.config import settings
+from app.services.ranking_service import job_index
+from app.services import similarity_service, llm_client, document_dedup, generation_service
+from app.utils import extract_text
 
-app = FastAPI(title="TalentBridge")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # One pooled keep-alive connection set to Ollama shared by all requests
+    await llm_client.start()
+    # Warm the embedding model in the background: auth/CRUD traffic is served
+    # right away, /health/ready turns green once analysis can be served
+    warmup_task = asyncio.create_task(similarity_service.warm_up_async()) if settings.EMBEDDING_WARMUP else None
+    # Duplicate-upload lookups by file hash, one tailored CV per CV/job pair and
+    # one cached vector per CV section (created in the background, idempotent)
+    index_task = asyncio.gather(
+        document_dedup.ensure_indexes(),
+        generation_service.ensure_indexes(),
+        similarity_service.ensure_section_indexes(),
+    )
+    yield
+    if warmup_task:
+        warmup_task.cancel()
+    index_task.cancel()
+    # Persist the job embedding index so the next start only catches up
+    await job_index.snapshot()
+    similarity_service.shutdown_executor()
+    extract_text.shutdown_pool()
+    await llm_client.close()
+
+app = FastAPI(title="TalentBridge", lifespan=lifespan)
 
 # CORS configuration for frontend
 origins = [
@@ -62,6 +96,16 @@ app.include_router(similarity_routes.router)
 app.include_router(analysis_routes.router)  # ✅ Correct route include
 app.include_router(export_routes.router)
 
+# Background task status
+app.include_router(task_routes.router)
+
+# Monitoring routes
+app.include_router(metrics_routes.router)
+app.include_router(health_routes.router)
+
+# Admin routes (X-Admin-Token)
+app.include_router(admin_routes.router)
+
 @app.get("/")
 def root():
     return {"message": "TalentBridge is running"}
\ No newline at end of file
@@ -0,0 +1,22 @@
+"""
+Admin Routes: maintenance endpoints protected by settings.ADMIN_TOKEN.
+"""
+from fastapi import APIRouter, Depends
+
+from app.auth.dependencies import require_admin
+from app.services.ner_service import ner_cache_stats, purge_ner_cache
+
+router = APIRouter(prefix="/admin", tags=["Admin"], dependencies=[Depends(require_admin)])
+
+
+@router.get("/ner-cache")
+async def get_ner_cache_stats() -> dict:
+    """NER cache hit/miss counters for this worker and the current cache version"""
+    return ner_cache_stats()
+
+
+@router.delete("/ner-cache")
+async def delete_ner_cache(stale_only: bool = True) -> dict:
+    """Purge cached NER results (by default only entries from other models/prompt versions)"""
+    deleted = await purge_ner_cache(stale_only=stale_only)
+    return {"deleted": deleted, "stale_only": stale_only}
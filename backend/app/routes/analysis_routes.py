@@ -1,7 +1,15 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from bson import ObjectId
 from app.database import cvs_collection, jobs_collection
-from app.services.similarity_service import compute_similarity
+from app.auth.dependencies import get_owned_job
+from app.services import analysis_service
+from app.services.analysis_service import match_level
+from app.services.similarity_service import (
+    compute_section_similarity,
+    get_document_vector,
+    job_text_of
+)
+from app.services.ranking_service import job_index, rank_collection
 from app.services.keyword_service import extract_keywords, find_common_keywords, get_keyword_coverage
 
 router = APIRouter(prefix="/analysis", tags=["Analysis"])
@@ -9,44 +17,123 @@ router = APIRouter(prefix="/analysis", tags=["Analysis"])
 @router.get("/cv-job/{cv_id}/{job_id}")
 async def analyze_cv_job(cv_id: str, job_id: str) -> dict:
     """Analyze similarity between a CV and a Job with keywords and detailed metrics"""
+    return await analysis_service.analyze_cv_job(cv_id, job_id)
+
+@router.get("/cv-job/{cv_id}/{job_id}/sections")
+async def analyze_cv_job_sections(cv_id: str, job_id: str) -> dict:
+    """Structured similarity: overall score plus a per-section breakdown of the CV against the job"""
+    if not ObjectId.is_valid(cv_id) or not ObjectId.is_valid(job_id):
+        raise HTTPException(status_code=400, detail="Invalid CV or Job ID")
+
     cv = await cvs_collection.find_one({"_id": ObjectId(cv_id)})
     job = await jobs_collection.find_one({"_id": ObjectId(job_id)})
 
     if not cv or not job:
         raise HTTPException(status_code=404, detail="CV or Job not found")
 
-    cv_text = cv.get("raw_text", "")
-    job_text = job.get("job_text", "") or job.get("text", "")
-    
-    # Compute semantic similarity
-    similarity = compute_similarity(cv_text, job_text)
-    
-    # Extract keywords
-    cv_keywords = extract_keywords(cv_text, max_keywords=20)
-    job_keywords = extract_keywords(job_text, max_keywords=20)
-    common_keywords = find_common_keywords(cv_keywords, job_keywords)
-    keyword_coverage = get_keyword_coverage(cv_keywords, job_keywords)
-    
-    # Determine match level
-    if similarity >= 0.8:
-        match_level = "High"
-    elif similarity >= 0.65:
-        match_level = "Medium"
-    elif similarity >= 0.5:
-        match_level = "Low"
-    else:
-        match_level = "Very Low"
-    
+    result = await compute_section_similarity(cv, job)
+    sections = [
+        {"section": title, "similarity": score, "match_level": match_level(score)}
+        for title, score in result["sections"].items()
+    ]
+
     return {
         "cv_id": cv_id,
         "job_id": job_id,
-        "similarity": similarity,
-        "similarity_score": similarity,  # For compatibility
-        "match_level": match_level,
-        "cv_keywords": cv_keywords,
-        "job_keywords": job_keywords,
-        "common_keywords": common_keywords,
-        "keyword_coverage": keyword_coverage,
-        "keyword_match_count": len(common_keywords),
-        "total_job_keywords": len(job_keywords)
+        "similarity": result["overall"],
+        "match_level": match_level(result["overall"]),
+        "sections": sections
     }
+
+@router.get("/cv/{cv_id}/top-jobs")
+async def top_jobs_for_cv(
+    cv_id: str,
+    k: int = Query(10, ge=1, le=100),
+    nprobe: int | None = Query(None, ge=1, description="IVF lists to probe (recall/latency trade-off)")
+) -> dict:
+    """Rank every job against a CV in one pass and return the top K with keyword coverage"""
+    if not ObjectId.is_valid(cv_id):
+        raise HTTPException(status_code=400, detail="Invalid CV ID")
+
+    cv = await cvs_collection.find_one({"_id": ObjectId(cv_id)})
+    if not cv:
+        raise HTTPException(status_code=404, detail="CV not found")
+
+    cv_text = cv.get("raw_text", "")
+    cv_vector = await get_document_vector(cvs_collection, cv, cv_text)
+    ranked = await job_index.top_k(cv_vector, k, nprobe=nprobe)
+
+    # Keyword coverage only for the surviving jobs
+    jobs = await jobs_collection.find(
+        {"_id": {"$in": [ObjectId(job_id) for job_id, _ in ranked]}},
+        {"embedding": 0}
+    ).to_list(None)
+    jobs_by_id = {str(job["_id"]): job for job in jobs}
+    cv_keywords = extract_keywords(cv_text, max_keywords=20)
+
+    results = []
+    for job_id, similarity in ranked:
+        job = jobs_by_id.get(job_id)
+        if not job:
+            continue
+        job_keywords = extract_keywords(job_text_of(job), max_keywords=20)
+        common_keywords = find_common_keywords(cv_keywords, job_keywords)
+        results.append({
+            "job_id": job_id,
+            "title": job.get("title", "Untitled"),
+            "similarity": similarity,
+            "match_level": match_level(similarity),
+            "common_keywords": common_keywords,
+            "keyword_coverage": get_keyword_coverage(cv_keywords, job_keywords),
+            "keyword_match_count": len(common_keywords),
+        })
+
+    return {"cv_id": cv_id, "k": k, "results": results}
+
+@router.get("/job/{job_id}/top-cvs")
+async def top_cvs_for_job(
+    job_id: str,
+    k: int = Query(20, ge=1, le=200),
+    cursor: str | None = Query(None, description="next_cursor of the previous page"),
+    job: dict = Depends(get_owned_job)
+) -> dict:
+    """
+    Recruiter view: rank every CV against a job, one page of K candidates at a time.
+    Only for the user who uploaded the job; candidates are identified by CV id only.
+    """
+
+    job_text = job_text_of(job)
+    job_vector = await get_document_vector(jobs_collection, job, job_text)
+    try:
+        ranked, next_cursor = await rank_collection(
+            cvs_collection, lambda cv: cv.get("raw_text", ""), job_vector, k, cursor
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # Keyword coverage only for the CVs of this page
+    cvs = await cvs_collection.find(
+        {"_id": {"$in": [ObjectId(cv_id) for cv_id, _ in ranked]}},
+        {"raw_text": 1}
+    ).to_list(None)
+    cvs_by_id = {str(cv["_id"]): cv for cv in cvs}
+    job_keywords = extract_keywords(job_text, max_keywords=20)
+
+    results = []
+    for cv_id, score in ranked:
+        cv = cvs_by_id.get(cv_id)
+        if not cv:
+            continue
+        similarity = round(score, 4)
+        cv_keywords = extract_keywords(cv.get("raw_text", ""), max_keywords=20)
+        common_keywords = find_common_keywords(cv_keywords, job_keywords)
+        results.append({
+            "cv_id": cv_id,
+            "similarity": similarity,
+            "match_level": match_level(similarity),
+            "common_keywords": common_keywords,
+            "keyword_coverage": get_keyword_coverage(cv_keywords, job_keywords),
+            "keyword_match_count": len(common_keywords),
+        })
+
+    return {"job_id": job_id, "k": k, "results": results, "next_cursor": next_cursor}
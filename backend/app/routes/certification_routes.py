@@ -3,6 +3,8 @@ from fastapi import APIRouter, HTTPException, Depends
 from ..models.cvProfile import Certification, CertificationInDB
 from ..database import certifications_collection
 from ..auth.dependencies import get_current_user
+from ..services.cv_profile_service import SECTION_CERTIFICATIONS
+from ..services.similarity_service import invalidate_section_embeddings
 from bson import ObjectId
 
 router = APIRouter(prefix="/certifications", tags=["Certifications"])
@@ -15,6 +17,7 @@ async def create_certification(cert: Certification, current_user: dict = Depends
     
     # Convert MongoDB _id to id string
     cert_data["id"] = str(result.inserted_id)
+    await invalidate_section_embeddings(str(current_user["_id"]), SECTION_CERTIFICATIONS)
     return CertificationInDB(**cert_data)
 
 @router.get("/", response_model=list[CertificationInDB])
@@ -43,6 +46,7 @@ async def update_certification(cert_id: str, cert: Certification, current_user:
 
     # Convert _id to id
     updated["id"] = str(updated.pop("_id"))
+    await invalidate_section_embeddings(str(current_user["_id"]), SECTION_CERTIFICATIONS)
     return CertificationInDB(**updated)
 
 @router.delete("/{cert_id}")
@@ -57,4 +61,5 @@ async def delete_certification(cert_id: str, current_user: dict = Depends(get_cu
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Certification not found")
 
+    await invalidate_section_embeddings(str(current_user["_id"]), SECTION_CERTIFICATIONS)
     return {"message": "Certification deleted"}
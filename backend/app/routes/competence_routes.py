@@ -3,6 +3,8 @@ from fastapi import APIRouter, HTTPException, Depends
 from ..models.cvProfile import Competence, CompetenceInDB
 from ..database import competences_collection
 from ..auth.dependencies import get_current_user
+from ..services.cv_profile_service import SECTION_COMPETENCES
+from ..services.similarity_service import invalidate_section_embeddings
 from bson import ObjectId
 
 
@@ -16,6 +18,7 @@ async def create_competence(comp: Competence, current_user: dict = Depends(get_c
     
     # Convert MongoDB _id to id string
     comp_data["id"] = str(result.inserted_id)
+    await invalidate_section_embeddings(str(current_user["_id"]), SECTION_COMPETENCES)
     return CompetenceInDB(**comp_data)
 
 @router.get("/", response_model=list[CompetenceInDB])
@@ -44,6 +47,7 @@ async def update_competence(comp_id: str, comp: Competence, current_user: dict =
     
     # Convert _id to id
     updated["id"] = str(updated.pop("_id"))
+    await invalidate_section_embeddings(str(current_user["_id"]), SECTION_COMPETENCES)
     return CompetenceInDB(**updated)
 
 @router.delete("/{comp_id}")
@@ -56,4 +60,5 @@ async def delete_competence(comp_id: str, current_user: dict = Depends(get_curre
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Competence not found")
     
+    await invalidate_section_embeddings(str(current_user["_id"]), SECTION_COMPETENCES)
     return {"message": "Competence deleted"}
\ No newline at end of file
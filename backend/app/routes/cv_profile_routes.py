@@ -2,6 +2,8 @@ from fastapi import APIRouter, HTTPException, Depends
 from ..models.cvProfile import CvProfile, CvProfileInDB, CvProfileUpdate
 from ..database import cv_profile_collection
 from ..auth.dependencies import get_current_user
+from ..services.cv_profile_service import SECTION_PROFILE
+from ..services.similarity_service import invalidate_section_embeddings
 
 router = APIRouter(prefix="/cv-profile", tags=["CV Profile"])
 
@@ -21,6 +23,7 @@ async def create_cv_profile(cv_profile: CvProfile, current_user: dict = Depends(
     result = await cv_profile_collection.insert_one(cv_profile_data)
     cv_profile_data["id"] = str(result.inserted_id)
     
+    await invalidate_section_embeddings(str(current_user["_id"]), SECTION_PROFILE)
     return CvProfileInDB(**cv_profile_data)
 
 # Get current user's CV profile
@@ -51,6 +54,7 @@ async def update_cv_profile(cv_profile: CvProfileUpdate, current_user: dict = De
         raise HTTPException(status_code=404, detail="CV profile not found")
     
     updated["id"] = str(updated.pop("_id"))
+    await invalidate_section_embeddings(str(current_user["_id"]), SECTION_PROFILE)
     return CvProfileInDB(**updated)
 
 # Delete CV profile
@@ -62,4 +66,5 @@ async def delete_cv_profile(current_user: dict = Depends(get_current_user)):
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="CV profile not found")
     
+    await invalidate_section_embeddings(str(current_user["_id"]), SECTION_PROFILE)
     return {"message": "CV profile deleted"}
@@ -2,19 +2,26 @@
 CV Routes: Handle CV upload, creation from profile, and retrieval.
 
 This module provides endpoints for managing CV documents,
-including text extraction and named entity recognition.
+including text extraction. Named entity recognition runs in the
+background worker; responses carry the task id to poll on /tasks/{id}.
 """
-from fastapi import APIRouter, UploadFile, File, HTTPException, Depends
+from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, Query
+from typing import List, Literal, Optional
 from pathlib import Path
 from datetime import datetime, UTC
 from bson import ObjectId
 import logging
 
+from app.config import settings
 from app.database import cvs_collection
 from app.services.cv_profile_service import cv_profile_to_text
 from app.auth.dependencies import get_current_user
-from app.utils.extract_text import extract_text_from_file
-from app.services.ner_service import extract_entities_safe
+from app.utils.extract_text import extract_text_async
+from app.utils.uploads import store_upload
+from app.services.document_dedup import find_extracted, has_entities
+from app.services.bulk_upload import BulkItem, bulk_ingest, bulk_report
+from app.services.task_handlers import NER_CV, schedule_entity_extraction
+from app.services.similarity_service import build_embedding, is_current_embedding
 
 router = APIRouter(prefix="/cv", tags=["CV"])
 logger = logging.getLogger(__name__)
@@ -24,29 +31,47 @@ UPLOAD_DIR = Path("uploaded_cvs")
 UPLOAD_DIR.mkdir(exist_ok=True)
 
 @router.post("/upload")
-async def upload_cv(file: UploadFile = File(...), current_user: dict = Depends(get_current_user)) -> dict:
-    """Upload CV file and extract text content"""
+async def upload_cv(
+    file: UploadFile = File(...),
+    ner_mode: Optional[Literal["llm", "hybrid", "fast"]] = Query(None),
+    current_user: dict = Depends(get_current_user)
+) -> dict:
+    """
+    Upload CV file and extract text content (ner_mode=fast: local entity extraction only, no LLM task).
+
+    Re-uploading a byte-identical file reuses the text and entities already
+    extracted from it (`reused_extraction`, `task_id` null once entities exist).
+    """
     if not file.filename.endswith(('.pdf', '.docx')):
         raise HTTPException(status_code=400, detail="Only PDF and DOCX files are supported")
 
-    save_path = UPLOAD_DIR / file.filename
     try:
-        content = await file.read()
-        save_path.write_bytes(content)
-        cv_text = extract_text_from_file(save_path)
+        upload = await store_upload(file, UPLOAD_DIR)
+        previous = await find_extracted(cvs_collection, upload.sha256, "raw_text")
+        if previous:
+            # Same file uploaded before: reuse its text instead of extracting again
+            cv_text = previous["raw_text"]
+        else:
+            cv_text = await extract_text_async(upload.path, settings.PDF_MAX_PAGES)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Failed to process CV: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to extract text: {str(e)}")
 
-    # Extract entities using NER (LLM) - safe mode doesn't fail on errors
-    logger.info(f"Extracting entities from CV: {file.filename}")
-    entities = extract_entities_safe(cv_text)
-
+    # Entities of an identical earlier upload are reused unless a NER mode is asked for
+    reuse_entities = previous is not None and ner_mode is None and has_entities(previous)
+    embedding = (previous or {}).get("embedding") or {}
     cv_document = {
         "filename": file.filename,
-        "file_path": str(save_path),
+        "file_path": str(upload.path),
+        "file_size": upload.size,
+        "file_sha256": upload.sha256,
         "raw_text": cv_text,
-        "entities": entities,  # Store extracted entities
+        # Filled in by entity extraction
+        "entities": previous["entities"] if reuse_entities else {"raw": {}, "structured": {}},
+        # Cached for similarity scoring
+        "embedding": embedding if is_current_embedding(embedding) else await build_embedding(cv_text),
         "upload_date": datetime.now(UTC),
         "user_id": str(current_user["_id"])
     }
@@ -54,14 +79,66 @@ async def upload_cv(file: UploadFile = File(...), current_user: dict = Depends(g
     result = await cvs_collection.insert_one(cv_document)
     cv_id = str(result.inserted_id)
 
+    # Extract entities in the background worker (inline in fast mode)
+    task_id = None
+    if not reuse_entities:
+        task_id = await schedule_entity_extraction(NER_CV, cv_id, cv_text, ner_mode, user_id=cv_document["user_id"])
+
     return {
         "cv_id": cv_id,
+        "task_id": task_id,
+        "reused_extraction": previous is not None,
         "filename": file.filename,
         "raw_text_preview": cv_text[:500] + "..." if len(cv_text) > 500 else cv_text
     }
 
+@router.post("/upload/bulk")
+async def upload_cvs_bulk(
+    files: List[UploadFile] = File(...),
+    ner_mode: Optional[Literal["llm", "hybrid", "fast"]] = Query(None),
+    current_user: dict = Depends(get_current_user)
+) -> dict:
+    """
+    Upload many CV files (PDF, DOCX) or ZIP archives of them in one request.
+
+    Files are extracted concurrently and saved with a single insert; the
+    response lists each file with its status (stored / failed / skipped),
+    its `id` and NER `task_id`. A failing file does not fail the others.
+    """
+    user_id = str(current_user["_id"])
+
+    def cv_document(item: BulkItem) -> dict:
+        return {
+            "filename": item.name,
+            "file_path": str(item.upload.path),
+            "file_size": item.upload.size,
+            "file_sha256": item.upload.sha256,
+            "raw_text": item.text,
+            "entities": item.entities,
+            "embedding": item.embedding,
+            "upload_date": datetime.now(UTC),
+            "user_id": user_id
+        }
+
+    items = await bulk_ingest(
+        files,
+        root=UPLOAD_DIR,
+        extensions=(".pdf", ".docx"),
+        collection=cvs_collection,
+        text_field="raw_text",
+        task_type=NER_CV,
+        make_document=cv_document,
+        ner_mode=ner_mode,
+        user_id=user_id,
+        max_pages=settings.PDF_MAX_PAGES,
+    )
+    return bulk_report(items)
+
 @router.post("/from-profile")
-async def create_cv_from_profile(current_user: dict = Depends(get_current_user)) -> dict:
+async def create_cv_from_profile(
+    ner_mode: Optional[Literal["llm", "hybrid", "fast"]] = Query(None),
+    current_user: dict = Depends(get_current_user)
+) -> dict:
     """Create a CV document from user's CV profile"""
     user_id = str(current_user["_id"])
     try:
@@ -79,15 +156,12 @@ async def create_cv_from_profile(current_user: dict = Depends(get_current_user))
             detail=f"Failed to create CV from profile. Error: {str(e)}"
         )
 
-    # Extract entities using NER (LLM) - safe mode doesn't fail on errors
-    logger.info(f"Extracting entities from CV profile for user: {user_id}")
-    entities = extract_entities_safe(cv_text)
-
     cv_document = {
         "filename": f"profile_cv_{user_id[:8]}.txt",
         "file_path": None,
         "raw_text": cv_text,
-        "entities": entities,  # Store extracted entities
+        "entities": {"raw": {}, "structured": {}},  # Filled in by entity extraction
+        "embedding": await build_embedding(cv_text),  # Cached for similarity scoring
         "upload_date": datetime.now(UTC),
         "from_profile": True,
         "user_id": user_id
@@ -96,8 +170,12 @@ async def create_cv_from_profile(current_user: dict = Depends(get_current_user))
     result = await cvs_collection.insert_one(cv_document)
     cv_id = str(result.inserted_id)
 
+    # Extract entities in the background worker (inline in fast mode)
+    task_id = await schedule_entity_extraction(NER_CV, cv_id, cv_text, ner_mode, user_id=cv_document["user_id"])
+
     return {
         "cv_id": cv_id,
+        "task_id": task_id,
         "filename": "CV depuis profil",
         "raw_text_preview": cv_text[:500] + "..." if len(cv_text) > 500 else cv_text
     }
@@ -106,7 +184,7 @@ async def create_cv_from_profile(current_user: dict = Depends(get_current_user))
 async def get_cv(cv_id: str, current_user: dict = Depends(get_current_user)) -> dict:
     """Retrieve CV by ID (only owner can access)"""
     try:
-        cv = await cvs_collection.find_one({"_id": ObjectId(cv_id)})
+        cv = await cvs_collection.find_one({"_id": ObjectId(cv_id)}, {"embedding": 0})
         if not cv:
             raise HTTPException(status_code=404, detail="CV not found")
         if str(cv.get("user_id")) != str(current_user["_id"]):
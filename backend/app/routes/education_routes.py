@@ -3,6 +3,8 @@ from fastapi import APIRouter, HTTPException, Depends
 from ..models.cvProfile import Education, EducationInDB
 from ..database import educations_collection
 from ..auth.dependencies import get_current_user
+from ..services.cv_profile_service import SECTION_EDUCATION
+from ..services.similarity_service import invalidate_section_embeddings
 from bson import ObjectId
 
 router = APIRouter(prefix="/education", tags=["Education"])
@@ -15,6 +17,7 @@ async def create_education(edu: Education, current_user: dict = Depends(get_curr
     
     # Convert MongoDB _id to id string
     edu_data["id"] = str(result.inserted_id)
+    await invalidate_section_embeddings(str(current_user["_id"]), SECTION_EDUCATION)
     return EducationInDB(**edu_data)
 
 @router.get("/", response_model=list[EducationInDB])
@@ -43,6 +46,7 @@ async def update_education(edu_id: str, edu: Education, current_user: dict = Dep
 
     # Convert _id to id
     updated["id"] = str(updated.pop("_id"))
+    await invalidate_section_embeddings(str(current_user["_id"]), SECTION_EDUCATION)
     return EducationInDB(**updated)
 
 @router.delete("/{edu_id}")
@@ -57,4 +61,5 @@ async def delete_education(edu_id: str, current_user: dict = Depends(get_current
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Education not found")
 
+    await invalidate_section_embeddings(str(current_user["_id"]), SECTION_EDUCATION)
     return {"message": "Education deleted"}
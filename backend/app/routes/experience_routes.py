@@ -2,6 +2,8 @@ from fastapi import APIRouter, HTTPException, Depends
 from ..models.cvProfile import Experience, ExperienceInDB
 from ..database import experiences_collection
 from ..auth.dependencies import get_current_user
+from ..services.cv_profile_service import SECTION_EXPERIENCE
+from ..services.similarity_service import invalidate_section_embeddings
 from bson import ObjectId
 
 router = APIRouter(prefix="/experiences", tags=["Experiences"])
@@ -14,6 +16,7 @@ async def create_experience(exp: Experience, current_user: dict = Depends(get_cu
     
     # Convert MongoDB _id to id string
     exp_data["id"] = str(result.inserted_id)
+    await invalidate_section_embeddings(str(current_user["_id"]), SECTION_EXPERIENCE)
     return ExperienceInDB(**exp_data)
 
 @router.get("/", response_model=list[ExperienceInDB])
@@ -42,6 +45,7 @@ async def update_experience(exp_id: str, exp: Experience, current_user: dict = D
 
     # Convert _id to id
     updated["id"] = str(updated.pop("_id"))
+    await invalidate_section_embeddings(str(current_user["_id"]), SECTION_EXPERIENCE)
     return ExperienceInDB(**updated)
 
 @router.delete("/{exp_id}")
@@ -56,4 +60,5 @@ async def delete_experience(exp_id: str, current_user: dict = Depends(get_curren
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Experience not found")
 
+    await invalidate_section_embeddings(str(current_user["_id"]), SECTION_EXPERIENCE)
     return {"message": "Experience deleted"}
@@ -1,20 +1,27 @@
+import json
+from typing import Literal
 from fastapi import APIRouter, Form, HTTPException, Depends
-from fastapi.responses import FileResponse
-from pathlib import Path
-from datetime import datetime, UTC
-from docx import Document
-from docx.shared import Pt
+from fastapi.responses import FileResponse, StreamingResponse
 from bson import ObjectId
 from app.database import cvs_collection, jobs_collection, tailored_cvs_collection
 from app.auth.dependencies import get_current_user
-from app.services.ollama_client import generate_tailored_cv
+from app.services.llm_client import LLMError
+from app.services.llm_scheduler import INTERACTIVE, SchedulerFull, scheduler
 from app.services.cv_profile_service import cv_profile_to_text
-from app.routes.analysis_routes import analyze_cv_job  # reuse logic
+from app.services import task_queue
+from app.services.task_handlers import GENERATE_TAILORED
+from app.services.generation_service import (
+    GENERATED_DIR,
+    StreamingGeneration,
+    generation_key,
+    get_or_generate,
+    in_flight,
+    load_generation_inputs,
+    reuse_generated,
+)
 import logging
 
 router = APIRouter(prefix="/generate", tags=["Generate"])
-UPLOAD_DIR = Path("generated_cvs")
-UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
 
 logger = logging.getLogger(__name__)
 
@@ -22,50 +29,39 @@ logger = logging.getLogger(__name__)
 async def generate_cv(
     cv_id: str = Form(...), 
     job_id: str = Form(...),
+    force: bool = Form(False),
 ) -> dict:
-    """Generate a tailored CV if similarity is high enough"""
+    """
+    Generate a tailored CV if similarity is high enough.
+
+    The same CV and job text are only sent to the LLM once: repeated requests
+    get the previous result (`reused`), `force=true` regenerates it.
+    """
     try:
-        cv = await cvs_collection.find_one({"_id": ObjectId(cv_id)})
-        job = await jobs_collection.find_one({"_id": ObjectId(job_id)})
-
-        if not cv or not job:
-            raise HTTPException(status_code=404, detail="CV or Job not found")
-
-        analysis = await analyze_cv_job(cv_id=cv_id, job_id=job_id)
-        similarity = analysis["similarity"]
-
-        if similarity < 0.60:
-            return {"status": "skipped", "similarity": similarity, "message": "Low match score"}
-
-        cv_text = cv.get("raw_text", "")
-        job_text = job.get("job_text", "")
-        
-        if not cv_text or not job_text:
-            raise HTTPException(status_code=400, detail="CV or Job text is empty")
-        
-        tailored_content = generate_tailored_cv(cv_text, job_text)
-        generated_id = f"tailored_{cv_id[:8]}_{job_id[:8]}"
-        output_file = UPLOAD_DIR / f"{generated_id}.docx"
-        create_docx(tailored_content, output_file, job.get("title", "Job Position"))
-
-        await tailored_cvs_collection.insert_one({
-            "generated_id": generated_id,
-            "cv_id": cv_id,
-            "job_id": job_id,
-            "similarity": similarity,
-            "tailored_text": tailored_content,
-            "created_at": datetime.now(UTC)
-        })
+        inputs = await load_generation_inputs(cv_id, job_id)
+        if "skipped" in inputs:
+            return inputs["skipped"]
+        similarity = inputs["similarity"]
+
+        result = await get_or_generate(cv_id, job_id, inputs, force=force)
+        generated_id = result["generated_id"]
 
         return {
             "status": "generated",
             "similarity": similarity,
             "generated_id": generated_id,
-            "snippet": tailored_content[:300] + "...",
-            "download_url": f"/generate/download/{generated_id}"
+            "snippet": result["tailored_text"][:300] + "...",
+            "download_url": f"/generate/download/{generated_id}",
+            "reused": result["reused"]
         }
     except HTTPException:
         raise
+    except LLMError as e:
+        raise HTTPException(
+            status_code=e.status_code,
+            detail=f"Erreur lors de la génération du CV avec Ollama: {e}",
+            headers=e.headers
+        )
     except Exception as e:
         logger.error(f"Error generating CV: {e}", exc_info=True)
         error_msg = str(e)
@@ -76,105 +72,121 @@ async def generate_cv(
             )
         raise HTTPException(status_code=500, detail=f"Error generating CV: {error_msg}")
 
-def create_docx(content: str, output_path: Path, job_title: str):
-    """Create a professional, well-formatted DOCX CV file"""
-    from docx.shared import Pt, RGBColor, Inches
-    
-    doc = Document()
-    
-    # Set default font
-    style = doc.styles['Normal']
-    font = style.font
-    font.name = 'Calibri'
-    font.size = Pt(11)
-    
-    # Set margins (professional CV margins)
-    sections = doc.sections
-    for section in sections:
-        section.top_margin = Inches(0.5)
-        section.bottom_margin = Inches(0.5)
-        section.left_margin = Inches(0.7)
-        section.right_margin = Inches(0.7)
-    
-    # Parse content and create professional format
-    lines = content.splitlines()
-    i = 0
-    
-    while i < len(lines):
-        line = lines[i].strip()
-        if not line:
-            i += 1
-            continue
-        
-        # Handle main headings (##)
-        if line.startswith('##'):
-            heading_text = line.lstrip('#').strip()
-            # Skip empty headings
-            if heading_text:
-                # Add spacing before main sections (except first)
-                if i > 0:
-                    doc.add_paragraph()
-                heading = doc.add_heading(heading_text, level=1)
-                if heading.runs:
-                    heading_format = heading.runs[0].font
-                    heading_format.size = Pt(14)
-                    heading_format.bold = True
-                    heading_format.color.rgb = RGBColor(0, 51, 102)
-                    # Add underline to main section headings
-                    heading.runs[0].underline = True
-                
-        # Handle subheadings (###)
-        elif line.startswith('###'):
-            heading_text = line.lstrip('#').strip()
-            if heading_text:
-                subheading = doc.add_heading(heading_text, level=2)
-                if subheading.runs:
-                    subheading_format = subheading.runs[0].font
-                    subheading_format.size = Pt(12)
-                    subheading_format.bold = True
-                    subheading_format.color.rgb = RGBColor(0, 0, 0)  # Black
-                
-        # Handle bullet points
-        elif line.startswith('-') or line.startswith('•') or line.startswith('*'):
-            bullet_text = line.lstrip('-•* ').strip()
-            if bullet_text:
-                p = doc.add_paragraph(bullet_text, style='List Bullet')
-                if p.runs:
-                    p_format = p.runs[0].font
-                    p_format.size = Pt(11)
-                # Adjust bullet indent
-                p.paragraph_format.space_after = Pt(3)
-                
-        # Handle regular paragraphs with potential formatting
-        else:
-            # Check if line contains key information patterns
-            p = doc.add_paragraph(line)
-            if p.runs:
-                p_format = p.runs[0].font
-                if any(keyword in line.lower() for keyword in ['email:', 'phone:', 'linkedin:', 'github:', 'location:']):
-                    p_format.size = Pt(10.5)
-                elif '|' in line and any(keyword in line.lower() for keyword in ['-', 'to', 'present']):
-                    # Likely a date range or location line
-                    p_format.size = Pt(10)
-                    p_format.italic = True
-                    p_format.color.rgb = RGBColor(64, 64, 64)  # Gray
-                else:
-                    p_format.size = Pt(11)
-            
-            # Add small spacing after paragraphs
-            p.paragraph_format.space_after = Pt(6)
-        
-        i += 1
-    
-    # Ensure document ends with proper spacing
-    if doc.paragraphs:
-        doc.paragraphs[-1].paragraph_format.space_after = Pt(0)
-    
-    doc.save(output_path)
+
+@router.post("/tasks", status_code=202)
+async def enqueue_generation(
+    cv_id: str = Form(...),
+    job_id: str = Form(...),
+    force: bool = Form(False),
+    current_user: dict = Depends(get_current_user),
+) -> dict:
+    """Queue tailored CV generation on the background worker; poll /tasks/{task_id}"""
+    if not ObjectId.is_valid(cv_id) or not ObjectId.is_valid(job_id):
+        raise HTTPException(status_code=400, detail="Invalid CV or Job ID")
+    payload = {"cv_id": cv_id, "job_id": job_id}
+    if force:
+        payload["force"] = True
+    task_id = await task_queue.enqueue(GENERATE_TAILORED, payload, user_id=str(current_user["_id"]))
+    return {"status": "queued", "task_id": task_id, "status_url": f"/tasks/{task_id}"}
+
+
+def _stream_event(fmt: str, event: str, data: dict) -> str:
+    if fmt == "ndjson":
+        return json.dumps({"event": event, **data}, ensure_ascii=False) + "\n"
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@router.post("/stream")
+async def generate_cv_stream(
+    cv_id: str = Form(...),
+    job_id: str = Form(...),
+    format: Literal["sse", "ndjson"] = Form("sse"),
+    force: bool = Form(False),
+):
+    """
+    Stream a tailored CV as it is generated.
+
+    Events: `start` (similarity), `token` (content chunk), then `done`
+    (generated_id, download_url) once the CV is saved and the DOCX rendered,
+    or `error`. A low match or a missing CV/job is answered with a plain
+    JSON response as on /generate/, and a full LLM queue with HTTP 429 and
+    Retry-After. Disconnecting stops the generation and
+    nothing is saved, unless an identical request is waiting for it. A
+    previous result for the same texts, or one being generated by another
+    request, is sent as a single token (`reused` in `done`) unless
+    `force=true`.
+    """
+    try:
+        inputs = await load_generation_inputs(cv_id, job_id)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error preparing CV generation: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Error generating CV: {e}")
+    if "skipped" in inputs:
+        return inputs["skipped"]
+    similarity = inputs["similarity"]
+
+    key = generation_key(inputs["cv_text"], inputs["job_text"])
+    previous = await reuse_generated(cv_id, job_id, inputs, key) if not force else None
+    if previous is None and not in_flight(key):
+        # Refuse with a real 429 while headers can still carry the status
+        try:
+            scheduler.check(INTERACTIVE)
+        except SchedulerFull as e:
+            raise HTTPException(
+                status_code=429,
+                detail=f"The language model is busy, please retry in {e.retry_after}s",
+                headers={"Retry-After": str(e.retry_after)},
+            )
+
+    async def events():
+        nonlocal previous
+        yield _stream_event(format, "start", {"similarity": similarity})
+        generation = None
+        try:
+            if previous is None and in_flight(key):
+                previous = await get_or_generate(cv_id, job_id, inputs, force=True)
+
+            if previous:
+                generated_id = previous["generated_id"]
+                yield _stream_event(format, "token", {"content": previous["tailored_text"]})
+            else:
+                # Registered before the first await: identical requests join it
+                generation = StreamingGeneration(cv_id, job_id, inputs, key)
+                async for chunk in generation.chunks():
+                    yield _stream_event(format, "token", {"content": chunk})
+                generated_id = (await generation.result())["generated_id"]
+        except LLMError as e:
+            yield _stream_event(format, "error", {"status_code": e.status_code, "detail": str(e), "retry_after": e.retry_after})
+            return
+        except Exception as e:
+            logger.error(f"Error streaming CV generation: {e}", exc_info=True)
+            yield _stream_event(format, "error", {"status_code": 500, "detail": f"Error generating CV: {e}"})
+            return
+        finally:
+            if generation is not None:
+                generation.close()
+
+        yield _stream_event(format, "done", {
+            "status": "generated",
+            "similarity": similarity,
+            "generated_id": generated_id,
+            "download_url": f"/generate/download/{generated_id}",
+            "reused": previous is not None
+        })
+
+    media_type = "application/x-ndjson" if format == "ndjson" else "text/event-stream"
+    return StreamingResponse(
+        events(),
+        media_type=media_type,
+        # Let proxies (nginx) pass chunks through instead of buffering them
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 @router.get("/download/{generated_id}")
 async def download_generated(generated_id: str):
-    file_path = UPLOAD_DIR / f"{generated_id}.docx"
+    file_path = GENERATED_DIR / f"{generated_id}.docx"
     if not file_path.exists():
         raise HTTPException(status_code=404, detail="Generated CV not found")
     return FileResponse(
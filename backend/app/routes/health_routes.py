@@ -0,0 +1,19 @@
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from app.services.similarity_service import is_model_ready, model_status
+
+router = APIRouter(prefix="/health", tags=["Health"])
+
+@router.get("/live")
+async def liveness() -> dict:
+    """The worker is up and serving auth/CRUD requests"""
+    return {"status": "ok"}
+
+@router.get("/ready")
+async def readiness():
+    """Ready for analysis traffic once the embedding model is loaded and warm (503 until then)"""
+    ready = is_model_ready()
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={"status": "ready" if ready else "not_ready", "embedding_model": model_status()}
+    )
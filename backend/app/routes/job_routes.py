@@ -2,17 +2,24 @@
 Job Routes: Handle job description upload and management.
 
 This module provides endpoints for uploading job descriptions
-(via file or text), including text extraction and named entity recognition.
+(via file or text), including text extraction. Named entity recognition
+runs in the background worker; responses carry the task id to poll on /tasks/{id}.
 """
-from fastapi import APIRouter, UploadFile, File, Form, HTTPException
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Query, Depends
+from typing import List, Literal, Optional
 from pathlib import Path
 from datetime import datetime, UTC
-from bson import ObjectId
 import logging
 
 from app.database import jobs_collection
-from app.utils.extract_text import extract_text_from_file
-from app.services.ner_service import extract_entities_safe
+from app.auth.dependencies import get_optional_user, get_owned_job
+from app.utils.extract_text import extract_text_async
+from app.utils.uploads import store_upload
+from app.services.document_dedup import find_extracted, has_entities
+from app.services.bulk_upload import STORED, BulkItem, bulk_ingest, bulk_report
+from app.services.task_handlers import NER_JOB, schedule_entity_extraction
+from app.services.similarity_service import build_embedding, is_current_embedding
+from app.services.ranking_service import job_index
 
 router = APIRouter(prefix="/job", tags=["Job"])
 logger = logging.getLogger(__name__)
@@ -26,7 +33,9 @@ async def upload_job(
     title: str = Form(None),
     description: str = Form(None),
     file: UploadFile = File(None),
-    text: str = Form(None)
+    text: str = Form(None),
+    ner_mode: Optional[Literal["llm", "hybrid", "fast"]] = Query(None),
+    current_user: Optional[dict] = Depends(get_optional_user)
 ) -> dict:
     """
     Upload a job description via file or text input.
@@ -35,7 +44,12 @@ async def upload_job(
     - File upload (PDF, DOCX, TXT)
     - Direct text input
     
-    Automatically extracts text and named entities.
+    Automatically extracts text; named entities are extracted by a
+    background task whose id is returned as `task_id` (with
+    ner_mode=fast they are extracted locally right away and `task_id` is null).
+    Re-uploading a byte-identical file reuses the text and entities already
+    extracted from it (`reused_extraction`). With a bearer token the caller
+    is recorded as the job's owner (needed to delete it).
     """
     try:
         logger.info(
@@ -45,27 +59,28 @@ async def upload_job(
         
         text_content = ""
         filename = "text_input.txt"
+        upload = previous = None
         
         # Step 1: Extract text from file or use provided text
         if file and file.filename:
             try:
-                filename = file.filename
-                # Sanitize filename to prevent path traversal
-                safe_filename = Path(filename).name
-                file_path = UPLOAD_DIR / safe_filename
+                filename = Path(file.filename).name
                 
-                # Read file content
-                file_content = await file.read()
-                if not file_content:
+                # Stream the file to content-addressed storage (size-capped, hashed on the way)
+                upload = await store_upload(file, UPLOAD_DIR)
+                if not upload.size:
+                    upload.path.unlink(missing_ok=True)
                     raise HTTPException(status_code=400, detail="Uploaded file is empty")
                 
-                # Save file
-                with open(file_path, "wb") as f:
-                    f.write(file_content)
-                
-                # Extract text from file
-                text_content = extract_text_from_file(file_path)
-                logger.info(f"Extracted {len(text_content)} characters from file {filename}")
+                previous = await find_extracted(jobs_collection, upload.sha256, "job_text")
+                if previous:
+                    # Same file uploaded before: reuse its text instead of extracting again
+                    text_content = previous["job_text"]
+                    logger.info(f"Reusing text extracted from an identical upload of {filename}")
+                else:
+                    # Extract text from file
+                    text_content = await extract_text_async(upload.path)
+                    logger.info(f"Extracted {len(text_content)} characters from file {filename}")
                 
             except HTTPException:
                 raise
@@ -97,29 +112,43 @@ async def upload_job(
                 detail="No text content available to save"
             )
 
-        # Step 2: Extract entities using NER (LLM) - safe mode doesn't fail on errors
-        logger.info(f"Extracting entities from job: {filename or 'text input'}")
-        entities = extract_entities_safe(text_content)
-
-        # Step 3: Save data to MongoDB
+        # Step 2: Save data to MongoDB
+        # Entities of an identical earlier upload are reused unless a NER mode is asked for
+        reuse_entities = previous is not None and ner_mode is None and has_entities(previous)
+        embedding = (previous or {}).get("embedding") or {}
         job_data = {
             "title": title or "Untitled",
             "description": description or "",
             "filename": filename,
+            "file_path": str(upload.path) if upload else None,
+            "file_sha256": upload.sha256 if upload else None,
             "text": text_content,
             "job_text": text_content,  # Store as both 'text' and 'job_text' for compatibility
-            "entities": entities,  # Store extracted entities
-            "created_at": datetime.now(UTC)
+            # Filled in by entity extraction
+            "entities": previous["entities"] if reuse_entities else {"raw": {}, "structured": {}},
+            # Cached for similarity scoring
+            "embedding": embedding if is_current_embedding(embedding) else await build_embedding(text_content),
+            "created_at": datetime.now(UTC),
+            # Uploader, when authenticated: only they can delete the job or list its top CVs
+            "user_id": str(current_user["_id"]) if current_user else None
         }
 
         try:
             result = await jobs_collection.insert_one(job_data)
             job_id = str(result.inserted_id)
             logger.info(f"Job saved successfully with ID: {job_id}")
+            await _index_jobs([job_id], [job_data["embedding"]["vector"]])
+
+            # Step 3: Extract entities in the background worker (inline in fast mode)
+            task_id = None
+            if not reuse_entities:
+                task_id = await schedule_entity_extraction(NER_JOB, job_id, text_content, ner_mode)
             
             return {
                 "message": "Job uploaded successfully",
                 "job_id": job_id,
+                "task_id": task_id,
+                "reused_extraction": previous is not None,
                 "file_name": filename
             }
         except Exception as e:
@@ -138,3 +167,65 @@ async def upload_job(
             status_code=500,
             detail=f"Error processing job: {str(e)}"
         )
+
+
+@router.post("/upload/bulk")
+async def upload_jobs_bulk(
+    files: List[UploadFile] = File(...),
+    ner_mode: Optional[Literal["llm", "hybrid", "fast"]] = Query(None),
+    current_user: Optional[dict] = Depends(get_optional_user)
+) -> dict:
+    """
+    Upload many job description files (PDF, DOCX, TXT) or ZIP archives of
+    them in one request, e.g. a job pack.
+
+    Each job is titled after its file name. Files are extracted concurrently
+    and saved with a single insert; the response lists each file with its
+    status (stored / failed / skipped), its `id` and NER `task_id`. A failing
+    file does not fail the others.
+    """
+    def job_document(item: BulkItem) -> dict:
+        return {
+            "title": Path(item.name).stem,
+            "description": "",
+            "filename": item.name,
+            "file_path": str(item.upload.path),
+            "file_sha256": item.upload.sha256,
+            "text": item.text,
+            "job_text": item.text,
+            "entities": item.entities,
+            "embedding": item.embedding,
+            "created_at": datetime.now(UTC),
+            "user_id": str(current_user["_id"]) if current_user else None
+        }
+
+    items = await bulk_ingest(
+        files,
+        root=UPLOAD_DIR,
+        extensions=(".pdf", ".docx", ".txt"),
+        collection=jobs_collection,
+        text_field="job_text",
+        task_type=NER_JOB,
+        make_document=job_document,
+        ner_mode=ner_mode,
+    )
+
+    stored = [item for item in items if item.status == STORED]
+    await _index_jobs([item.document_id for item in stored], [item.embedding["vector"] for item in stored])
+    return bulk_report(items)
+
+
+async def _index_jobs(job_ids: List[str], vectors: List[List[float]]) -> None:
+    """Push saved jobs into the ranking index; best effort, the next index refresh picks up any it misses."""
+    try:
+        await job_index.add_many(job_ids, vectors)
+    except Exception as e:
+        logger.error(f"Could not add {len(job_ids)} jobs to the ranking index: {e}", exc_info=True)
+
+
+@router.delete("/{job_id}")
+async def delete_job(job: dict = Depends(get_owned_job)) -> dict:
+    """Delete a job description (uploader only) and drop it from the job embedding index"""
+    await jobs_collection.delete_one({"_id": job["_id"]})
+    await job_index.remove(str(job["_id"]))
+    return {"message": "Job deleted"}
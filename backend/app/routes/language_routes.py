@@ -3,6 +3,8 @@ from fastapi import APIRouter, HTTPException, Depends
 from ..models.cvProfile import Language, LanguageInDB
 from ..database import languages_collection
 from ..auth.dependencies import get_current_user
+from ..services.cv_profile_service import SECTION_LANGUAGES
+from ..services.similarity_service import invalidate_section_embeddings
 from bson import ObjectId
 
 router = APIRouter(prefix="/languages", tags=["Languages"])
@@ -15,6 +17,7 @@ async def create_language(lang: Language, current_user: dict = Depends(get_curre
     
     # Convert MongoDB _id to id string
     lang_data["id"] = str(result.inserted_id)
+    await invalidate_section_embeddings(str(current_user["_id"]), SECTION_LANGUAGES)
     return LanguageInDB(**lang_data)
 
 @router.get("/", response_model=list[LanguageInDB])
@@ -43,6 +46,7 @@ async def update_language(lang_id: str, lang: Language, current_user: dict = Dep
     
     # Convert _id to id
     updated["id"] = str(updated.pop("_id"))
+    await invalidate_section_embeddings(str(current_user["_id"]), SECTION_LANGUAGES)
     return LanguageInDB(**updated)
 
 @router.delete("/{lang_id}")
@@ -55,4 +59,5 @@ async def delete_language(lang_id: str, current_user: dict = Depends(get_current
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Language not found")
     
+    await invalidate_section_embeddings(str(current_user["_id"]), SECTION_LANGUAGES)
     return {"message": "Language deleted"}
\ No newline at end of file
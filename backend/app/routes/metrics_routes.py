@@ -0,0 +1,9 @@
+from fastapi import APIRouter
+from app.utils import metrics
+
+router = APIRouter(prefix="/metrics", tags=["Metrics"])
+
+@router.get("/")
+async def get_metrics() -> dict:
+    """Return the in-process metrics of this worker"""
+    return {"metrics": metrics.snapshot()}
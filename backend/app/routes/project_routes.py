@@ -3,6 +3,8 @@ from fastapi import APIRouter, HTTPException, Depends
 from ..models.cvProfile import Project, ProjectInDB
 from ..database import projects_collection
 from ..auth.dependencies import get_current_user
+from ..services.cv_profile_service import SECTION_PROJECTS
+from ..services.similarity_service import invalidate_section_embeddings
 from bson import ObjectId
 
 router = APIRouter(prefix="/projects", tags=["Projects"])
@@ -15,6 +17,7 @@ async def create_project(project: Project, current_user: dict = Depends(get_curr
     
     # Convert MongoDB _id to id string
     project_data["id"] = str(result.inserted_id)
+    await invalidate_section_embeddings(str(current_user["_id"]), SECTION_PROJECTS)
     return ProjectInDB(**project_data)
 
 @router.get("/", response_model=list[ProjectInDB])
@@ -43,6 +46,7 @@ async def update_project(project_id: str, project: Project, current_user: dict =
     
     # Convert _id to id
     updated["id"] = str(updated.pop("_id"))
+    await invalidate_section_embeddings(str(current_user["_id"]), SECTION_PROJECTS)
     return ProjectInDB(**updated)
 
 @router.delete("/{project_id}")
@@ -55,4 +59,5 @@ async def delete_project(project_id: str, current_user: dict = Depends(get_curre
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Project not found")
     
+    await invalidate_section_embeddings(str(current_user["_id"]), SECTION_PROJECTS)
     return {"message": "Project deleted"}
\ No newline at end of file
@@ -1,7 +1,8 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query
 from bson import ObjectId
 from app.database import cvs_collection, jobs_collection
-from app.services.similarity_service import compute_similarity
+from app.services.similarity_service import compute_document_similarity, get_document_vector
+from app.services.ranking_service import job_index
 
 router = APIRouter(prefix="/similarity", tags=["Similarity"])
 
@@ -15,7 +16,7 @@ async def test_similarity(cv_id: str, job_id: str):
         if not cv or not job:
             raise HTTPException(status_code=404, detail="CV or Job not found")
 
-        score = compute_similarity(cv.get("raw_text", ""), job.get("job_text", ""))
+        score = await compute_document_similarity(cv, job)
 
         return {
             "cv_id": cv_id,
@@ -28,5 +29,28 @@ async def test_similarity(cv_id: str, job_id: str):
             )
         }
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/nearest-jobs")
+async def nearest_jobs(
+    cv_id: str,
+    k: int = Query(10, ge=1, le=100),
+    nprobe: int | None = Query(None, ge=1)
+):
+    """Return the K jobs whose embeddings are closest to the CV (scores only)"""
+    if not ObjectId.is_valid(cv_id):
+        raise HTTPException(status_code=400, detail="Invalid CV ID")
+
+    cv = await cvs_collection.find_one({"_id": ObjectId(cv_id)})
+    if not cv:
+        raise HTTPException(status_code=404, detail="CV not found")
+
+    cv_vector = await get_document_vector(cvs_collection, cv, cv.get("raw_text", ""))
+    ranked = await job_index.top_k(cv_vector, k, nprobe=nprobe)
+    return {
+        "cv_id": cv_id,
+        "results": [{"job_id": job_id, "similarity_score": score} for job_id, score in ranked]
+    }
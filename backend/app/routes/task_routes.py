@@ -0,0 +1,20 @@
+"""
+Task Routes: status and results of background tasks (see services/task_queue.py).
+"""
+from fastapi import APIRouter, Depends, HTTPException
+
+from app.auth.dependencies import get_current_user
+from app.services import task_queue
+
+router = APIRouter(prefix="/tasks", tags=["Tasks"])
+
+
+@router.get("/{task_id}")
+async def get_task_status(task_id: str, current_user: dict = Depends(get_current_user)) -> dict:
+    """Status of a background task, with its result once it has succeeded."""
+    task = await task_queue.get_task(task_id)
+    if not task:
+        raise HTTPException(status_code=404, detail="Task not found")
+    if task.get("user_id") and task["user_id"] != str(current_user["_id"]):
+        raise HTTPException(status_code=403, detail="Forbidden: You do not own this task")
+    return task_queue.task_to_response(task)
@@ -3,6 +3,8 @@ from fastapi import APIRouter, HTTPException, Depends
 from ..models.cvProfile import Technology, TechnologyInDB
 from ..database import technologies_collection
 from ..auth.dependencies import get_current_user
+from ..services.cv_profile_service import SECTION_TECHNOLOGIES
+from ..services.similarity_service import invalidate_section_embeddings
 from bson import ObjectId
 
 router = APIRouter(prefix="/technologies", tags=["Technologies"])
@@ -15,6 +17,7 @@ async def create_technology(tech: Technology, current_user: dict = Depends(get_c
     
     # Convert MongoDB _id to id string
     tech_data["id"] = str(result.inserted_id)
+    await invalidate_section_embeddings(str(current_user["_id"]), SECTION_TECHNOLOGIES)
     return TechnologyInDB(**tech_data)
 
 @router.get("/", response_model=list[TechnologyInDB])
@@ -43,6 +46,7 @@ async def update_technology(tech_id: str, tech: Technology, current_user: dict =
     
     # Convert _id to id
     updated["id"] = str(updated.pop("_id"))
+    await invalidate_section_embeddings(str(current_user["_id"]), SECTION_TECHNOLOGIES)
     return TechnologyInDB(**updated)
 
 @router.delete("/{tech_id}")
@@ -55,4 +59,5 @@ async def delete_technology(tech_id: str, current_user: dict = Depends(get_curre
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Technology not found")
     
+    await invalidate_section_embeddings(str(current_user["_id"]), SECTION_TECHNOLOGIES)
     return {"message": "Technology deleted"}
\ No newline at end of file
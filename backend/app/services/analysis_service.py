@@ -0,0 +1,58 @@
+"""
+Analysis Service: CV/job match analysis.
+
+Shared by the /analysis routes and tailored CV generation (which checks the
+match score before calling the LLM): semantic similarity of the stored
+embeddings plus keyword coverage.
+"""
+from bson import ObjectId
+from fastapi import HTTPException
+
+from app.database import cvs_collection, jobs_collection
+from app.services.keyword_service import extract_keywords, find_common_keywords, get_keyword_coverage
+from app.services.similarity_service import compute_document_similarity, job_text_of
+
+
+def match_level(similarity: float) -> str:
+    if similarity >= 0.8:
+        return "High"
+    elif similarity >= 0.65:
+        return "Medium"
+    elif similarity >= 0.5:
+        return "Low"
+    return "Very Low"
+
+
+async def analyze_cv_job(cv_id: str, job_id: str) -> dict:
+    """Similarity between a CV and a Job with keywords and detailed metrics"""
+    cv = await cvs_collection.find_one({"_id": ObjectId(cv_id)})
+    job = await jobs_collection.find_one({"_id": ObjectId(job_id)})
+
+    if not cv or not job:
+        raise HTTPException(status_code=404, detail="CV or Job not found")
+
+    cv_text = cv.get("raw_text", "")
+    job_text = job_text_of(job)
+    
+    # Compute semantic similarity (embeddings are cached on the documents)
+    similarity = await compute_document_similarity(cv, job)
+    
+    # Extract keywords
+    cv_keywords = extract_keywords(cv_text, max_keywords=20)
+    job_keywords = extract_keywords(job_text, max_keywords=20)
+    common_keywords = find_common_keywords(cv_keywords, job_keywords)
+    keyword_coverage = get_keyword_coverage(cv_keywords, job_keywords)
+    
+    return {
+        "cv_id": cv_id,
+        "job_id": job_id,
+        "similarity": similarity,
+        "similarity_score": similarity,  # For compatibility
+        "match_level": match_level(similarity),
+        "cv_keywords": cv_keywords,
+        "job_keywords": job_keywords,
+        "common_keywords": common_keywords,
+        "keyword_coverage": keyword_coverage,
+        "keyword_match_count": len(common_keywords),
+        "total_job_keywords": len(job_keywords)
+    }
@@ -0,0 +1,270 @@
+"""
+ANN Index: in-process approximate nearest neighbour search over embeddings.
+
+A small IVF (inverted file) index written with NumPy only:
+- vectors are clustered with spherical k-means into `n_lists` cells,
+- a query only scores the vectors of its `nprobe` closest cells,
+- deletes are tombstones, compacted once they pile up,
+- the whole index can be snapshotted to / restored from a .npz file.
+
+Below `exact_threshold` live vectors (or before the first training) the
+search is exact, which is both faster and lossless for small corpora.
+"""
+import logging
+import os
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.clip(norms, 1e-12, None)
+
+
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k highest scores, best first."""
+    if k <= 0 or scores.size == 0:
+        return np.empty(0, dtype=np.int64)
+    if k >= scores.size:
+        return np.argsort(-scores)
+    candidates = np.argpartition(-scores, k - 1)[:k]
+    return candidates[np.argsort(-scores[candidates])]
+
+
+class IVFIndex:
+    """Inverted-file cosine index with tombstone deletes and .npz snapshots."""
+
+    def __init__(
+        self,
+        n_lists: int = 0,
+        nprobe: int = 8,
+        exact_threshold: int = 5000,
+        compact_ratio: float = 0.2,
+        seed: int = 42,
+    ):
+        self.n_lists = n_lists  # 0 = choose sqrt(n) at training time
+        self.nprobe = nprobe
+        self.exact_threshold = exact_threshold
+        self.compact_ratio = compact_ratio
+        self.seed = seed
+
+        self._vectors = np.zeros((0, 0), dtype=np.float32)
+        self._size = 0
+        self._ids: List[str] = []
+        self._row_of: Dict[str, int] = {}
+        self._deleted = np.zeros(0, dtype=bool)
+        self._assign = np.zeros(0, dtype=np.int32)
+        self._centroids: Optional[np.ndarray] = None
+        self._lists: List[List[int]] = []
+        self._trained_size = 0
+
+    # ---------------------------
+    # Introspection
+    # ---------------------------
+    def __len__(self) -> int:
+        return len(self._row_of)
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._row_of
+
+    def ids(self) -> List[str]:
+        """Ids of the live (not tombstoned) vectors."""
+        return list(self._row_of)
+
+    @property
+    def is_trained(self) -> bool:
+        return self._centroids is not None
+
+    @property
+    def tombstones(self) -> int:
+        return self._size - len(self._row_of)
+
+    # ---------------------------
+    # Mutations
+    # ---------------------------
+    def _ensure_capacity(self, dim: int, extra: int) -> None:
+        if self._vectors.shape[1] == 0:
+            self._vectors = np.zeros((max(extra, 64), dim), dtype=np.float32)
+            self._deleted = np.zeros(len(self._vectors), dtype=bool)
+            self._assign = np.full(len(self._vectors), -1, dtype=np.int32)
+            return
+        if dim != self._vectors.shape[1]:
+            raise ValueError(f"Vector dimension {dim} does not match index dimension {self._vectors.shape[1]}")
+        needed = self._size + extra
+        if needed > len(self._vectors):
+            capacity = max(needed, 2 * len(self._vectors))
+            vectors = np.zeros((capacity, dim), dtype=np.float32)
+            vectors[: self._size] = self._vectors[: self._size]
+            deleted = np.zeros(capacity, dtype=bool)
+            deleted[: self._size] = self._deleted[: self._size]
+            assign = np.full(capacity, -1, dtype=np.int32)
+            assign[: self._size] = self._assign[: self._size]
+            self._vectors, self._deleted, self._assign = vectors, deleted, assign
+
+    def add(self, ids: List[str], vectors: np.ndarray) -> None:
+        """Insert (or replace) vectors; existing ids are tombstoned first."""
+        vectors = _normalize(np.atleast_2d(np.asarray(vectors, dtype=np.float32)))
+        if len(ids) != len(vectors):
+            raise ValueError("ids and vectors must have the same length")
+        if not len(ids):
+            return
+
+        for doc_id in ids:
+            self.remove(doc_id)
+        self._ensure_capacity(vectors.shape[1], len(ids))
+
+        start = self._size
+        self._vectors[start: start + len(ids)] = vectors
+        self._size += len(ids)
+        for offset, doc_id in enumerate(ids):
+            self._ids.append(doc_id)
+            self._row_of[doc_id] = start + offset
+
+        if self.is_trained:
+            cells = np.argmax(vectors @ self._centroids.T, axis=1)
+            for offset, cell in enumerate(cells):
+                self._assign[start + offset] = cell
+                self._lists[cell].append(start + offset)
+
+        # Retrain once the corpus outgrew the clustering it was trained on
+        if len(self) >= self.exact_threshold and (not self.is_trained or len(self) >= 4 * self._trained_size):
+            self.train()
+
+    def remove(self, doc_id: str) -> bool:
+        """Tombstone a vector. Returns False if the id is unknown."""
+        row = self._row_of.pop(doc_id, None)
+        if row is None:
+            return False
+        self._deleted[row] = True
+        if self._size and self.tombstones / self._size > self.compact_ratio:
+            self.compact()
+        return True
+
+    def compact(self) -> None:
+        """Drop tombstoned rows and rebuild the inverted lists."""
+        live = np.flatnonzero(~self._deleted[: self._size])
+        self._vectors = self._vectors[live].copy()
+        self._ids = [self._ids[i] for i in live]
+        self._assign = self._assign[live].copy()
+        self._size = len(live)
+        self._deleted = np.zeros(self._size, dtype=bool)
+        self._row_of = {doc_id: row for row, doc_id in enumerate(self._ids)}
+        self._rebuild_lists()
+
+    def train(self, iterations: int = 10) -> None:
+        """Cluster the live vectors with spherical k-means and reassign every row."""
+        if self.tombstones:
+            self.compact()
+        data = self._vectors[: self._size]
+        if not len(data):
+            return
+        n_lists = self.n_lists or max(1, int(np.sqrt(len(data))))
+        n_lists = min(n_lists, len(data))
+
+        rng = np.random.default_rng(self.seed)
+        centroids = data[rng.choice(len(data), size=n_lists, replace=False)].copy()
+        for _ in range(iterations):
+            assign = np.argmax(data @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assign, data)
+            counts = np.bincount(assign, minlength=n_lists)
+            empty = counts == 0
+            # Re-seed empty cells with random points so every list stays useful
+            sums[empty] = data[rng.choice(len(data), size=int(empty.sum()))]
+            centroids = _normalize(sums)
+
+        self._centroids = centroids.astype(np.float32)
+        self._assign[: self._size] = np.argmax(data @ self._centroids.T, axis=1)
+        self._trained_size = len(data)
+        self._rebuild_lists()
+        logger.info(f"IVF index trained: {len(data)} vectors in {n_lists} lists")
+
+    def _rebuild_lists(self) -> None:
+        if not self.is_trained:
+            self._lists = []
+            return
+        self._lists = [[] for _ in range(len(self._centroids))]
+        for row in range(self._size):
+            if not self._deleted[row]:
+                self._lists[self._assign[row]].append(row)
+
+    # ---------------------------
+    # Search
+    # ---------------------------
+    def search(self, query: np.ndarray, k: int, nprobe: Optional[int] = None) -> List[Tuple[str, float]]:
+        """Return up to k (id, cosine similarity) pairs, best first."""
+        if k <= 0 or not len(self):
+            return []
+        query = _normalize(np.asarray(query, dtype=np.float32).ravel())
+
+        if not self.is_trained or len(self) < self.exact_threshold:
+            rows = np.flatnonzero(~self._deleted[: self._size])
+        else:
+            nprobe = min(nprobe or self.nprobe, len(self._centroids))
+            cells = top_k_indices(self._centroids @ query, nprobe)
+            rows = np.fromiter(
+                (row for cell in cells for row in self._lists[cell] if not self._deleted[row]),
+                dtype=np.int64,
+            )
+        if not rows.size:
+            return []
+
+        scores = self._vectors[rows] @ query
+        best = top_k_indices(scores, k)
+        return [(self._ids[rows[i]], float(scores[i])) for i in best]
+
+    # ---------------------------
+    # Snapshots
+    # ---------------------------
+    def snapshot_arrays(self) -> Dict[str, np.ndarray]:
+        """Compact, then copy the arrays a snapshot is made of (safe to write from another thread)."""
+        if self.tombstones:
+            self.compact()
+        return {
+            "vectors": self._vectors[: self._size].copy(),
+            "ids": np.asarray(self._ids, dtype=str),
+            "assign": self._assign[: self._size].copy(),
+            "centroids": self._centroids.copy() if self.is_trained else np.zeros((0, 0), dtype=np.float32),
+            "params": np.asarray([self.n_lists, self.nprobe, self.exact_threshold, self._trained_size]),
+        }
+
+    def save(self, path: Path, **meta: str) -> None:
+        """Atomically write a compacted snapshot (plus string metadata) to `path`."""
+        write_snapshot(path, self.snapshot_arrays(), **meta)
+
+    @classmethod
+    def load(cls, path: Path) -> Tuple["IVFIndex", Dict[str, str]]:
+        """Restore an index saved with save(); returns (index, metadata)."""
+        with np.load(Path(path)) as data:
+            n_lists, nprobe, exact_threshold, trained_size = (int(v) for v in data["params"])
+            index = cls(n_lists=n_lists, nprobe=nprobe, exact_threshold=exact_threshold)
+            index._vectors = data["vectors"].astype(np.float32)
+            index._ids = [str(doc_id) for doc_id in data["ids"]]
+            index._size = len(index._ids)
+            index._row_of = {doc_id: row for row, doc_id in enumerate(index._ids)}
+            index._deleted = np.zeros(index._size, dtype=bool)
+            index._assign = data["assign"].astype(np.int32)
+            if data["centroids"].size:
+                index._centroids = data["centroids"].astype(np.float32)
+                index._trained_size = trained_size
+            index._rebuild_lists()
+            meta = dict(zip((str(k) for k in data["meta_keys"]), (str(v) for v in data["meta_values"])))
+        return index, meta
+
+
+def write_snapshot(path: Path, arrays: Dict[str, np.ndarray], **meta: str) -> None:
+    """Atomically write arrays from `IVFIndex.snapshot_arrays()` (plus string metadata) to `path`."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(".tmp.npz")
+    np.savez(
+        tmp_path,
+        **arrays,
+        meta_keys=np.asarray(list(meta.keys()), dtype=str),
+        meta_values=np.asarray(list(meta.values()), dtype=str),
+    )
+    os.replace(tmp_path, path)
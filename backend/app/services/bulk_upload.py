@@ -0,0 +1,306 @@
+"""
+Bulk Upload: ingest many CV/job files, or ZIP archives of them, in one request.
+
+- Files are streamed one at a time to content-addressed storage
+  (utils/uploads.py). A ZIP archive is spooled to a temporary file and its
+  entries are streamed out of it one at a time. Nothing is held in memory
+  whole, and each entry has the same size cap as a single upload.
+- Duplicates reuse an earlier extraction. A file counts as a duplicate when
+  a stored document has the same hash (one `$in` lookup for the batch) or
+  when it appeared earlier in the same batch. Other files are extracted
+  BULK_UPLOAD_CONCURRENCY at a time: text through the extraction pool,
+  embedding through the embedding micro-batcher, and entities inline in
+  "fast" NER mode.
+- All documents are written with a single insert_many. NER tasks for the
+  worker are then enqueued with a single insert.
+
+Every file gets its own status (stored / failed / skipped): a corrupt or
+oversized file fails alone instead of failing the batch.
+"""
+import asyncio
+import logging
+import shutil
+import tempfile
+import zipfile
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException, UploadFile
+from pymongo.errors import BulkWriteError
+
+from app.config import settings
+from app.services.document_dedup import find_extracted_many, has_entities
+from app.services.ner_service import extract_and_structure_entities
+from app.services.similarity_service import build_embedding, is_current_embedding
+from app.services.task_handlers import enqueue_entity_extraction_many
+from app.utils.extract_text import extract_text_async
+from app.utils.uploads import StoredUpload, store_upload
+
+logger = logging.getLogger(__name__)
+
+STORED, FAILED, SKIPPED = "stored", "failed", "skipped"
+
+
+@dataclass
+class BulkItem:
+    """One file of a bulk upload and what happened to it."""
+    filename: str  # as listed in the report ("archive.zip/dir/cv.pdf" for ZIP entries)
+    upload: Optional[StoredUpload] = None
+    status: str = STORED
+    detail: Optional[str] = None
+    text: str = ""
+    entities: dict = field(default_factory=lambda: {"raw": {}, "structured": {}})
+    embedding: dict = field(default_factory=dict)
+    needs_ner: bool = True  # entities still to be extracted by the worker
+    reused_extraction: bool = False
+    document_id: Optional[str] = None
+    task_id: Optional[str] = None
+
+    @property
+    def name(self) -> str:
+        """The file name without its archive path."""
+        return Path(self.filename).name
+
+    def fail(self, detail: str, status: str = FAILED) -> None:
+        self.status, self.detail = status, detail
+
+    def report(self) -> dict:
+        return {
+            "filename": self.filename,
+            "status": self.status,
+            "detail": self.detail,
+            "id": self.document_id,
+            "task_id": self.task_id,
+            "reused_extraction": self.reused_extraction,
+        }
+
+
+def _supported(name: str, extensions: Sequence[str]) -> bool:
+    return name.lower().endswith(tuple(extensions))
+
+
+def _is_archive_junk(entry: str) -> bool:
+    # macOS resource forks and hidden files zipped along with the documents
+    return entry.startswith("__MACOSX/") or Path(entry).name.startswith(".")
+
+
+class _Budget:
+    """How many more files this request may store (BULK_UPLOAD_MAX_FILES)."""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.left = limit
+
+    def take(self, item: BulkItem) -> bool:
+        if self.left <= 0:
+            item.fail(f"Too many files in one request (maximum {self.limit})", SKIPPED)
+            return False
+        self.left -= 1
+        return True
+
+
+async def _store(file: UploadFile, filename: str, root: Path, extensions: Sequence[str], budget: _Budget) -> BulkItem:
+    item = BulkItem(filename)
+    if not _supported(item.name, extensions):
+        item.fail(f"Unsupported file type (expected {', '.join(extensions)})", SKIPPED)
+        return item
+    if not budget.take(item):
+        return item
+
+    try:
+        item.upload = await store_upload(file, root)
+        if not item.upload.size:
+            item.upload.path.unlink(missing_ok=True)
+            item.fail("File is empty")
+    except HTTPException as e:
+        item.fail(e.detail)
+    except Exception as e:
+        logger.warning(f"Bulk upload: could not store {filename}: {e}")
+        item.fail(f"Could not read file: {e}")
+    return item
+
+
+async def _expand_archive(
+    file: UploadFile, root: Path, extensions: Sequence[str], budget: _Budget
+) -> List[BulkItem]:
+    archive_name = Path(file.filename or "archive.zip").name
+    spool = Path(await asyncio.to_thread(tempfile.mkdtemp, prefix=".bulk-", dir=root))
+    try:
+        try:
+            archive = await store_upload(file, spool, max_bytes=settings.BULK_UPLOAD_MAX_ARCHIVE_BYTES)
+            zip_file = await asyncio.to_thread(zipfile.ZipFile, archive.path)
+        except HTTPException as e:
+            return [BulkItem(archive_name, status=FAILED, detail=e.detail)]
+        except zipfile.BadZipFile:
+            return [BulkItem(archive_name, status=FAILED, detail="Not a valid ZIP archive")]
+
+        items: List[BulkItem] = []
+        with zip_file:
+            for info in zip_file.infolist():
+                if info.is_dir() or _is_archive_junk(info.filename):
+                    continue
+                entry_name = f"{archive_name}/{info.filename}"
+                try:
+                    entry = await asyncio.to_thread(zip_file.open, info)
+                except (RuntimeError, NotImplementedError, zipfile.BadZipFile) as e:
+                    # Encrypted entries or unsupported compression methods
+                    items.append(BulkItem(entry_name, status=FAILED, detail=f"Cannot read archive entry: {e}"))
+                    continue
+                with entry:
+                    # The declared size lets store_upload refuse oversized entries
+                    # before inflating them; the streamed byte count is still capped
+                    upload = UploadFile(entry, filename=Path(info.filename).name, size=info.file_size)
+                    items.append(await _store(upload, entry_name, root, extensions, budget))
+        logger.info(f"Bulk upload: expanded {archive_name} into {len(items)} files")
+        return items
+    finally:
+        await asyncio.to_thread(shutil.rmtree, spool, True)
+
+
+async def collect_uploads(files: List[UploadFile], root: Path, extensions: Sequence[str]) -> List[BulkItem]:
+    """
+    Store the uploaded files, and the entries of uploaded ZIP archives, under
+    `root`. Only files with one of `extensions` are kept.
+    """
+    budget = _Budget(settings.BULK_UPLOAD_MAX_FILES)
+    items: List[BulkItem] = []
+    for file in files:
+        filename = Path(file.filename or "").name
+        if filename.lower().endswith(".zip"):
+            items.extend(await _expand_archive(file, root, extensions, budget))
+        else:
+            items.append(await _store(file, filename, root, extensions, budget))
+    return items
+
+
+async def _extract(
+    path: Path, previous: Optional[dict], text_field: str, ner_mode: Optional[str], max_pages: int
+) -> Tuple[str, Optional[dict], dict]:
+    """Text, entities (None when the worker has to extract them) and embedding of one file."""
+    text = previous[text_field] if previous else await extract_text_async(path, max_pages)
+    if not text.strip():
+        raise HTTPException(status_code=422, detail="No text could be extracted from the file")
+
+    entities = None
+    if previous is not None and ner_mode is None and has_entities(previous):
+        entities = previous["entities"]
+    elif (ner_mode or settings.NER_MODE) == "fast":
+        entities = await extract_and_structure_entities(text, "fast")
+
+    embedding = (previous or {}).get("embedding") or {}
+    if not is_current_embedding(embedding):
+        embedding = await build_embedding(text)
+    return text, entities, embedding
+
+
+async def extract_all(
+    items: List[BulkItem], collection, text_field: str, ner_mode: Optional[str] = None, max_pages: int = 0
+) -> None:
+    """
+    Fill in text, entities and embedding of the stored items, each distinct
+    file once (PDFs up to `max_pages` pages, 0 = all).
+    """
+    pending = [item for item in items if item.status == STORED]
+    previous = await find_extracted_many(collection, (item.upload.sha256 for item in pending), text_field)
+    semaphore = asyncio.Semaphore(max(1, settings.BULK_UPLOAD_CONCURRENCY))
+
+    async def extract(item: BulkItem):
+        async with semaphore:
+            return await _extract(item.upload.path, previous.get(item.upload.sha256), text_field, ner_mode, max_pages)
+
+    # Files repeated within the batch are extracted once, for their first occurrence
+    first: Dict[str, BulkItem] = {}
+    for item in pending:
+        first.setdefault(item.upload.sha256, item)
+    outcomes = await asyncio.gather(*(extract(item) for item in first.values()), return_exceptions=True)
+    by_hash = dict(zip(first, outcomes))
+
+    for item in pending:
+        sha256 = item.upload.sha256
+        outcome = by_hash[sha256]
+        if isinstance(outcome, HTTPException):
+            item.fail(outcome.detail)
+        elif isinstance(outcome, Exception):
+            logger.error(f"Bulk upload: extraction failed for {item.filename}: {outcome}")
+            item.fail(f"Failed to extract text: {outcome}")
+        else:
+            item.text, entities, item.embedding = outcome
+            if entities is not None:
+                item.entities, item.needs_ner = entities, False
+            item.reused_extraction = sha256 in previous or first[sha256] is not item
+
+
+async def insert_documents(items: List[BulkItem], collection, make_document: Callable[[BulkItem], dict]) -> None:
+    """Write the documents of all extracted items with a single insert_many."""
+    ready = [item for item in items if item.status == STORED]
+    if not ready:
+        return
+    documents = [make_document(item) for item in ready]
+    failed: Dict[int, str] = {}
+    try:
+        await collection.insert_many(documents, ordered=False)
+    except BulkWriteError as e:
+        failed = {error["index"]: error.get("errmsg", "write error") for error in e.details.get("writeErrors", [])}
+        logger.error(f"Bulk upload: {len(failed)} of {len(documents)} documents could not be saved")
+
+    # insert_many sets the _id of each document it was given
+    for index, (item, document) in enumerate(zip(ready, documents)):
+        if index in failed:
+            item.fail(f"Failed to save to database: {failed[index]}")
+        else:
+            item.document_id = str(document["_id"])
+
+
+async def enqueue_entity_extraction(
+    items: List[BulkItem], task_type: str, ner_mode: Optional[str] = None, user_id: Optional[str] = None
+) -> None:
+    """Enqueue the NER tasks of the saved items that still need entities, in one insert."""
+    waiting = [item for item in items if item.status == STORED and item.needs_ner]
+    try:
+        task_ids = await enqueue_entity_extraction_many(
+            task_type, [item.document_id for item in waiting], ner_mode, user_id=user_id
+        )
+    except Exception as e:
+        # The documents are saved: report the missing NER tasks instead of failing them
+        logger.error(f"Bulk upload: could not enqueue {len(waiting)} NER tasks: {e}")
+        for item in waiting:
+            item.detail = "Saved, but entity extraction could not be scheduled"
+        return
+    for item, task_id in zip(waiting, task_ids):
+        item.task_id = task_id
+
+
+async def bulk_ingest(
+    files: List[UploadFile],
+    *,
+    root: Path,
+    extensions: Sequence[str],
+    collection,
+    text_field: str,
+    task_type: str,
+    make_document: Callable[[BulkItem], dict],
+    ner_mode: Optional[str] = None,
+    user_id: Optional[str] = None,
+    max_pages: int = 0,
+) -> List[BulkItem]:
+    """Store, extract, save and schedule NER for a batch of files; returns every item with its status."""
+    items = await collect_uploads(files, root, extensions)
+    await extract_all(items, collection, text_field, ner_mode, max_pages)
+    await insert_documents(items, collection, make_document)
+    await enqueue_entity_extraction(items, task_type, ner_mode, user_id)
+
+    stored = sum(1 for item in items if item.status == STORED)
+    logger.info(f"Bulk upload: {stored} of {len(items)} files stored in '{collection.name}'")
+    return items
+
+
+def bulk_report(items: List[BulkItem]) -> dict:
+    """Response body of the bulk upload endpoints: counts and per-file statuses."""
+    return {
+        "total": len(items),
+        STORED: sum(1 for item in items if item.status == STORED),
+        FAILED: sum(1 for item in items if item.status == FAILED),
+        SKIPPED: sum(1 for item in items if item.status == SKIPPED),
+        "files": [item.report() for item in items],
+    }
@@ -9,6 +9,17 @@ from app.database import (
     competences_collection
 )
 
+# Section titles emitted by cv_profile_to_text ("## <title>"). The header
+# (name, contact, bio, social links) comes before the first title.
+SECTION_PROFILE = "Profile"
+SECTION_COMPETENCES = "Competences"
+SECTION_TECHNOLOGIES = "Technologies"
+SECTION_EXPERIENCE = "Professional Experience"
+SECTION_EDUCATION = "Education"
+SECTION_PROJECTS = "Projects"
+SECTION_CERTIFICATIONS = "Certifications"
+SECTION_LANGUAGES = "Languages"
+
 async def cv_profile_to_text(user_id: str) -> str:
     """
     Convert user's CV profile and all related data into a formatted text string
@@ -55,7 +66,7 @@ async def cv_profile_to_text(user_id: str) -> str:
 
     # === COMPETENCES ===
     if competences:
-        lines.append("\n## Competences")
+        lines.append(f"\n## {SECTION_COMPETENCES}")
         for comp in competences:
             name = comp.get("name")
             if name:
@@ -63,7 +74,7 @@ async def cv_profile_to_text(user_id: str) -> str:
 
     # === TECHNOLOGIES ===
     if technologies:
-        lines.append("\n## Technologies")
+        lines.append(f"\n## {SECTION_TECHNOLOGIES}")
         tech_by_category = {}
         for tech in technologies:
             category = tech.get("category", "Other")
@@ -75,7 +86,7 @@ async def cv_profile_to_text(user_id: str) -> str:
 
     # === EXPERIENCE ===
     if experiences:
-        lines.append("\n## Professional Experience")
+        lines.append(f"\n## {SECTION_EXPERIENCE}")
         for exp in sorted(experiences, key=lambda x: x.get("startDate", ""), reverse=True):
             lines.append(f"\n### {exp.get('position', '')} at {exp.get('company', '')}")
             date_info = f"{exp.get('startDate', '')} - {exp.get('endDate', 'Present')}"
@@ -89,7 +100,7 @@ async def cv_profile_to_text(user_id: str) -> str:
 
     # === EDUCATION ===
     if educations:
-        lines.append("\n## Education")
+        lines.append(f"\n## {SECTION_EDUCATION}")
         for edu in sorted(educations, key=lambda x: x.get("startDate", ""), reverse=True):
             lines.append(f"\n### {edu.get('certificate', '')}")
             lines.append(edu.get("school", ""))
@@ -99,7 +110,7 @@ async def cv_profile_to_text(user_id: str) -> str:
 
     # === PROJECTS ===
     if projects:
-        lines.append("\n## Projects")
+        lines.append(f"\n## {SECTION_PROJECTS}")
         for proj in projects:
             lines.append(f"\n### {proj.get('title', '')}")
             if desc := proj.get("description"):
@@ -113,7 +124,7 @@ async def cv_profile_to_text(user_id: str) -> str:
 
     # === CERTIFICATIONS ===
     if certifications:
-        lines.append("\n## Certifications")
+        lines.append(f"\n## {SECTION_CERTIFICATIONS}")
         for cert in sorted(certifications, key=lambda x: x.get("issueDate", ""), reverse=True):
             lines.append(f"\n### {cert.get('title', '')}")
             issuer_info = f"{cert.get('issuer', '')} | {cert.get('issueDate', '')}"
@@ -123,7 +134,7 @@ async def cv_profile_to_text(user_id: str) -> str:
 
     # === LANGUAGES ===
     if languages:
-        lines.append("\n## Languages")
+        lines.append(f"\n## {SECTION_LANGUAGES}")
         for lang in languages:
             lines.append(f"- {lang.get('name', '')}: {lang.get('level', '')}")
 
@@ -0,0 +1,63 @@
+"""
+Document Dedup: reuse the extraction of byte-identical uploads.
+
+Uploaded files are stored by content hash (utils/uploads.py) and the hash
+is recorded on the CV/job as `file_sha256`. Re-uploading the same file
+copies the raw text, entities and embedding of the earlier record instead
+of extracting the text and running NER again, which turns a duplicate job
+posting into a metadata insert.
+"""
+import logging
+from typing import Dict, Iterable, Optional
+
+from pymongo import ASCENDING
+
+from app.database import cvs_collection, jobs_collection
+
+logger = logging.getLogger(__name__)
+
+
+async def ensure_indexes() -> None:
+    """Index the file hashes (best effort: lookups still work without the index)."""
+    try:
+        await cvs_collection.create_index([("file_sha256", ASCENDING)], sparse=True)
+        await jobs_collection.create_index([("file_sha256", ASCENDING)], sparse=True)
+    except Exception as e:
+        logger.warning(f"Could not create file_sha256 indexes: {e}")
+
+
+async def find_extracted(collection, sha256: str, text_field: str) -> Optional[dict]:
+    """Most recent document of `collection` made from the same file, with its text extracted."""
+    try:
+        return await collection.find_one(
+            {"file_sha256": sha256, text_field: {"$nin": ["", None]}},
+            {text_field: 1, "entities": 1, "embedding": 1},
+            sort=[("_id", -1)],
+        )
+    except Exception as e:
+        logger.warning(f"Duplicate upload lookup failed: {e}")
+        return None
+
+
+async def find_extracted_many(collection, sha256s: Iterable[str], text_field: str) -> Dict[str, dict]:
+    """`find_extracted` for a batch of hashes in one query: hash -> most recent document."""
+    sha256s = list(set(sha256s))
+    if not sha256s:
+        return {}
+    try:
+        cursor = collection.find(
+            {"file_sha256": {"$in": sha256s}, text_field: {"$nin": ["", None]}},
+            {"file_sha256": 1, text_field: 1, "entities": 1, "embedding": 1},
+        ).sort("_id", -1)
+        found: Dict[str, dict] = {}
+        async for document in cursor:
+            found.setdefault(document["file_sha256"], document)
+        return found
+    except Exception as e:
+        logger.warning(f"Duplicate upload lookup failed: {e}")
+        return {}
+
+
+def has_entities(document: dict) -> bool:
+    """True once entity extraction has filled in the document's entities."""
+    return bool((document.get("entities") or {}).get("raw"))
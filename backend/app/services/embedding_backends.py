@@ -0,0 +1,74 @@
+"""
+Embedding Backends: interchangeable CPU inference engines for the similarity model.
+
+- torch: the reference SentenceTransformer in fp32
+- int8:  the same model with its Linear layers dynamically quantized to int8
+- onnx:  the model exported to ONNX and run with onnxruntime (via the
+         sentence-transformers ONNX backend; needs `optimum[onnxruntime]`)
+
+The backend is chosen with settings.EMBEDDING_BACKEND. Every backend exposes
+the SentenceTransformer `encode()` signature, so callers don't care which one
+is loaded. Use `python -m app.bench.embedding_backends` to check parity and
+throughput before switching.
+"""
+import logging
+from typing import Dict
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ("torch", "int8", "onnx")
+
+
+def load_backend(name: str, model_name: str, onnx_file: str | None = None):
+    """Load `model_name` with the requested backend."""
+    from sentence_transformers import SentenceTransformer
+
+    if name == "torch":
+        return SentenceTransformer(model_name, device="cpu")
+
+    if name == "int8":
+        import torch
+
+        model = SentenceTransformer(model_name, device="cpu")
+        # Dynamic quantization: int8 weights, activations quantized on the fly
+        return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+    if name == "onnx":
+        model_kwargs = {"file_name": onnx_file} if onnx_file else None
+        return SentenceTransformer(model_name, device="cpu", backend="onnx", model_kwargs=model_kwargs)
+
+    raise ValueError(f"Unknown embedding backend '{name}' (expected one of {', '.join(BACKENDS)})")
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+    return vectors / np.clip(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12, None)
+
+
+def parity_report(reference: np.ndarray, candidate: np.ndarray) -> Dict[str, float]:
+    """
+    Compare embeddings of the same texts from two backends.
+
+    - vector_cosine_*: cosine between the reference and candidate vector of each text
+    - score_drift_*: absolute change of the pairwise similarity scores
+      (text i vs text j), i.e. what users would see on /analysis
+    """
+    reference, candidate = _normalize(reference), _normalize(candidate)
+    if reference.shape != candidate.shape:
+        raise ValueError(f"Shape mismatch: {reference.shape} vs {candidate.shape}")
+
+    per_text = np.sum(reference * candidate, axis=1)
+    ref_scores = reference @ reference.T
+    cand_scores = candidate @ candidate.T
+    upper = np.triu_indices(len(reference), k=1)
+    drift = np.abs(ref_scores[upper] - cand_scores[upper])
+
+    return {
+        "texts": int(len(reference)),
+        "vector_cosine_mean": round(float(per_text.mean()), 6),
+        "vector_cosine_min": round(float(per_text.min()), 6),
+        "score_drift_mean": round(float(drift.mean()), 6) if drift.size else 0.0,
+        "score_drift_max": round(float(drift.max()), 6) if drift.size else 0.0,
+    }
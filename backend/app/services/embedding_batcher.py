@@ -0,0 +1,78 @@
+"""
+Embedding Batcher: dynamic micro-batching of concurrent encode requests.
+
+Concurrent requests each want one or a few vectors; transformer inference
+is far cheaper per item in batches. The batcher collects texts for up to
+`max_batch_size` items or `max_wait_ms` milliseconds, runs a single batched
+encode, and resolves each caller's future with its own vector.
+"""
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, List, Optional, Set, Tuple
+
+import numpy as np
+
+from app.utils import metrics
+
+logger = logging.getLogger(__name__)
+
+EncodeBatch = Callable[[List[str]], Awaitable[np.ndarray]]
+
+
+class MicroBatcher:
+    def __init__(self, encode_batch: EncodeBatch, max_batch_size: int = 32, max_wait_ms: float = 5.0, name: str = "embedding"):
+        self.encode_batch = encode_batch
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000
+        self._pending: List[Tuple[str, asyncio.Future, float]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        # The loop only keeps weak references to tasks: hold running batches until they finish
+        self._running: Set[asyncio.Task] = set()
+        self._batch_size = metrics.histogram(f"{name}_batch_size", "Items per batched encode")
+        self._queue_delay = metrics.histogram(f"{name}_batch_queue_delay_seconds", "Time an item waited for its batch")
+
+    async def encode(self, text: str) -> np.ndarray:
+        """Encode one text as part of the next batch."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((text, future, time.perf_counter()))
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+        return await future
+
+    async def encode_many(self, texts: List[str]) -> np.ndarray:
+        """Encode several texts; they may be split across or merged into batches."""
+        return np.asarray(await asyncio.gather(*(self.encode(text) for text in texts)))
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        while self._pending:
+            batch = self._pending[: self.max_batch_size]
+            del self._pending[: self.max_batch_size]
+            task = asyncio.get_running_loop().create_task(self._run(batch))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _run(self, batch: List[Tuple[str, asyncio.Future, float]]) -> None:
+        started_at = time.perf_counter()
+        self._batch_size.observe(len(batch))
+        for _, _, enqueued_at in batch:
+            self._queue_delay.observe(started_at - enqueued_at)
+
+        try:
+            vectors = await self.encode_batch([text for text, _, _ in batch])
+        except Exception as e:
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future, _), vector in zip(batch, vectors):
+            if not future.done():
+                future.set_result(vector)
@@ -0,0 +1,351 @@
+"""
+Generation Service: load inputs for and persist tailored CVs.
+
+Shared by the /generate routes and the background worker: checks the
+CV/job match, renders the DOCX and records the result in tailored_cvs.
+
+Results are keyed by (CV text hash, job text hash, model, prompt version):
+a repeated request reuses the stored tailored text instead of calling the
+LLM again (unless forced), and identical requests arriving while a
+generation is running (streamed or not) wait for that one call instead of
+starting their own.
+"""
+import asyncio
+import hashlib
+import logging
+from datetime import datetime, UTC
+from pathlib import Path
+from typing import AsyncIterator, Dict, Optional, Set
+
+from bson import ObjectId
+from docx import Document
+from docx.shared import Pt
+from fastapi import HTTPException
+from pymongo import ASCENDING
+
+from app.config import settings
+from app.database import cvs_collection, jobs_collection, tailored_cvs_collection
+from app.services.analysis_service import analyze_cv_job
+from app.services.llm_scheduler import INTERACTIVE
+from app.services.ollama_client import TAILORED_CV_SYSTEM_PROMPT, generate_tailored_cv, stream_tailored_cv
+from app.utils import metrics
+
+logger = logging.getLogger(__name__)
+
+GENERATED_DIR = Path("generated_cvs")
+GENERATED_DIR.mkdir(parents=True, exist_ok=True)
+
+# Bumped automatically whenever the prompt text changes
+GENERATION_PROMPT_VERSION = hashlib.sha256(TAILORED_CV_SYSTEM_PROMPT.encode("utf-8")).hexdigest()[:16]
+
+_reused = metrics.counter("generation_reused_total", "Tailored CVs served from a previous generation")
+_coalesced = metrics.counter("generation_coalesced_total", "Tailored CV requests that joined an in-flight generation")
+
+# generation_key -> running generation, shared by identical concurrent requests
+_in_flight: Dict[str, asyncio.Task] = {}
+# Keys of running generations another request is waiting for
+_joined: Set[str] = set()
+
+
+async def load_generation_inputs(cv_id: str, job_id: str) -> dict:
+    """
+    Load the CV and job and check the match score.
+
+    Returns {"skipped": response} when the match is too low, otherwise the
+    similarity, texts and job title needed to generate.
+    """
+    cv = await cvs_collection.find_one({"_id": ObjectId(cv_id)})
+    job = await jobs_collection.find_one({"_id": ObjectId(job_id)})
+
+    if not cv or not job:
+        raise HTTPException(status_code=404, detail="CV or Job not found")
+
+    analysis = await analyze_cv_job(cv_id=cv_id, job_id=job_id)
+    similarity = analysis["similarity"]
+
+    if similarity < 0.60:
+        return {"skipped": {"status": "skipped", "similarity": similarity, "message": "Low match score"}}
+
+    cv_text = cv.get("raw_text", "")
+    job_text = job.get("job_text", "")
+
+    if not cv_text or not job_text:
+        raise HTTPException(status_code=400, detail="CV or Job text is empty")
+
+    return {
+        "similarity": similarity,
+        "cv_text": cv_text,
+        "job_text": job_text,
+        "job_title": job.get("title", "Job Position"),
+    }
+
+
+async def ensure_indexes() -> None:
+    """One tailored CV record per CV/job pair (best effort, like the upload hash indexes)."""
+    try:
+        await tailored_cvs_collection.create_index([("cv_id", ASCENDING), ("job_id", ASCENDING)], unique=True)
+    except Exception as e:
+        logger.warning(f"Could not create the tailored_cvs (cv_id, job_id) index: {e}")
+
+
+def tailored_id(cv_id: str, job_id: str) -> str:
+    # The full ids: ObjectId prefixes are timestamps, shared by documents created in the same second
+    return f"tailored_{cv_id}_{job_id}"
+
+
+def generation_key(cv_text: str, job_text: str, model: Optional[str] = None, prompt_version: Optional[str] = None) -> str:
+    """Dedup id: SHA-256 of the CV text + SHA-256 of the job text + Ollama model + prompt version."""
+    cv_hash = hashlib.sha256(cv_text.encode("utf-8")).hexdigest()
+    job_hash = hashlib.sha256(job_text.encode("utf-8")).hexdigest()
+    return f"{cv_hash}:{job_hash}:{model or settings.OLLAMA_MODEL}:{prompt_version or GENERATION_PROMPT_VERSION}"
+
+
+async def save_generated(
+    cv_id: str, job_id: str, similarity: float, tailored_content: str, job_title: str, key: Optional[str] = None
+) -> str:
+    """Render the DOCX and record the tailored CV (one record per CV/job pair); returns its generated_id."""
+    generated_id = tailored_id(cv_id, job_id)
+    output_file = GENERATED_DIR / f"{generated_id}.docx"
+    await asyncio.to_thread(create_docx, tailored_content, output_file, job_title)
+
+    await tailored_cvs_collection.update_one(
+        {"cv_id": cv_id, "job_id": job_id},
+        {"$set": {
+            "generated_id": generated_id,
+            "cv_id": cv_id,
+            "job_id": job_id,
+            "similarity": similarity,
+            "tailored_text": tailored_content,
+            "generation_key": key,
+            "created_at": datetime.now(UTC)
+        }},
+        upsert=True,
+    )
+    return generated_id
+
+
+async def reuse_generated(cv_id: str, job_id: str, inputs: dict, key: str) -> Optional[dict]:
+    """
+    A previous generation for the same texts, model and prompt, attached to
+    this CV/job pair (the DOCX is re-rendered if the pair differs or the file
+    is gone); None when there is none.
+    """
+    try:
+        previous = await tailored_cvs_collection.find_one({"generation_key": key}, sort=[("created_at", -1)])
+    except Exception as e:
+        logger.warning(f"Generated CV lookup failed: {e}")
+        return None
+    if not previous:
+        return None
+
+    _reused.inc()
+    generated_id = previous["generated_id"]
+    # Records of another pair, or saved under an id that was not unique per pair, are re-rendered
+    if generated_id != tailored_id(cv_id, job_id) or not (GENERATED_DIR / f"{generated_id}.docx").exists():
+        generated_id = await save_generated(
+            cv_id, job_id, inputs["similarity"], previous["tailored_text"], inputs["job_title"], key
+        )
+    return {"generated_id": generated_id, "tailored_text": previous["tailored_text"], "reused": True}
+
+
+async def _save_result(cv_id: str, job_id: str, inputs: dict, key: str, tailored_content: str) -> dict:
+    generated_id = await save_generated(
+        cv_id, job_id, inputs["similarity"], tailored_content, inputs["job_title"], key
+    )
+    return {"cv_id": cv_id, "job_id": job_id, "generated_id": generated_id, "tailored_text": tailored_content}
+
+
+async def _generate_and_save(cv_id: str, job_id: str, inputs: dict, key: str, priority: str) -> dict:
+    tailored_content = await generate_tailored_cv(inputs["cv_text"], inputs["job_text"], priority=priority)
+    return await _save_result(cv_id, job_id, inputs, key, tailored_content)
+
+
+def _register(key: str, task: asyncio.Task) -> asyncio.Task:
+    _in_flight[key] = task
+    task.add_done_callback(lambda done: _forget(key, done))
+    return task
+
+
+def in_flight(key: str) -> bool:
+    return key in _in_flight
+
+
+class StreamingGeneration:
+    """
+    A generation streamed to one client, registered in `_in_flight` like
+    the ones started by `get_or_generate`: identical requests (streamed or
+    not) arriving meanwhile wait for its result instead of calling the LLM.
+
+    `chunks()` yields the content as it is generated, `result()` returns
+    what `_generate_and_save` returns once the CV is saved, and `close()`
+    (client gone) stops the generation unless another request joined it.
+    """
+
+    def __init__(self, cv_id: str, job_id: str, inputs: dict, key: str):
+        self.key = key
+        self._chunks: asyncio.Queue = asyncio.Queue()
+        self.task = _register(key, asyncio.create_task(self._run(cv_id, job_id, inputs, key)))
+
+    async def _run(self, cv_id: str, job_id: str, inputs: dict, key: str) -> dict:
+        parts = []
+        try:
+            async for chunk in stream_tailored_cv(inputs["cv_text"], inputs["job_text"]):
+                parts.append(chunk)
+                self._chunks.put_nowait(chunk)
+        finally:
+            self._chunks.put_nowait(None)
+        return await _save_result(cv_id, job_id, inputs, key, "".join(parts))
+
+    async def chunks(self) -> AsyncIterator[str]:
+        while (chunk := await self._chunks.get()) is not None:
+            yield chunk
+
+    async def result(self) -> dict:
+        return await asyncio.shield(self.task)
+
+    def close(self) -> None:
+        if not self.task.done() and self.key not in _joined:
+            self.task.cancel()
+
+
+async def get_or_generate(
+    cv_id: str, job_id: str, inputs: dict, force: bool = False, priority: str = INTERACTIVE
+) -> dict:
+    """
+    Tailored CV for a CV/job pair whose inputs passed `load_generation_inputs`.
+
+    Reuses a stored generation for identical inputs unless `force`, and
+    joins an identical generation already running (even when forced: it is
+    just as fresh). Returns generated_id, tailored_text and `reused`.
+    The generation keeps running and is saved if the caller disconnects.
+    """
+    key = generation_key(inputs["cv_text"], inputs["job_text"])
+    if not force:
+        previous = await reuse_generated(cv_id, job_id, inputs, key)
+        if previous:
+            return previous
+
+    task = _in_flight.get(key)
+    if task is None:
+        task = _register(key, asyncio.create_task(_generate_and_save(cv_id, job_id, inputs, key, priority)))
+        reused = False
+    else:
+        _coalesced.inc()
+        _joined.add(key)
+        reused = True
+
+    # shield: a caller giving up must not cancel the generation others wait on
+    result = await asyncio.shield(task)
+    generated_id = result["generated_id"]
+    if (result["cv_id"], result["job_id"]) != (cv_id, job_id):
+        generated_id = await save_generated(
+            cv_id, job_id, inputs["similarity"], result["tailored_text"], inputs["job_title"], key
+        )
+    return {"generated_id": generated_id, "tailored_text": result["tailored_text"], "reused": reused}
+
+
+def _forget(key: str, task: asyncio.Task) -> None:
+    if _in_flight.get(key) is task:
+        del _in_flight[key]
+        _joined.discard(key)
+    if not task.cancelled() and task.exception() is not None:
+        # Retrieved here so a generation nobody waits for anymore does not
+        # log "exception was never retrieved"; waiters still get it re-raised
+        logger.debug(f"Generation {key[:16]} failed: {task.exception()}")
+
+
+def create_docx(content: str, output_path: Path, job_title: str):
+    """Create a professional, well-formatted DOCX CV file"""
+    from docx.shared import Pt, RGBColor, Inches
+    
+    doc = Document()
+    
+    # Set default font
+    style = doc.styles['Normal']
+    font = style.font
+    font.name = 'Calibri'
+    font.size = Pt(11)
+    
+    # Set margins (professional CV margins)
+    sections = doc.sections
+    for section in sections:
+        section.top_margin = Inches(0.5)
+        section.bottom_margin = Inches(0.5)
+        section.left_margin = Inches(0.7)
+        section.right_margin = Inches(0.7)
+    
+    # Parse content and create professional format
+    lines = content.splitlines()
+    i = 0
+    
+    while i < len(lines):
+        line = lines[i].strip()
+        if not line:
+            i += 1
+            continue
+        
+        # Handle main headings (##)
+        if line.startswith('##'):
+            heading_text = line.lstrip('#').strip()
+            # Skip empty headings
+            if heading_text:
+                # Add spacing before main sections (except first)
+                if i > 0:
+                    doc.add_paragraph()
+                heading = doc.add_heading(heading_text, level=1)
+                if heading.runs:
+                    heading_format = heading.runs[0].font
+                    heading_format.size = Pt(14)
+                    heading_format.bold = True
+                    heading_format.color.rgb = RGBColor(0, 51, 102)
+                    # Add underline to main section headings
+                    heading.runs[0].underline = True
+                
+        # Handle subheadings (###)
+        elif line.startswith('###'):
+            heading_text = line.lstrip('#').strip()
+            if heading_text:
+                subheading = doc.add_heading(heading_text, level=2)
+                if subheading.runs:
+                    subheading_format = subheading.runs[0].font
+                    subheading_format.size = Pt(12)
+                    subheading_format.bold = True
+                    subheading_format.color.rgb = RGBColor(0, 0, 0)  # Black
+                
+        # Handle bullet points
+        elif line.startswith('-') or line.startswith('•') or line.startswith('*'):
+            bullet_text = line.lstrip('-•* ').strip()
+            if bullet_text:
+                p = doc.add_paragraph(bullet_text, style='List Bullet')
+                if p.runs:
+                    p_format = p.runs[0].font
+                    p_format.size = Pt(11)
+                # Adjust bullet indent
+                p.paragraph_format.space_after = Pt(3)
+                
+        # Handle regular paragraphs with potential formatting
+        else:
+            # Check if line contains key information patterns
+            p = doc.add_paragraph(line)
+            if p.runs:
+                p_format = p.runs[0].font
+                if any(keyword in line.lower() for keyword in ['email:', 'phone:', 'linkedin:', 'github:', 'location:']):
+                    p_format.size = Pt(10.5)
+                elif '|' in line and any(keyword in line.lower() for keyword in ['-', 'to', 'present']):
+                    # Likely a date range or location line
+                    p_format.size = Pt(10)
+                    p_format.italic = True
+                    p_format.color.rgb = RGBColor(64, 64, 64)  # Gray
+                else:
+                    p_format.size = Pt(11)
+            
+            # Add small spacing after paragraphs
+            p.paragraph_format.space_after = Pt(6)
+        
+        i += 1
+    
+    # Ensure document ends with proper spacing
+    if doc.paragraphs:
+        doc.paragraphs[-1].paragraph_format.space_after = Pt(0)
+    
+    doc.save(output_path)
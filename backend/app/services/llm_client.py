@@ -0,0 +1,192 @@
+"""
+LLM Client: shared async HTTP client for the Ollama chat API.
+
+One pooled httpx.AsyncClient keeps connections to Ollama alive across
+requests and never blocks the event loop while a model is generating.
+It is created and closed in the app lifespan (`start()` / `close()`); code
+running outside the app (scripts, tests) gets a client lazily on first use.
+Every call goes through the priority scheduler (llm_scheduler.py), which
+caps concurrent calls and rejects them with status 429 when its queue is full.
+"""
+import json
+import logging
+from typing import AsyncIterator, List, Optional
+
+import httpx
+
+from app.config import settings
+from app.services.llm_scheduler import INTERACTIVE, SchedulerFull, scheduler
+
+logger = logging.getLogger(__name__)
+
+OLLAMA_CHAT_ENDPOINT = f"{settings.OLLAMA_API_URL}/api/chat"
+
+
+class LLMError(Exception):
+    """Ollama call failed; `status_code` is the HTTP status to surface to the client."""
+
+    def __init__(self, message: str, status_code: int = 500, retry_after: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+    @property
+    def headers(self) -> Optional[dict]:
+        """Response headers for the HTTPException built from this error."""
+        return {"Retry-After": str(self.retry_after)} if self.retry_after else None
+
+
+def _busy_error(e: SchedulerFull) -> LLMError:
+    return LLMError(
+        f"The language model is busy, please retry in {e.retry_after}s",
+        status_code=429,
+        retry_after=e.retry_after,
+    )
+
+
+_client: Optional[httpx.AsyncClient] = None
+
+
+def _new_client() -> httpx.AsyncClient:
+    limits = httpx.Limits(
+        max_connections=settings.OLLAMA_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.OLLAMA_MAX_CONNECTIONS,
+    )
+    timeout = httpx.Timeout(settings.OLLAMA_GENERATE_TIMEOUT, connect=settings.OLLAMA_CONNECT_TIMEOUT)
+    return httpx.AsyncClient(limits=limits, timeout=timeout)
+
+
+async def start() -> None:
+    """Open the pooled client (called from the app lifespan)."""
+    global _client
+    if _client is None:
+        _client = _new_client()
+
+
+async def close() -> None:
+    """Close the pooled client and its connections."""
+    global _client
+    if _client is not None:
+        client, _client = _client, None
+        await client.aclose()
+
+
+def get_client() -> httpx.AsyncClient:
+    global _client
+    if _client is None:
+        _client = _new_client()
+    return _client
+
+
+def parse_chat_response(response: httpx.Response) -> str:
+    """Extract the message content from an Ollama /api/chat response."""
+    if response.status_code != 200:
+        error_detail = f"HTTP {response.status_code}"
+        try:
+            data = response.json()
+            error_detail = data.get("error", str(data)) if isinstance(data, dict) else str(data)
+        except ValueError:
+            error_detail = response.text[:500] if response.text else error_detail
+        logger.error(f"Ollama API error {response.status_code}: {error_detail}")
+        raise LLMError(error_detail, status_code=502)
+
+    try:
+        data = response.json()
+    except ValueError:
+        # Line-separated JSON (a streamed response): keep the last chunk
+        # that carries content
+        data = None
+        for line in response.text.strip().splitlines():
+            try:
+                parsed = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if "message" in parsed or "response" in parsed:
+                data = parsed
+        if data is None:
+            logger.error(f"Could not parse Ollama response: {response.text[:500]}")
+            raise LLMError("Could not parse Ollama response (invalid JSON)")
+
+    if "message" in data:
+        content = data["message"].get("content", "")
+    elif "response" in data:
+        content = data["response"]
+    else:
+        logger.warning(f"Unexpected Ollama response: {data}")
+        raise LLMError("Unexpected response format from Ollama API")
+
+    if not content:
+        raise LLMError("Ollama returned empty response")
+    return content
+
+
+def _request_timeout(timeout: Optional[float]) -> httpx.Timeout:
+    return httpx.Timeout(timeout or settings.OLLAMA_GENERATE_TIMEOUT, connect=settings.OLLAMA_CONNECT_TIMEOUT)
+
+
+def _transport_error(e: httpx.HTTPError) -> LLMError:
+    if isinstance(e, httpx.TimeoutException):
+        logger.error("Ollama request timed out")
+        return LLMError("Request to Ollama timed out. The model may be processing. Please try again.", status_code=504)
+    if isinstance(e, httpx.ConnectError):
+        logger.error("Cannot connect to Ollama")
+        return LLMError(f"Cannot connect to Ollama at {settings.OLLAMA_API_URL}. Please ensure Ollama is running.", status_code=503)
+    logger.error(f"Ollama request failed: {e}")
+    return LLMError(f"Ollama request failed: {e}", status_code=502)
+
+
+async def chat(messages: List[dict], timeout: Optional[float] = None, priority: str = INTERACTIVE, **options) -> str:
+    """
+    Send a non-streaming chat request and return the reply content.
+
+    `timeout` overrides the read timeout for this call; `priority` is the
+    scheduler class; extra keyword arguments are merged into the payload
+    (e.g. `format="json"`).
+    """
+    payload = {"model": settings.OLLAMA_MODEL, "messages": messages, "stream": False, **options}
+    try:
+        async with scheduler.slot(priority):
+            response = await get_client().post(OLLAMA_CHAT_ENDPOINT, json=payload, timeout=_request_timeout(timeout))
+    except SchedulerFull as e:
+        raise _busy_error(e)
+    except httpx.HTTPError as e:
+        raise _transport_error(e)
+    return parse_chat_response(response)
+
+
+async def stream_chat(
+    messages: List[dict], timeout: Optional[float] = None, priority: str = INTERACTIVE, **options
+) -> AsyncIterator[str]:
+    """
+    Send a streaming chat request and yield content chunks as Ollama emits them.
+
+    `timeout` bounds the wait for each chunk rather than the whole reply.
+    The scheduler slot is held until the stream ends. Closing the generator
+    early closes the connection, which makes Ollama stop generating.
+    """
+    payload = {"model": settings.OLLAMA_MODEL, "messages": messages, "stream": True, **options}
+    try:
+        async with scheduler.slot(priority), get_client().stream("POST", OLLAMA_CHAT_ENDPOINT, json=payload, timeout=_request_timeout(timeout)) as response:
+            if response.status_code != 200:
+                await response.aread()
+                parse_chat_response(response)  # raises with Ollama's error detail
+
+            async for line in response.aiter_lines():
+                if not line.strip():
+                    continue
+                try:
+                    data = json.loads(line)
+                except json.JSONDecodeError:
+                    logger.warning(f"Skipping invalid Ollama stream line: {line[:200]}")
+                    continue
+                if "error" in data:
+                    raise LLMError(str(data["error"]), status_code=502)
+                content = data.get("message", {}).get("content") or data.get("response") or ""
+                if content:
+                    yield content
+                if data.get("done"):
+                    return
+    except SchedulerFull as e:
+        raise _busy_error(e)
+    except httpx.HTTPError as e:
+        raise _transport_error(e)
@@ -0,0 +1,139 @@
+"""
+LLM Scheduler: admission control in front of Ollama.
+
+Every LLM call takes a slot from a global concurrency cap (LLM_MAX_CONCURRENCY).
+When all slots are busy, calls wait in one bounded queue per priority class
+and free slots go to the most urgent class first:
+
+    interactive (tailored CV generation a user is waiting on)
+    > ner (entity extraction for uploads)
+    > batch (queued / bulk work)
+
+A call arriving at a full queue is rejected at once with a Retry-After
+estimate instead of piling up until it times out. The scheduler is per
+process: each API and worker process caps its own calls, so the caps of all
+processes should add up to what Ollama can serve (OLLAMA_NUM_PARALLEL).
+"""
+import asyncio
+import heapq
+import itertools
+import math
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List, Tuple
+
+from app.config import settings
+from app.utils import metrics
+
+INTERACTIVE, NER, BATCH = "interactive", "ner", "batch"
+PRIORITIES = {INTERACTIVE: 0, NER: 1, BATCH: 2}
+
+
+class SchedulerFull(Exception):
+    """The queue of a priority class is full; retry after `retry_after` seconds."""
+
+    def __init__(self, priority: str, retry_after: int):
+        super().__init__(f"LLM queue '{priority}' is full, retry in {retry_after}s")
+        self.priority = priority
+        self.retry_after = retry_after
+
+
+class LLMScheduler:
+    def __init__(self, max_concurrency: int, queue_limits: Dict[str, int]):
+        self.max_concurrency = max(1, max_concurrency)
+        self.queue_limits = queue_limits
+        self._running = 0
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._waiting: Dict[str, int] = {priority: 0 for priority in PRIORITIES}
+        self._sequence = itertools.count()
+
+        self._running_gauge = metrics.gauge("llm_running", "LLM calls holding a scheduler slot")
+        self._depth = {p: metrics.gauge(f"llm_queue_depth_{p}", f"LLM calls waiting for a slot ({p})") for p in PRIORITIES}
+        self._wait = {p: metrics.histogram(f"llm_queue_wait_seconds_{p}", f"Time waited for an LLM slot ({p})") for p in PRIORITIES}
+        self._rejected = {p: metrics.counter(f"llm_rejected_total_{p}", f"LLM calls rejected, queue full ({p})") for p in PRIORITIES}
+        self._service_time = metrics.histogram("llm_call_seconds", "Time an LLM call held its slot")
+
+    def queue_depth(self, priority: str) -> int:
+        return self._waiting[priority]
+
+    def retry_after(self) -> int:
+        """Rough seconds until a slot frees up for a newcomer: queued work / throughput."""
+        mean_call = self._service_time.snapshot()["mean"] or 5.0
+        queued = sum(self._waiting.values()) + self._running
+        return max(1, math.ceil(mean_call * queued / self.max_concurrency))
+
+    def check(self, priority: str = INTERACTIVE) -> None:
+        """
+        Raise SchedulerFull if a call of this class would be rejected right now.
+        For callers that must answer before calling (a streaming response
+        cannot turn into a 429 once its headers are sent).
+        """
+        busy = self._running >= self.max_concurrency or self._waiters
+        if busy and self._waiting[priority] >= self.queue_limits.get(priority, 0):
+            self._rejected[priority].inc()
+            raise SchedulerFull(priority, self.retry_after())
+
+    @asynccontextmanager
+    async def slot(self, priority: str = INTERACTIVE) -> AsyncIterator[None]:
+        """Hold one LLM slot for the duration of the block."""
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown LLM priority '{priority}' (expected one of {', '.join(PRIORITIES)})")
+
+        enqueued_at = time.perf_counter()
+        if self._running < self.max_concurrency and not self._waiters:
+            self._running += 1
+        else:
+            if self._waiting[priority] >= self.queue_limits.get(priority, 0):
+                self._rejected[priority].inc()
+                raise SchedulerFull(priority, self.retry_after())
+            await self._wait_for_slot(priority)
+        self._running_gauge.set(self._running)
+        self._wait[priority].observe(time.perf_counter() - enqueued_at)
+
+        started_at = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._service_time.observe(time.perf_counter() - started_at)
+            self._release()
+
+    async def _wait_for_slot(self, priority: str) -> None:
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (PRIORITIES[priority], next(self._sequence), future))
+        self._set_waiting(priority, +1)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # The slot was handed over just as the caller gave up
+                self._release()
+            else:
+                self._waiters = [w for w in self._waiters if w[2] is not future]
+                heapq.heapify(self._waiters)
+            raise
+        finally:
+            self._set_waiting(priority, -1)
+
+    def _release(self) -> None:
+        # Hand the slot straight to the most urgent waiter (FIFO within a class)
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                future.set_result(None)
+                return
+        self._running -= 1
+        self._running_gauge.set(self._running)
+
+    def _set_waiting(self, priority: str, delta: int) -> None:
+        self._waiting[priority] += delta
+        self._depth[priority].set(self._waiting[priority])
+
+
+scheduler = LLMScheduler(
+    settings.LLM_MAX_CONCURRENCY,
+    {
+        INTERACTIVE: settings.LLM_QUEUE_LIMIT_INTERACTIVE,
+        NER: settings.LLM_QUEUE_LIMIT_NER,
+        BATCH: settings.LLM_QUEUE_LIMIT_BATCH,
+    },
+)
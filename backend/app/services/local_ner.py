@@ -0,0 +1,298 @@
+"""
+Local NER: gazetteer and regex extraction of the mechanically extractable
+entity types, without the LLM.
+
+- TECHNOLOGIES / SKILLS: Aho-Corasick automaton over a gazetteer of known
+  terms (seeded from keyword_service.TECH_KEYWORDS), matched
+  case-insensitively on word boundaries and reported with their canonical
+  spelling. Short ambiguous acronyms ("AI", "Go", "R") and names that are
+  also English words ("Excel", "Express", "REST") only match as written.
+- DATE: compiled patterns for years, month + year, MM/YYYY and ranges
+  ("Jan 2020 - Present", "2018 – 2021", "09/2019 à aujourd'hui")
+- CONTACT: emails, URLs / profile links and phone numbers
+
+A typical CV is processed in well under a millisecond, so this can run
+inline on the request.
+"""
+import re
+from typing import Dict, List, Tuple
+
+from app.services.keyword_service import TECH_KEYWORDS
+from app.utils.aho_corasick import AhoCorasick
+
+LOCAL_ENTITY_TYPES = ["SKILLS", "TECHNOLOGIES", "DATE", "CONTACT"]
+
+# Canonical name -> aliases (matched case-insensitively)
+TECHNOLOGY_GAZETTEER: Dict[str, List[str]] = {
+    "Python": ["python", "python3"],
+    "Java": ["java"],
+    "JavaScript": ["javascript", "js", "ecmascript"],
+    "TypeScript": ["typescript"],
+    "PHP": ["php"],
+    "Ruby": ["ruby"],
+    "C++": ["c++", "cpp"],
+    "C#": ["c#", "csharp"],
+    ".NET": [".net", "dotnet", "asp.net"],
+    "Kotlin": ["kotlin"],
+    "Scala": ["scala"],
+    "Rust": ["rust"],
+    "Dart": ["dart"],
+    "HTML": ["html", "html5"],
+    "CSS": ["css", "css3"],
+    "Sass": ["sass", "scss"],
+    "Tailwind CSS": ["tailwind", "tailwind css", "tailwindcss"],
+    "Bootstrap": ["bootstrap"],
+    "React": ["react", "react.js", "reactjs"],
+    "React Native": ["react native"],
+    "Next.js": ["next.js", "nextjs"],
+    "Vue.js": ["vue", "vue.js", "vuejs"],
+    "Angular": ["angular", "angularjs"],
+    "Redux": ["redux"],
+    "Node.js": ["node.js", "nodejs"],
+    "Express": ["express.js", "expressjs"],
+    "NestJS": ["nestjs", "nest.js"],
+    "Django": ["django"],
+    "Flask": ["flask"],
+    "FastAPI": ["fastapi"],
+    "Spring Boot": ["spring boot", "springboot"],
+    "Laravel": ["laravel"],
+    "Symfony": ["symfony"],
+    "Flutter": ["flutter"],
+    "GraphQL": ["graphql"],
+    "REST API": ["rest api", "restful", "api rest"],
+    "SQL": ["sql"],
+    "MySQL": ["mysql"],
+    "PostgreSQL": ["postgresql", "postgres"],
+    "MongoDB": ["mongodb", "mongo"],
+    "Redis": ["redis"],
+    "SQLite": ["sqlite"],
+    "Elasticsearch": ["elasticsearch", "elastic search"],
+    "Kafka": ["kafka", "apache kafka"],
+    "RabbitMQ": ["rabbitmq"],
+    "Spark": ["apache spark", "pyspark"],
+    "Hadoop": ["hadoop"],
+    "Airflow": ["airflow", "apache airflow"],
+    "Docker": ["docker"],
+    "Kubernetes": ["kubernetes", "k8s"],
+    "Terraform": ["terraform"],
+    "Ansible": ["ansible"],
+    "Jenkins": ["jenkins"],
+    "GitLab CI": ["gitlab ci", "gitlab-ci"],
+    "GitHub Actions": ["github actions"],
+    "Git": ["git"],
+    "GitHub": ["github"],
+    "GitLab": ["gitlab"],
+    "Linux": ["linux", "ubuntu", "debian"],
+    "Nginx": ["nginx"],
+    "AWS": ["aws", "amazon web services"],
+    "Azure": ["azure", "microsoft azure"],
+    "GCP": ["gcp", "google cloud", "google cloud platform"],
+    "Firebase": ["firebase"],
+    "TensorFlow": ["tensorflow"],
+    "PyTorch": ["pytorch", "torch"],
+    "Keras": ["keras"],
+    "scikit-learn": ["scikit-learn", "sklearn", "scikit learn"],
+    "Pandas": ["pandas"],
+    "NumPy": ["numpy"],
+    "Hugging Face": ["hugging face", "huggingface", "transformers"],
+    "LangChain": ["langchain"],
+    "OpenCV": ["opencv"],
+    "Power BI": ["power bi", "powerbi"],
+    "Tableau": ["tableau"],
+    "Excel": ["microsoft excel"],
+    "Jira": ["jira"],
+    "Figma": ["figma"],
+    "Postman": ["postman"],
+    "Selenium": ["selenium"],
+    "Jest": ["jest"],
+    "Pytest": ["pytest"],
+    "Android": ["android"],
+    "iOS": ["ios"],
+}
+
+SKILL_GAZETTEER: Dict[str, List[str]] = {
+    "Machine Learning": ["machine learning", "apprentissage automatique"],
+    "Deep Learning": ["deep learning", "apprentissage profond"],
+    "Data Science": ["data science"],
+    "Data Analysis": ["data analysis", "analyse de données", "analytics"],
+    "Big Data": ["big data"],
+    "NLP": ["nlp", "natural language processing", "traitement du langage naturel"],
+    "Computer Vision": ["computer vision", "vision par ordinateur"],
+    "DevOps": ["devops"],
+    "CI/CD": ["ci/cd", "ci cd", "continuous integration", "intégration continue"],
+    "Microservices": ["microservices", "micro-services"],
+    "Cloud Computing": ["cloud", "cloud computing"],
+    "Frontend Development": ["frontend", "front-end", "front end"],
+    "Backend Development": ["backend", "back-end", "back end"],
+    "Full-Stack Development": ["fullstack", "full-stack", "full stack"],
+    "Mobile Development": ["mobile development", "développement mobile", "mobile"],
+    "Agile": ["agile", "méthodes agiles", "méthodologie agile"],
+    "Scrum": ["scrum"],
+    "Kanban": ["kanban"],
+    "Project Management": ["project management", "gestion de projet"],
+    "Team Management": ["team management", "gestion d'équipe"],
+    "Leadership": ["leadership"],
+    "Communication": ["communication"],
+    "Collaboration": ["collaboration", "teamwork", "travail en équipe"],
+    "Problem Solving": ["problem solving", "résolution de problèmes"],
+    "Unit Testing": ["unit testing", "tests unitaires"],
+    "UI/UX Design": ["ui/ux", "ux design", "ui design"],
+}
+
+# Short acronyms and names that are ordinary words in lower case (French
+# "ai", "go", English "rest", "excel", "express"): only matched with exactly
+# this spelling
+CASE_SENSITIVE_TERMS: Dict[str, Tuple[str, str]] = {
+    "AI": ("SKILLS", "Artificial Intelligence"),
+    "IA": ("SKILLS", "Artificial Intelligence"),
+    "ML": ("SKILLS", "Machine Learning"),
+    "Go": ("TECHNOLOGIES", "Go"),
+    "Golang": ("TECHNOLOGIES", "Go"),
+    "R": ("TECHNOLOGIES", "R"),
+    "C": ("TECHNOLOGIES", "C"),
+    "REST": ("TECHNOLOGIES", "REST API"),
+    "Express": ("TECHNOLOGIES", "Express"),
+    "Excel": ("TECHNOLOGIES", "Excel"),
+    "Spring": ("TECHNOLOGIES", "Spring"),
+    "Node": ("TECHNOLOGIES", "Node.js"),
+    "Swift": ("TECHNOLOGIES", "Swift"),
+    "Spark": ("TECHNOLOGIES", "Spark"),
+    "Oracle": ("TECHNOLOGIES", "Oracle"),
+}
+
+# Exact terms that are also seasons: not a technology when a year follows ("Spring 2021")
+_SEASON_TERMS = {"Spring"}
+_YEAR_AFTER = re.compile(r"\s+(?:19|20)\d{2}\b")
+
+# keyword_service terms too generic to be an entity on their own
+_GENERIC_KEYWORDS = {"api", "project", "team", "management", "analysis"}
+
+_WORD_CHARS = re.compile(r"[\w+#]")
+
+
+def _fold(text: str) -> str:
+    """Lower-case without changing the length (offsets stay valid)."""
+    lowered = text.lower()
+    if len(lowered) == len(text):
+        return lowered
+    return "".join(c if len(c.lower()) != 1 else c.lower() for c in text)
+
+
+def _build_automata() -> Tuple[AhoCorasick, AhoCorasick]:
+    """(case-insensitive automaton over folded aliases, exact-spelling automaton)"""
+    automaton: AhoCorasick = AhoCorasick()
+    seen = set()
+
+    def add(alias: str, entity_type: str, canonical: str) -> None:
+        key = _fold(alias)
+        if key not in seen:
+            seen.add(key)
+            automaton.add(key, (entity_type, canonical))
+
+    for canonical, aliases in TECHNOLOGY_GAZETTEER.items():
+        for alias in aliases:
+            add(alias, "TECHNOLOGIES", canonical)
+    for canonical, aliases in SKILL_GAZETTEER.items():
+        for alias in aliases:
+            add(alias, "SKILLS", canonical)
+
+    # Every keyword_service term is recognised even if not listed above
+    known = {_fold(a) for aliases in (*TECHNOLOGY_GAZETTEER.values(), *SKILL_GAZETTEER.values()) for a in aliases}
+    known |= {_fold(term) for term in CASE_SENSITIVE_TERMS}  # "node", "rest": exact spelling only
+    for keyword in TECH_KEYWORDS:
+        if _fold(keyword) not in known and len(keyword) > 2 and keyword not in _GENERIC_KEYWORDS:
+            add(keyword, "SKILLS", keyword.title())
+
+    exact: AhoCorasick = AhoCorasick()
+    for term, (entity_type, canonical) in CASE_SENSITIVE_TERMS.items():
+        exact.add(term, (entity_type, canonical))
+    return automaton.build(), exact.build()
+
+
+_AUTOMATON, _EXACT_AUTOMATON = _build_automata()
+
+
+def _on_word_boundary(text: str, start: int, end: int) -> bool:
+    before_ok = start == 0 or not _WORD_CHARS.match(text[start - 1])
+    after_ok = end == len(text) or not _WORD_CHARS.match(text[end]) or text[end - 1] in "+#"
+    return before_ok and after_ok
+
+
+def extract_gazetteer_entities(text: str) -> Dict[str, List[str]]:
+    """TECHNOLOGIES and SKILLS found in `text`, canonical spellings in order of appearance."""
+    folded = _fold(text)
+    found: Dict[str, List[str]] = {"TECHNOLOGIES": [], "SKILLS": []}
+
+    # Case-insensitive terms are matched on the folded text, exact ones on
+    # the original; both have the same length so offsets line up
+    def accept(_, start: int, end: int) -> bool:
+        return _on_word_boundary(text, start, end)
+
+    def accept_exact(_, start: int, end: int) -> bool:
+        if text[start:end] in _SEASON_TERMS and _YEAR_AFTER.match(text, end):
+            return False
+        return _on_word_boundary(text, start, end)
+
+    matches = _AUTOMATON.longest_matches(folded, accept) + _EXACT_AUTOMATON.longest_matches(text, accept_exact)
+    covered_until = 0
+    # Longest match wins across both automata too ("Spring Boot" over "Spring")
+    for start, end, (entity_type, canonical) in sorted(matches, key=lambda m: (m[0], m[0] - m[1])):
+        if start < covered_until:
+            continue
+        covered_until = end
+        if canonical not in found[entity_type]:
+            found[entity_type].append(canonical)
+    return found
+
+
+_MONTH = (
+    r"(?:jan(?:uary|vier)?|feb(?:ruary)?|f[ée]v(?:rier)?|mar(?:ch|s)?|apr(?:il)?|avr(?:il)?|"
+    r"may|mai|june?|juin|july?|juil(?:let)?|aug(?:ust)?|ao[uû]t|sep(?:t(?:ember)?)?|sept(?:embre)?|"
+    r"oct(?:ober|obre)?|nov(?:ember|embre)?|dec(?:ember)?|d[ée]c(?:embre)?)\.?"
+)
+_DATE_POINT = rf"(?:{_MONTH}\s+(?:19|20)\d{{2}}|(?:0?[1-9]|1[0-2])[/.-](?:19|20)\d{{2}}|(?:19|20)\d{{2}})"
+_PRESENT = r"(?:present|current|now|today|ongoing|aujourd['’]hui|pr[ée]sent|actuel(?:lement)?|en cours)"
+DATE_RANGE_RE = re.compile(
+    rf"\b{_DATE_POINT}\s*(?:-|–|—|to|until|à|au|a)\s*(?:{_DATE_POINT}|{_PRESENT})\b", re.IGNORECASE
+)
+DATE_RE = re.compile(rf"\b{_DATE_POINT}\b", re.IGNORECASE)
+
+EMAIL_RE = re.compile(r"\b[\w.+-]+@[\w-]+(?:\.[\w-]+)*\.[a-z]{2,}\b", re.IGNORECASE)
+URL_RE = re.compile(
+    r"\b(?:https?://|www\.)[^\s<>()\"']+|\b(?:linkedin\.com/in|github\.com|gitlab\.com)/[\w./-]+",
+    re.IGNORECASE,
+)
+PHONE_RE = re.compile(r"(?<![\w+])(?:\+|00)?\d[\d\s.()-]{6,18}\d(?!\w)")
+
+
+def extract_dates(text: str) -> List[str]:
+    """Date ranges first, then standalone dates outside those ranges."""
+    dates, covered = [], []
+    for match in DATE_RANGE_RE.finditer(text):
+        dates.append(" ".join(match.group().split()))
+        covered.append(match.span())
+    for match in DATE_RE.finditer(text):
+        if not any(start <= match.start() < end for start, end in covered):
+            dates.append(match.group())
+    return list(dict.fromkeys(dates))
+
+
+def extract_contacts(text: str) -> List[str]:
+    contacts = EMAIL_RE.findall(text)
+    urls = [url.rstrip(".,;:") for url in URL_RE.findall(text)]
+    contacts += [url for url in urls if "@" not in url]
+    for match in PHONE_RE.finditer(text):
+        phone = match.group().strip()
+        digits = re.sub(r"\D", "", phone)
+        # 8-15 digits, and not a date range such as "2018 - 2021"
+        if 8 <= len(digits) <= 15 and not DATE_RANGE_RE.fullmatch(phone):
+            contacts.append(phone)
+    return list(dict.fromkeys(contacts))
+
+
+def extract_local_entities(text: str) -> Dict[str, List[str]]:
+    """SKILLS, TECHNOLOGIES, DATE and CONTACT entities without the LLM."""
+    entities = extract_gazetteer_entities(text)
+    entities["DATE"] = extract_dates(text)
+    entities["CONTACT"] = extract_contacts(text)
+    return entities
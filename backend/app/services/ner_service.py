@@ -2,43 +2,62 @@
 NER Service: Named Entity Recognition using LLM (Ollama).
 
 This service handles extraction of named entities from text using LLM,
-following the same pattern as ollama_client.py.
+through the shared async client in llm_client.py.
 It now also organizes EXPERIENCE and EDUCATION blocks by linking titles,
-organizations, dates, and locations.
+organizations, dates, and locations that occur closest to each other.
+
+LLM results are cached in MongoDB by SHA-256 of the text, the Ollama model
+and a hash of NER_SYSTEM_PROMPT, so identical texts (the same job posted
+by several users, an unchanged profile) skip the LLM call, and editing the
+prompt or switching models invalidates the cache automatically. Long
+documents are split on section/paragraph boundaries and the chunks are
+extracted concurrently, then merged with case-insensitive deduplication.
 """
 
-import requests
+import asyncio
+import hashlib
 import json
 import logging
-from typing import Dict, List
+import re
+import time
+import unicodedata
+from bisect import bisect_left
+from datetime import datetime, UTC
+from typing import Dict, Iterable, List, Optional, Tuple
 from fastapi import HTTPException
+from pymongo.errors import DuplicateKeyError
 
 from app.config import settings
+from app.database import ner_cache_collection
+from app.services import llm_client
+from app.services.llm_client import LLMError
+from app.services.llm_scheduler import NER
+from app.services.local_ner import LOCAL_ENTITY_TYPES, extract_local_entities
+from app.utils import metrics
+from app.utils.chunking import chunk_paragraphs
 
 logger = logging.getLogger(__name__)
 
-OLLAMA_CHAT_ENDPOINT = f"{settings.OLLAMA_API_URL}/api/chat"
-
 # Expected entity types
 ENTITY_TYPES = [
     "PERSON", "ORGANIZATION", "LOCATION", "SKILLS",
     "TECHNOLOGIES", "EDUCATION", "EXPERIENCE", "DATE", "CONTACT"
 ]
 
+# Types the LLM is still asked for when the local tier handles the rest
+RESIDUAL_ENTITY_TYPES = [etype for etype in ENTITY_TYPES if etype not in LOCAL_ENTITY_TYPES]
+
+NER_MODES = ("llm", "hybrid", "fast")
+
 # NER system prompt template
-NER_SYSTEM_PROMPT = """You are an expert Named Entity Recognition (NER) system. 
+def build_ner_prompt(entity_types: List[str]) -> str:
+    """System prompt asking for `entity_types` as JSON lists."""
+    numbered = "\n".join(f"{i}. {etype}" for i, etype in enumerate(entity_types, start=1))
+    return f"""You are an expert Named Entity Recognition (NER) system. 
 Your task is to extract named entities from text and return them in a structured JSON format.
 
 Extract the following entity types:
-1. PERSON
-2. ORGANIZATION
-3. LOCATION
-4. SKILLS
-5. TECHNOLOGIES
-6. EDUCATION
-7. EXPERIENCE
-8. DATE
-9. CONTACT
+{numbered}
 
 IMPORTANT:
 - Return ONLY valid JSON, no additional text or markdown
@@ -48,54 +67,80 @@ IMPORTANT:
 - If an entity type has no matches, return an empty list for that type
 """
 
+NER_SYSTEM_PROMPT = build_ner_prompt(ENTITY_TYPES)
+RESIDUAL_NER_SYSTEM_PROMPT = build_ner_prompt(RESIDUAL_ENTITY_TYPES)
+
+def _prompt_hash(prompt: str) -> str:
+    return hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:16]
+
+# Bumped automatically whenever the prompt text changes
+NER_PROMPT_VERSION = _prompt_hash(NER_SYSTEM_PROMPT)
+RESIDUAL_PROMPT_VERSION = _prompt_hash(RESIDUAL_NER_SYSTEM_PROMPT)
+
+_cache_hits = metrics.counter("ner_cache_hits_total", "NER results served from the cache")
+_cache_misses = metrics.counter("ner_cache_misses_total", "NER results that needed an LLM call")
+_document_seconds = metrics.histogram("ner_document_seconds", "Wall-clock time of entity extraction per document")
+_chunk_seconds = metrics.histogram("ner_chunk_seconds", "Time of one LLM extraction call (one chunk)")
+
 # ----------------------------
-# Core Ollama response parsing
+# Result cache
 # ----------------------------
-def _parse_ollama_response(response: requests.Response) -> str:
-    """Parse Ollama API response and extract content string."""
-    if response.status_code != 200:
-        error_detail = f"HTTP {response.status_code}"
-        try:
-            data = response.json()
-            error_detail = data.get("error", str(data))
-        except Exception:
-            error_detail = response.text[:500] if response.text else error_detail
-        logger.error(f"Ollama API error {response.status_code}: {error_detail}")
-        raise HTTPException(
-            status_code=500,
-            detail=f"Failed to extract entities using LLM. Error: {error_detail}"
-        )
+def ner_cache_key(text: str, model: Optional[str] = None, prompt_version: Optional[str] = None) -> str:
+    """Cache id: SHA-256 of the text + Ollama model + prompt version."""
+    text_hash = hashlib.sha256(text.encode("utf-8")).hexdigest()
+    return f"{text_hash}:{model or settings.OLLAMA_MODEL}:{prompt_version or NER_PROMPT_VERSION}"
 
-    response.raise_for_status()
+async def _cached_entities(key: str) -> Optional[Dict[str, List[str]]]:
     try:
-        data = response.json()
-    except json.JSONDecodeError:
-        # fallback for line-separated JSON
-        lines = response.text.strip().split("\n")
-        data = None
-        for line in lines:
-            try:
-                parsed = json.loads(line)
-                if "message" in parsed or "response" in parsed:
-                    data = parsed
-                    break
-            except json.JSONDecodeError:
-                continue
-        if data is None:
-            raise HTTPException(status_code=500, detail="Failed to parse LLM response for entity extraction")
-
-    if "message" in data:
-        content = data["message"].get("content", "")
-    elif "response" in data:
-        content = data["response"]
-    else:
-        raise HTTPException(status_code=500, detail="Unexpected response format from LLM")
+        doc = await ner_cache_collection.find_one({"_id": key}, {"entities": 1})
+    except Exception as e:
+        logger.warning(f"NER cache lookup failed: {e}")
+        return None
+    return _validate_entities(doc["entities"]) if doc else None
+
+async def _store_entities(key: str, entities: Dict[str, List[str]], version: str) -> None:
+    try:
+        await ner_cache_collection.insert_one({
+            "_id": key,
+            "model": settings.OLLAMA_MODEL,
+            "prompt_version": version,
+            "entities": entities,
+            "created_at": datetime.now(UTC),
+        })
+    except DuplicateKeyError:
+        pass  # cached concurrently by another request
+    except Exception as e:
+        logger.warning(f"NER cache write failed: {e}")
 
-    if not content:
-        raise HTTPException(status_code=500, detail="Empty response from LLM")
+async def purge_ner_cache(stale_only: bool = True) -> int:
+    """
+    Delete cached NER results; with `stale_only`, only entries from another
+    model or prompt version (unreachable since their key changed).
+    """
+    query = {}
+    if stale_only:
+        query = {"$or": [
+            {"model": {"$ne": settings.OLLAMA_MODEL}},
+            {"prompt_version": {"$nin": [NER_PROMPT_VERSION, RESIDUAL_PROMPT_VERSION]}},
+        ]}
+    result = await ner_cache_collection.delete_many(query)
+    logger.info(f"Purged {result.deleted_count} NER cache entries (stale_only={stale_only})")
+    return result.deleted_count
 
-    return content
+def ner_cache_stats() -> dict:
+    hits, misses = _cache_hits.value, _cache_misses.value
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_rate": round(hits / (hits + misses), 4) if hits + misses else 0.0,
+        "model": settings.OLLAMA_MODEL,
+        "prompt_version": NER_PROMPT_VERSION,
+        "residual_prompt_version": RESIDUAL_PROMPT_VERSION,
+    }
 
+# ----------------------------
+# Response cleanup
+# ----------------------------
 def _clean_json_content(content: str) -> str:
     """Remove markdown formatting from JSON string."""
     content = content.strip()
@@ -117,41 +162,188 @@ def _validate_entities(entities: dict) -> Dict[str, List[str]]:
 # ----------------------------
 # Main entity extraction
 # ----------------------------
-def extract_entities_using_llm(text: str) -> Dict[str, List[str]]:
+async def extract_entities_using_llm(text: str) -> Dict[str, List[str]]:
     """Extract NER entities from text using Ollama LLM."""
+    return await _extract_with_llm(text, NER_SYSTEM_PROMPT, NER_PROMPT_VERSION)
+
+def _normalize_entity(value) -> str:
+    """Comparison key: Unicode-normalized, case-folded, single-spaced, trimmed of punctuation."""
+    if not isinstance(value, str):
+        return json.dumps(value, sort_keys=True, ensure_ascii=False)
+    value = unicodedata.normalize("NFKC", value).casefold()
+    return " ".join(value.split()).strip(" .,;:-–—•*()[]'\"")
+
+def merge_entities(results: List[Dict[str, list]]) -> Dict[str, list]:
+    """
+    Merge per-chunk entity dicts, dropping duplicates case-insensitively
+    (after normalization); the first spelling seen is kept.
+    """
+    merged: Dict[str, list] = {etype: [] for etype in ENTITY_TYPES}
+    for etype in ENTITY_TYPES:
+        seen = set()
+        for result in results:
+            for value in result.get(etype, []):
+                key = _normalize_entity(value)
+                if key and key not in seen:
+                    seen.add(key)
+                    merged[etype].append(value.strip() if isinstance(value, str) else value)
+    return merged
+
+async def _extract_with_llm(text: str, system_prompt: str, version: str) -> Dict[str, List[str]]:
+    """
+    LLM extraction; documents longer than NER_CHUNK_CHARS are split on
+    section/paragraph boundaries and the chunks are extracted concurrently
+    (at most NER_CHUNK_CONCURRENCY at a time), then merged.
+    """
     if not text.strip():
         return {etype: [] for etype in ENTITY_TYPES}
 
+    max_chars = settings.NER_CHUNK_CHARS
+    if not max_chars or len(text) <= max_chars:
+        return merge_entities([await _extract_chunk_with_llm(text, system_prompt, version)])
+
+    chunks = chunk_paragraphs(text, max_chars)
+    semaphore = asyncio.Semaphore(max(1, settings.NER_CHUNK_CONCURRENCY))
+
+    async def run(chunk: str) -> Dict[str, List[str]]:
+        async with semaphore:
+            return await _extract_chunk_with_llm(chunk, system_prompt, version)
+
+    started_at = time.perf_counter()
+    results = await asyncio.gather(*(run(chunk) for chunk in chunks))
+    logger.info(
+        f"Chunked NER: {len(text)} chars in {len(chunks)} chunks of <= {max_chars} chars, "
+        f"{time.perf_counter() - started_at:.2f}s"
+    )
+    return merge_entities(results)
+
+async def _extract_chunk_with_llm(text: str, system_prompt: str, version: str) -> Dict[str, List[str]]:
+    """One LLM call (or cache hit) for a text that fits in a single prompt."""
+    started_at = time.perf_counter()
+    cache_key = ner_cache_key(text, prompt_version=version) if settings.NER_CACHE_ENABLED else None
+    if cache_key:
+        cached = await _cached_entities(cache_key)
+        if cached is not None:
+            _cache_hits.inc()
+            return cached
+        _cache_misses.inc()
+
     try:
         user_prompt = f"Extract all named entities from the following text and return them in JSON format:\n\n{text}"
-        payload = {
-            "model": settings.OLLAMA_MODEL,
-            "messages": [
-                {"role": "system", "content": NER_SYSTEM_PROMPT},
-                {"role": "user", "content": user_prompt}
-            ],
-            "stream": False
-        }
-        response = requests.post(OLLAMA_CHAT_ENDPOINT, json=payload, timeout=300)
-        content = _parse_ollama_response(response)
+        messages = [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt}
+        ]
+        content = await llm_client.chat(messages, timeout=settings.OLLAMA_NER_TIMEOUT, priority=NER)
         content = _clean_json_content(content)
-        entities = json.loads(content)
-        return _validate_entities(entities)
-    except requests.exceptions.Timeout:
-        raise HTTPException(status_code=504, detail="Entity extraction timed out")
-    except requests.exceptions.ConnectionError:
-        raise HTTPException(status_code=503, detail=f"Cannot connect to Ollama at {settings.OLLAMA_API_URL}")
+        entities = _validate_entities(json.loads(content))
+    except LLMError as e:
+        if e.status_code == 429:
+            raise HTTPException(status_code=429, detail=str(e), headers=e.headers)
+        if e.status_code == 504:
+            raise HTTPException(status_code=504, detail="Entity extraction timed out")
+        if e.status_code == 503:
+            raise HTTPException(status_code=503, detail=f"Cannot connect to Ollama at {settings.OLLAMA_API_URL}")
+        raise HTTPException(status_code=500, detail=f"Failed to extract entities using LLM. Error: {e}")
     except Exception as e:
         logger.error(f"NER extraction failed: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Failed to extract entities: {e}")
 
+    _chunk_seconds.observe(time.perf_counter() - started_at)
+    if cache_key:
+        await _store_entities(cache_key, entities, version)
+    return entities
+
+async def extract_entities(text: str, mode: Optional[str] = None) -> Dict[str, List[str]]:
+    """
+    Extract entities with the requested tier (default settings.NER_MODE):
+    "llm" (LLM only), "hybrid" (local tier + LLM for the residual types)
+    or "fast" (local tier only).
+    """
+    mode = mode or settings.NER_MODE
+    if mode not in NER_MODES:
+        raise ValueError(f"Unknown NER mode '{mode}' (expected one of {', '.join(NER_MODES)})")
+
+    started_at = time.perf_counter()
+    if mode == "llm":
+        entities = await extract_entities_using_llm(text)
+    else:
+        local = extract_local_entities(text)
+        residual = {}
+        if mode == "hybrid":
+            residual = await _extract_with_llm(text, RESIDUAL_NER_SYSTEM_PROMPT, RESIDUAL_PROMPT_VERSION)
+        entities = {
+            etype: local[etype] if etype in LOCAL_ENTITY_TYPES else residual.get(etype, [])
+            for etype in ENTITY_TYPES
+        }
+
+    elapsed = time.perf_counter() - started_at
+    _document_seconds.observe(elapsed)
+    logger.info(f"NER ({mode}) for {len(text)} chars took {elapsed:.2f}s")
+    return entities
+
 # ----------------------------
 # Organize experience/education
 # ----------------------------
+def build_occurrence_index(text: str, terms: Iterable) -> Dict[str, List[int]]:
+    """
+    Start offsets (sorted) of every case-insensitive occurrence of each term
+    in `text`. Items that are not strings (the LLM may return an experience
+    as a dict) are not indexed.
+    """
+    index: Dict[str, List[int]] = {}
+    for term in {term for term in terms if isinstance(term, str) and term.strip()}:
+        # Matched on the original text: lowercasing can change its length
+        # ('İ', 'ß'), which would shift the offsets
+        positions = [m.start() for m in re.finditer(re.escape(term), text, re.IGNORECASE)]
+        if positions:
+            index[term] = positions
+    return index
+
+
+class _Occurrences:
+    """All occurrences of one entity type, sorted by offset for nearest lookups."""
+
+    def __init__(self, index: Dict[str, List[int]], entities: list):
+        spans = sorted(
+            (start, start + len(entity), entity)
+            for entity in dict.fromkeys(e for e in entities if isinstance(e, str))
+            for start in index.get(entity, ())
+        )
+        self.starts = [start for start, _, _ in spans]
+        self.spans = spans
+
+    def nearest(self, anchor: Optional[Tuple[int, int]]) -> str:
+        """Entity closest to the `anchor` span; the earliest one when there is no anchor."""
+        if not self.spans:
+            return ""
+        if anchor is None:
+            return self.spans[0][2]
+
+        start, end = anchor
+        i = bisect_left(self.starts, start)
+        best, best_gap = "", None
+        # Candidates: the first occurrence at/after the anchor, then the one
+        # before it (ties go to the occurrence that follows the anchor)
+        for j in (i, i - 1):
+            if 0 <= j < len(self.spans):
+                occ_start, occ_end, entity = self.spans[j]
+                gap = max(occ_start - end, start - occ_end, 0)
+                if best_gap is None or gap < best_gap:
+                    best, best_gap = entity, gap
+        return best
+
+
 def organize_entities(entities: dict, text: str) -> dict:
     """
     Build structured EXPERIENCE and EDUCATION blocks:
     Each block links title/degree, organization/school, date, location.
+
+    Every title/degree is linked to the organization, date and location that
+    occur closest to it in the text, so each experience of a multi-job CV gets
+    its own company. Occurrences are indexed once per document and looked up
+    by binary search. Items that are not strings are kept as they are,
+    without links of their own.
     """
     structured = {"EXPERIENCE_BLOCKS": [], "EDUCATION_BLOCKS": []}
 
@@ -161,55 +353,50 @@ def organize_entities(entities: dict, text: str) -> dict:
     locations = entities.get("LOCATION", [])
     education_items = entities.get("EDUCATION", [])
 
+    index = build_occurrence_index(text, [*titles, *orgs, *dates, *locations, *education_items])
+    org_occurrences = _Occurrences(index, orgs)
+    date_occurrences = _Occurrences(index, dates)
+    location_occurrences = _Occurrences(index, locations)
+
+    def anchor(item) -> Optional[Tuple[int, int]]:
+        positions = index.get(item) if isinstance(item, str) else None
+        return (positions[0], positions[0] + len(item)) if positions else None
+
     # Experience blocks
     for title in titles:
-        block = {"title": title, "company": "", "date": "", "location": ""}
-        for org in orgs:
-            if org.lower() in text.lower():
-                block["company"] = org
-                break
-        for d in dates:
-            if d.lower() in text.lower():
-                block["date"] = d
-                break
-        for loc in locations:
-            if loc.lower() in text.lower():
-                block["location"] = loc
-                break
-        structured["EXPERIENCE_BLOCKS"].append(block)
+        span = anchor(title)
+        structured["EXPERIENCE_BLOCKS"].append({
+            "title": title,
+            "company": org_occurrences.nearest(span),
+            "date": date_occurrences.nearest(span),
+            "location": location_occurrences.nearest(span),
+        })
 
     # Education blocks
     for edu in education_items:
-        block = {"degree": edu, "school": "", "date": "", "location": ""}
-        for org in orgs:
-            if org.lower() in text.lower():
-                block["school"] = org
-                break
-        for d in dates:
-            if d.lower() in text.lower():
-                block["date"] = d
-                break
-        for loc in locations:
-            if loc.lower() in text.lower():
-                block["location"] = loc
-                break
-        structured["EDUCATION_BLOCKS"].append(block)
+        span = anchor(edu)
+        structured["EDUCATION_BLOCKS"].append({
+            "degree": edu,
+            "school": org_occurrences.nearest(span),
+            "date": date_occurrences.nearest(span),
+            "location": location_occurrences.nearest(span),
+        })
 
     return structured
 
 # ----------------------------
 # Full pipeline
 # ----------------------------
-def extract_and_structure_entities(text: str) -> dict:
+async def extract_and_structure_entities(text: str, mode: Optional[str] = None) -> dict:
     """Run NER and organize structured blocks."""
-    raw = extract_entities_using_llm(text)
+    raw = await extract_entities(text, mode)
     structured = organize_entities(raw, text)
     return {"raw": raw, "structured": structured}
 
-def extract_entities_safe(text: str) -> dict:
+async def extract_entities_safe(text: str, mode: Optional[str] = None) -> dict:
     """Safe wrapper to prevent failure from blocking the flow."""
     try:
-        return extract_and_structure_entities(text)
+        return await extract_and_structure_entities(text, mode)
     except Exception as e:
         logger.warning(f"NER extraction failed (safe mode): {e}")
         return {"raw": {}, "structured": {}}
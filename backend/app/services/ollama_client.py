@@ -1,19 +1,15 @@
-import requests
-import json
+from typing import AsyncIterator, List
+
 from app.config import settings
+from app.services import llm_client
+from app.services.llm_client import LLMError
+from app.services.llm_scheduler import INTERACTIVE
 import logging
 
 logger = logging.getLogger(__name__)
 
-OLLAMA_CHAT_ENDPOINT = f"{settings.OLLAMA_API_URL}/api/chat"
-
-def generate_tailored_cv(cv_text: str, job_text: str) -> str:
-    """
-    Call Ollama to generate a tailored CV based on job description.
-    """
-    try:
-        # Professional system prompt that emphasizes preserving all information
-        system_prompt = """You are an expert CV writer that tailors CVs to match specific job offers while maintaining professionalism and completeness.
+# Professional system prompt that emphasizes preserving all information
+TAILORED_CV_SYSTEM_PROMPT = """You are an expert CV writer that tailors CVs to match specific job offers while maintaining professionalism and completeness.
 
 CRITICAL REQUIREMENTS:
 1. PRESERVE ALL INFORMATION from the original CV - do not delete any experiences, education, skills, projects, certifications, or languages
@@ -32,7 +28,10 @@ OUTPUT FORMAT:
 - Use bullet points (-) for lists
 - Keep formatting clean and consistent"""
 
-        user_prompt = f"""Job Description:
+
+def build_tailored_cv_messages(cv_text: str, job_text: str) -> List[dict]:
+    """Chat messages asking the model to tailor `cv_text` to `job_text`."""
+    user_prompt = f"""Job Description:
 {job_text}
 
 Original CV Information:
@@ -48,91 +47,47 @@ Generate a professional, tailored CV that:
 
 Output the complete CV in markdown format with proper headings and structure."""
 
-        payload = {
-            "model": settings.OLLAMA_MODEL,
-            "messages": [
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ]
-        }
-
-        # Ensure streaming is disabled for complete response
-        payload["stream"] = False
-        
-        response = requests.post(OLLAMA_CHAT_ENDPOINT, json=payload, timeout=500)
-        
-        if response.status_code != 200:
-            error_detail = f"HTTP {response.status_code}"
-            try:
-                error_data = response.json()
-                if "error" in error_data:
-                    error_detail = error_data["error"]
-                elif isinstance(error_data, dict):
-                    error_detail = str(error_data)
-            except:
-                error_detail = response.text[:500] if response.text else error_detail
-            
-            logger.error(f"Ollama API error {response.status_code}: {error_detail}")
-            user_message = (
-                f"Erreur lors de la génération du CV. "
-                f"Vérifiez que Ollama est en cours d'exécution et que le modèle '{settings.OLLAMA_MODEL}' est disponible. "
-                f"Détails: {error_detail}"
-            )
-            raise Exception(user_message)
-        
-        response.raise_for_status()
-        
-        # Parse JSON response - handle potential streaming or multiple JSON objects
-        try:
-            # Try to parse as single JSON object
-            data = response.json()
-        except (ValueError, json.JSONDecodeError) as e:
-            # If that fails, try parsing line by line (for streaming responses or multiple JSON objects)
-            response_text = response.text.strip()
-            logger.warning(f"Failed to parse JSON directly, attempting line-by-line. Response preview: {response_text[:200]}")
-            
-            if "\n" in response_text:
-                # Multiple JSON objects - try to parse each line
-                lines = response_text.split("\n")
-                data = None
-                for line in lines:
-                    line = line.strip()
-                    if line:
-                        try:
-                            parsed = json.loads(line)
-                            # Prefer the one with "message" or "response" field
-                            if "message" in parsed or "response" in parsed:
-                                data = parsed
-                            elif data is None:
-                                data = parsed  # Fallback to first valid JSON
-                        except json.JSONDecodeError:
-                            continue
-                if data is None:
-                    logger.error(f"Could not parse any valid JSON from response: {response_text[:500]}")
-                    raise Exception(f"Could not parse Ollama response. Invalid JSON format: {str(e)}")
-            else:
-                logger.error(f"Invalid JSON response: {response_text[:500]}")
-                raise Exception(f"Invalid JSON response from Ollama: {str(e)}")
-        
-        # Extract content from response
-        if "message" in data:
-            content = data["message"].get("content", "")
-            if not content:
-                raise Exception("Ollama returned empty response")
-            return content
-        elif "response" in data:
-            if not data["response"]:
-                raise Exception("Ollama returned empty response")
-            return data["response"]
-        else:
-            logger.warning(f"Unexpected Ollama response: {data}")
-            raise Exception("Unexpected response format from Ollama API")
-    except requests.exceptions.Timeout:
-        logger.error("Ollama request timed out")
-        raise Exception("Request to Ollama timed out. The model may be processing. Please try again.")
-    except requests.exceptions.ConnectionError:
-        logger.error("Cannot connect to Ollama")
-        raise Exception(f"Cannot connect to Ollama at {settings.OLLAMA_API_URL}. Please ensure Ollama is running.")
+    return [
+        {"role": "system", "content": TAILORED_CV_SYSTEM_PROMPT},
+        {"role": "user", "content": user_prompt}
+    ]
+
+
+def _generation_error(e: LLMError) -> LLMError:
+    if e.status_code in (429, 503, 504):
+        return e
+    user_message = (
+        f"Erreur lors de la génération du CV. "
+        f"Vérifiez que Ollama est en cours d'exécution et que le modèle '{settings.OLLAMA_MODEL}' est disponible. "
+        f"Détails: {e}"
+    )
+    return LLMError(user_message, status_code=e.status_code)
+
+
+async def generate_tailored_cv(cv_text: str, job_text: str, priority: str = INTERACTIVE) -> str:
+    """
+    Call Ollama to generate a tailored CV based on job description.
+    """
+    try:
+        messages = build_tailored_cv_messages(cv_text, job_text)
+        return await llm_client.chat(messages, timeout=settings.OLLAMA_GENERATE_TIMEOUT, priority=priority)
+    except LLMError as e:
+        raise _generation_error(e)
     except Exception as e:
         logger.error(f"Ollama CV generation failed: {e}")
         raise
+
+
+async def stream_tailored_cv(cv_text: str, job_text: str, priority: str = INTERACTIVE) -> AsyncIterator[str]:
+    """
+    Stream the tailored CV from Ollama chunk by chunk.
+
+    Closing the generator early (client gone) closes the HTTP stream, which
+    makes Ollama stop generating.
+    """
+    messages = build_tailored_cv_messages(cv_text, job_text)
+    try:
+        async for chunk in llm_client.stream_chat(messages, timeout=settings.OLLAMA_GENERATE_TIMEOUT, priority=priority):
+            yield chunk
+    except LLMError as e:
+        raise _generation_error(e)
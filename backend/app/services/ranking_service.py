@@ -0,0 +1,270 @@
+"""
+Ranking Service: score one embedding against a whole collection at once.
+
+Keeps an in-memory index (see ann_index.IVFIndex) of the embeddings stored
+on a collection (see similarity_service.build_embedding). Small corpora are
+scored exactly with one matrix-vector product plus an argpartition; large
+ones go through the IVF cells. The index is snapshotted to disk so that a
+restart only has to embed-load the documents inserted since.
+"""
+import asyncio
+import base64
+import json
+import logging
+import time
+from pathlib import Path
+from typing import Callable, List, Optional, Tuple
+
+import numpy as np
+
+from app.config import settings
+from app.database import jobs_collection
+from app.services.ann_index import IVFIndex, top_k_indices, write_snapshot
+from app.services.similarity_service import embedding_signature, get_document_vector, is_current_embedding, job_text_of
+
+logger = logging.getLogger(__name__)
+
+
+async def stored_vector(collection, doc: dict, text_of: Callable[[dict], str]) -> np.ndarray:
+    """
+    Vector of a document fetched with an {"embedding": 1} projection; legacy
+    documents (or ones embedded with other settings) are embedded once and persisted.
+    """
+    embedding = doc.get("embedding") or {}
+    if is_current_embedding(embedding):
+        return np.asarray(embedding["vector"], dtype=np.float32)
+    full_doc = await collection.find_one({"_id": doc["_id"]})
+    return await get_document_vector(collection, full_doc, text_of(full_doc))
+
+
+def encode_cursor(score: float, doc_id: str) -> str:
+    """Opaque pagination cursor pointing just after (score, doc_id)."""
+    raw = json.dumps({"s": score, "id": doc_id}).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> Tuple[float, str]:
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return float(data["s"]), str(data["id"])
+    except Exception:
+        raise ValueError("Invalid pagination cursor")
+
+
+async def rank_collection(
+    collection,
+    text_of: Callable[[dict], str],
+    query_vector: np.ndarray,
+    limit: int,
+    cursor: Optional[str] = None,
+    query: Optional[dict] = None,
+    batch_size: int = 1000,
+) -> Tuple[List[Tuple[str, float]], Optional[str]]:
+    """
+    Rank every document of a collection against a query vector, streaming
+    the stored embeddings in batches so memory stays O(batch_size + limit).
+
+    Results are ordered by (score desc, id asc); `cursor` resumes after the
+    last item of the previous page. Returns (page, next_cursor).
+    """
+    query_vector = np.asarray(query_vector, dtype=np.float32)
+    after = decode_cursor(cursor) if cursor else None
+    best_ids: List[str] = []
+    best_scores = np.empty(0, dtype=np.float32)
+
+    def merge(ids: List[str], vectors: List[np.ndarray]) -> None:
+        nonlocal best_ids, best_scores
+        scores = np.vstack(vectors) @ query_vector
+        if after is not None:
+            keep = [
+                i for i, (score, doc_id) in enumerate(zip(scores, ids))
+                if (-float(score), doc_id) > (-after[0], after[1])
+            ]
+            ids, scores = [ids[i] for i in keep], scores[keep]
+        all_ids = best_ids + ids
+        all_scores = np.concatenate([best_scores, scores])
+        candidates = np.arange(all_scores.size)
+        if all_scores.size > limit:
+            # Keep everything tied with the k-th score, then break ties by id
+            # so consecutive pages never overlap or skip documents
+            kth = all_scores[top_k_indices(all_scores, limit)[-1]]
+            candidates = np.flatnonzero(all_scores >= kth)
+        order = sorted(candidates.tolist(), key=lambda i: (-float(all_scores[i]), all_ids[i]))[:limit]
+        best_ids = [all_ids[i] for i in order]
+        best_scores = all_scores[order]
+
+    ids: List[str] = []
+    vectors: List[np.ndarray] = []
+    async for doc in collection.find(query or {}, {"embedding": 1}).batch_size(batch_size):
+        ids.append(str(doc["_id"]))
+        vectors.append(await stored_vector(collection, doc, text_of))
+        if len(ids) >= batch_size:
+            merge(ids, vectors)
+            ids, vectors = [], []
+    if ids:
+        merge(ids, vectors)
+
+    page = [(doc_id, float(score)) for doc_id, score in zip(best_ids, best_scores)]
+    next_cursor = encode_cursor(page[-1][1], page[-1][0]) if len(page) == limit else None
+    return page, next_cursor
+
+
+class EmbeddingIndex:
+    """
+    Embedding index over a MongoDB collection.
+
+    Documents stored by this process are pushed with add() and deleted ones
+    tombstoned with remove(). Changes made elsewhere (the worker, other API
+    replicas, or while the process was down) are caught by reconciling the
+    index against the collection's ids: missing documents are loaded and
+    vanished ones dropped. _id order is not used as a watermark, since
+    ObjectIds from different processes are only roughly ordered.
+
+    Reconciling scans the _id index, so it runs when the collection's
+    estimated size differs from the index's, and otherwise at most every
+    ANN_RECONCILE_SECONDS (a delete plus an insert leaves the size unchanged).
+    """
+
+    def __init__(self, collection, text_of: Callable[[dict], str], snapshot_path: Optional[Path] = None):
+        self.collection = collection
+        self.text_of = text_of
+        self.snapshot_path = snapshot_path
+        self.index = self._new_index()
+        self._loaded = False
+        self._reconciled_at: Optional[float] = None
+        self._mutations = 0
+        self._lock = asyncio.Lock()
+
+    @staticmethod
+    def _new_index() -> IVFIndex:
+        return IVFIndex(
+            n_lists=settings.ANN_N_LISTS,
+            nprobe=settings.ANN_NPROBE,
+            exact_threshold=settings.ANN_EXACT_THRESHOLD,
+        )
+
+    def _load_snapshot(self) -> None:
+        if not self.snapshot_path or not self.snapshot_path.exists():
+            return
+        try:
+            index, meta = IVFIndex.load(self.snapshot_path)
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable index snapshot {self.snapshot_path}: {e}")
+            return
+        if meta.get("signature") != embedding_signature():
+            logger.info(f"Index snapshot {self.snapshot_path} was built with other embedding settings, rebuilding")
+            return
+        index.nprobe = settings.ANN_NPROBE
+        index.exact_threshold = settings.ANN_EXACT_THRESHOLD
+        self.index = index
+        logger.info(f"Loaded index snapshot {self.snapshot_path} with {len(index)} vectors")
+
+    async def _reconcile(self, batch_size: int = 1000) -> bool:
+        """Load the documents the index misses and drop the ones gone from the collection; True if it changed."""
+        existing = {}
+        async for doc in self.collection.find({}, {"_id": 1}):
+            existing[str(doc["_id"])] = doc["_id"]
+        self._reconciled_at = time.monotonic()
+
+        deleted = [doc_id for doc_id in self.index.ids() if doc_id not in existing]
+        for doc_id in deleted:
+            self.index.remove(doc_id)
+
+        missing = [_id for doc_id, _id in existing.items() if doc_id not in self.index]
+        for start in range(0, len(missing), batch_size):
+            ids, vectors = await self._load_vectors({"_id": {"$in": missing[start:start + batch_size]}})
+            # Skip documents pushed through add() while this batch was loading
+            fresh = [(doc_id, vec) for doc_id, vec in zip(ids, vectors) if doc_id not in self.index]
+            if fresh:
+                self.index.add([doc_id for doc_id, _ in fresh], np.vstack([vec for _, vec in fresh]))
+
+        if deleted or missing:
+            logger.info(
+                f"Index for '{self.collection.name}' reconciled: {len(missing)} added, {len(deleted)} dropped, "
+                f"{len(self.index)} vectors"
+            )
+        return bool(deleted or missing)
+
+    async def _load_vectors(self, query: dict) -> Tuple[List[str], List[np.ndarray]]:
+        ids, vectors = [], []
+        async for doc in self.collection.find(query, {"embedding": 1}):
+            ids.append(str(doc["_id"]))
+            vectors.append(await stored_vector(self.collection, doc, self.text_of))
+        return ids, vectors
+
+    def _reconcile_due(self) -> bool:
+        return (
+            self._reconciled_at is None
+            or time.monotonic() - self._reconciled_at >= settings.ANN_RECONCILE_SECONDS
+        )
+
+    async def _snapshot_if_due(self) -> None:
+        self._mutations += 1
+        if settings.ANN_SNAPSHOT_EVERY and self._mutations >= settings.ANN_SNAPSHOT_EVERY:
+            await self._save()
+
+    async def _save(self) -> None:
+        self._mutations = 0
+        if not self.snapshot_path or not self._loaded:
+            return
+        try:
+            # Compact and copy on the event loop: top_k searches the live index
+            # without the lock, so the writer thread must not touch it
+            arrays = self.index.snapshot_arrays()
+            await asyncio.to_thread(
+                write_snapshot, self.snapshot_path, arrays, signature=embedding_signature()
+            )
+        except Exception as e:
+            logger.error(f"Failed to snapshot index to {self.snapshot_path}: {e}")
+
+    async def refresh(self) -> None:
+        """Bring the index up to date with the collection."""
+        async with self._lock:
+            if not self._loaded:
+                self._load_snapshot()
+                self._loaded = True
+            elif not self._reconcile_due():
+                # Metadata count, not a collection scan: this runs on every ranking query
+                if await self.collection.estimated_document_count() == len(self.index):
+                    return
+
+            if await self._reconcile():
+                await self._snapshot_if_due()
+
+    async def add(self, doc_id: str, vector: np.ndarray) -> None:
+        """Insert a freshly stored document without waiting for the next refresh."""
+        async with self._lock:
+            if not self._loaded:
+                return  # the initial refresh will pick it up from the collection
+            self.index.add([doc_id], vector)
+            await self._snapshot_if_due()
+
+    async def add_many(self, doc_ids: List[str], vectors: List[np.ndarray]) -> None:
+        """`add` for a batch of freshly stored documents, under one lock acquisition."""
+        if not doc_ids:
+            return
+        async with self._lock:
+            if not self._loaded:
+                return
+            self.index.add(list(doc_ids), np.vstack(vectors))
+            await self._snapshot_if_due()
+
+    async def remove(self, doc_id: str) -> None:
+        """Tombstone a deleted document."""
+        async with self._lock:
+            if self.index.remove(doc_id):
+                await self._snapshot_if_due()
+
+    async def snapshot(self) -> None:
+        """Persist the index so a restart only catches up on newer documents."""
+        async with self._lock:
+            await self._save()
+
+    async def top_k(self, query_vector: np.ndarray, k: int, nprobe: Optional[int] = None) -> List[Tuple[str, float]]:
+        """Return the k best (document id, similarity) pairs for a query vector."""
+        await self.refresh()
+        return [(doc_id, round(score, 4)) for doc_id, score in self.index.search(query_vector, k, nprobe=nprobe)]
+
+
+# Shared index of job embeddings, reused across ranking requests
+job_index = EmbeddingIndex(jobs_collection, job_text_of, Path(settings.ANN_SNAPSHOT_DIR) / "jobs.npz")
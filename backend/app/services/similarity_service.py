@@ -1,16 +1,366 @@
-from sentence_transformers import SentenceTransformer, util
+import asyncio
+import hashlib
+import logging
 import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
 
-model = SentenceTransformer('thenlper/gte-base')   
+import numpy as np
+from fastapi import HTTPException
+from pymongo import ASCENDING
+from pymongo.errors import BulkWriteError, DuplicateKeyError
 
-def preprocess(text: str) -> str:
+from app.config import settings
+from app.database import (
+    cvs_collection,
+    jobs_collection,
+    embedding_chunks_collection,
+    section_embeddings_collection
+)
+from app.utils import metrics
+from app.services.embedding_backends import load_backend
+from app.services.embedding_batcher import MicroBatcher
+from app.services.cv_profile_service import SECTION_PROFILE, cv_profile_to_text
+from app.utils.chunking import chunk_text, section_title, split_sections
+
+logger = logging.getLogger(__name__)
+
+MODEL_NAME = settings.EMBEDDING_MODEL_NAME
+MODEL_VERSION = settings.EMBEDDING_MODEL_VERSION
+BACKEND = settings.EMBEDDING_BACKEND
+# Quantized backends produce slightly different vectors: keep their caches apart
+MODEL_ID = f"{MODEL_NAME}@{MODEL_VERSION}" + ("" if BACKEND == "torch" else f"+{BACKEND}")
+
+# The model is loaded on first use (or by warm_up() from the app lifespan),
+# so importing this module costs nothing for auth/CRUD-only workers.
+_model = None
+_model_lock = threading.Lock()
+_model_state = {"state": "not_loaded", "error": None, "load_seconds": None}
+
+def get_model():
+    """Return the shared encoder (see embedding_backends), loading it on first call."""
+    global _model
+    if _model is not None:
+        return _model
+    with _model_lock:
+        if _model is None:
+            _model_state.update(state="loading", error=None)
+            started_at = time.perf_counter()
+            try:
+                import torch
+
+                if settings.EMBEDDING_TORCH_THREADS:
+                    torch.set_num_threads(settings.EMBEDDING_TORCH_THREADS)
+                _model = load_backend(BACKEND, MODEL_NAME, settings.EMBEDDING_ONNX_FILE)
+            except Exception as e:
+                _model_state.update(state="failed", error=str(e))
+                logger.error(f"Failed to load embedding model {MODEL_NAME}: {e}")
+                raise
+            _model_state.update(state="loaded", load_seconds=round(time.perf_counter() - started_at, 3))
+            logger.info(f"Loaded embedding model {MODEL_NAME} ({BACKEND}) in {_model_state['load_seconds']}s")
+    return _model
+
+def warm_up() -> None:
+    """Load the model and run one encode so the first request pays no setup cost."""
+    get_model().encode("warm up", normalize_embeddings=True)
+    _model_state["state"] = "ready"
+
+def model_status() -> dict:
+    """Model readiness, as reported by /health/ready."""
+    return {"model": MODEL_NAME, "version": MODEL_VERSION, "backend": BACKEND, **_model_state}
+
+def is_model_ready() -> bool:
+    return _model_state["state"] == "ready"
+
+# Inference runs on a dedicated executor so model.encode never blocks the event loop
+_inference_executor = ThreadPoolExecutor(
+    max_workers=settings.EMBEDDING_WORKERS, thread_name_prefix="embedding"
+)
+_queue_depth = metrics.gauge("embedding_queue_depth", "Encode calls queued or running on the inference executor")
+_queue_rejected = metrics.counter("embedding_queue_rejected_total", "Encode calls rejected because the queue was full")
+_queue_wait = metrics.histogram("embedding_queue_wait_seconds", "Time an encode call waited for an inference thread")
+_encode_time = metrics.histogram("embedding_encode_seconds", "Time spent in model.encode")
+
+async def encode_async(texts, **kwargs) -> np.ndarray:
+    """
+    Awaitable model.encode running on the inference executor.
+    Raises HTTP 503 when more than EMBEDDING_QUEUE_SIZE calls are pending.
+    """
+    if _queue_depth.value >= settings.EMBEDDING_QUEUE_SIZE:
+        _queue_rejected.inc()
+        raise HTTPException(
+            status_code=503,
+            detail="Embedding service is busy, please retry shortly",
+            headers={"Retry-After": "1"}
+        )
+
+    enqueued_at = time.perf_counter()
+
+    def run():
+        started_at = time.perf_counter()
+        _queue_wait.observe(started_at - enqueued_at)
+        try:
+            vectors = get_model().encode(texts, **kwargs)
+            _model_state["state"] = "ready"
+            return vectors
+        finally:
+            _encode_time.observe(time.perf_counter() - started_at)
+
+    _queue_depth.inc()
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_inference_executor, run)
+    finally:
+        _queue_depth.dec()
+
+async def _encode_normalized(texts: List[str]) -> np.ndarray:
+    return await encode_async(texts, batch_size=settings.EMBEDDING_BATCH_SIZE, normalize_embeddings=True)
+
+# Concurrent requests are merged into batched encodes
+_batcher = MicroBatcher(
+    _encode_normalized,
+    max_batch_size=settings.EMBEDDING_MAX_BATCH_SIZE,
+    max_wait_ms=settings.EMBEDDING_MAX_WAIT_MS,
+)
+
+async def encode_texts(texts: List[str]) -> np.ndarray:
+    """Normalized embeddings of texts, encoded through the micro-batcher."""
+    return await _batcher.encode_many(texts)
+
+async def warm_up_async() -> None:
+    """Warm the model up on the inference executor (used by the app lifespan)."""
+    try:
+        await asyncio.get_running_loop().run_in_executor(_inference_executor, warm_up)
+    except Exception:
+        pass  # state and error are reported by model_status()
+
+def shutdown_executor() -> None:
+    _inference_executor.shutdown(wait=False, cancel_futures=True)
+
+def clean_text(text: str) -> str:
     text = re.sub(r'\s+', ' ', text)
     text = re.sub(r'[^\w\s.,;!?-]', '', text)
-    return text.strip()[:3000]
-
-def compute_similarity(cv_text: str, job_text: str) -> float:
-    cv_text, job_text = preprocess(cv_text), preprocess(job_text)
-    cv_emb = model.encode(cv_text, convert_to_tensor=True)
-    job_emb = model.encode(job_text, convert_to_tensor=True)
-    similarity = util.cos_sim(cv_emb, job_emb).item()
-    return round(similarity, 4)
+    return text.strip()
+
+def preprocess(text: str) -> str:
+    return clean_text(text)[:3000]
+
+def embedding_signature() -> str:
+    """Identifies how document embeddings are produced (model, version, mode)."""
+    if settings.EMBEDDING_MODE == "chunked":
+        mode = (
+            f"chunked:{settings.EMBEDDING_POOLING}:"
+            f"{settings.EMBEDDING_CHUNK_CHARS}:{settings.EMBEDDING_CHUNK_OVERLAP}"
+        )
+    else:
+        mode = "truncate"
+    return f"{MODEL_ID}/{mode}"
+
+def embedding_key(processed_text: str, signature: str = "") -> str:
+    """Hash identifying an embedding: preprocessed text + model name, version and backend (+ mode)."""
+    digest = hashlib.sha256()
+    digest.update(f"{MODEL_ID}{signature}\n".encode("utf-8"))
+    digest.update(processed_text.encode("utf-8"))
+    return digest.hexdigest()
+
+def document_key(text: str) -> str:
+    """Cache key of a whole-document embedding under the current settings."""
+    if settings.EMBEDDING_MODE == "chunked":
+        return embedding_key(clean_text(text), embedding_signature())
+    return embedding_key(preprocess(text))
+
+def is_current_embedding(embedding: dict) -> bool:
+    """True if a stored embedding record was produced with the current settings."""
+    return bool(embedding.get("vector")) and embedding.get("signature") == embedding_signature()
+
+def pool_embeddings(vectors: np.ndarray, strategy: str = "mean") -> np.ndarray:
+    """
+    Combine chunk embeddings into one normalized document embedding.
+
+    - mean: average of the chunks
+    - max: element-wise maximum
+    - attention: softmax-weighted average, weighting each chunk by its
+      agreement with the mean (outlier chunks count less)
+    """
+    vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+    if strategy == "max":
+        pooled = vectors.max(axis=0)
+    elif strategy == "attention":
+        centroid = vectors.mean(axis=0)
+        logits = vectors @ centroid / settings.EMBEDDING_ATTENTION_TEMPERATURE
+        weights = np.exp(logits - logits.max())
+        pooled = (weights / weights.sum()) @ vectors
+    else:
+        pooled = vectors.mean(axis=0)
+    return pooled / max(float(np.linalg.norm(pooled)), 1e-12)
+
+async def encode_chunks(chunks: List[str]) -> np.ndarray:
+    """
+    Encode cleaned chunks in batched calls, reusing vectors cached per
+    chunk hash so an edited document only re-encodes the changed chunks.
+    """
+    keys = [embedding_key(chunk) for chunk in chunks]
+    cached = {}
+    async for doc in embedding_chunks_collection.find({"_id": {"$in": keys}}):
+        cached[doc["_id"]] = doc["vector"]
+
+    missing = [i for i, key in enumerate(keys) if key not in cached]
+    if missing:
+        encoded = await encode_texts([chunks[i] for i in missing])
+        new_docs = []
+        for i, vector in zip(missing, encoded):
+            cached[keys[i]] = [float(x) for x in vector]
+            new_docs.append({"_id": keys[i], "model": MODEL_ID, "vector": cached[keys[i]]})
+        try:
+            await embedding_chunks_collection.insert_many(new_docs, ordered=False)
+        except BulkWriteError:
+            pass  # chunks cached concurrently by another request
+
+    return np.asarray([cached[key] for key in keys], dtype=np.float32)
+
+async def build_embedding(text: str) -> dict:
+    """
+    Encode a document text and return the embedding record stored with the
+    document (under the "embedding" field of cvs/jobs).
+    """
+    if settings.EMBEDDING_MODE == "chunked":
+        chunks = [clean_text(chunk) for chunk in chunk_text(
+            text, settings.EMBEDDING_CHUNK_CHARS, settings.EMBEDDING_CHUNK_OVERLAP
+        )]
+        chunks = [chunk for chunk in chunks if chunk] or [""]
+        vector = pool_embeddings(await encode_chunks(chunks), settings.EMBEDDING_POOLING)
+        num_chunks = len(chunks)
+    else:
+        vector = await _batcher.encode(preprocess(text))
+        num_chunks = 1
+    return {
+        "key": document_key(text),
+        "model": MODEL_NAME,
+        "version": MODEL_VERSION,
+        "backend": BACKEND,
+        "signature": embedding_signature(),
+        "chunks": num_chunks,
+        "vector": [float(x) for x in vector],
+    }
+
+def cached_vector(document: dict, text: str) -> np.ndarray | None:
+    """Return the stored vector of a document if it matches the current text and settings."""
+    embedding = document.get("embedding") or {}
+    if not embedding.get("vector") or embedding.get("key") != document_key(text):
+        return None
+    return np.asarray(embedding["vector"], dtype=np.float32)
+
+async def get_document_vector(collection, document: dict, text: str) -> np.ndarray:
+    """
+    Load the embedding of a CV/job document, computing and persisting it
+    on first use (or when the text/model changed since it was stored).
+    """
+    vector = cached_vector(document, text)
+    if vector is not None:
+        return vector
+
+    embedding = await build_embedding(text)
+    if document.get("_id") is not None:
+        await collection.update_one({"_id": document["_id"]}, {"$set": {"embedding": embedding}})
+    document["embedding"] = embedding
+    return np.asarray(embedding["vector"], dtype=np.float32)
+
+def vector_similarity(a: np.ndarray, b: np.ndarray) -> float:
+    """Cosine similarity of two normalized embeddings."""
+    return round(float(np.dot(a, b)), 4)
+
+def job_text_of(job: dict) -> str:
+    return job.get("job_text", "") or job.get("text", "")
+
+async def compute_document_similarity(cv: dict, job: dict) -> float:
+    """Similarity between a stored CV and a stored job, using cached embeddings."""
+    cv_vector = await get_document_vector(cvs_collection, cv, cv.get("raw_text", ""))
+    job_vector = await get_document_vector(jobs_collection, job, job_text_of(job))
+    return vector_similarity(cv_vector, job_vector)
+
+async def ensure_section_indexes() -> None:
+    """One cached vector per (CV, section) (best effort: lookups still work without the index)."""
+    try:
+        # Entries of the earlier per-user cache have no cv_id and would collide on the unique index
+        await section_embeddings_collection.delete_many({"cv_id": {"$exists": False}})
+        await section_embeddings_collection.create_index([("cv_id", ASCENDING), ("section", ASCENDING)], unique=True)
+    except Exception as e:
+        logger.warning(f"Could not create the section_embeddings (cv_id, section) index: {e}")
+
+async def get_section_vectors(cv_id: str, text: str) -> Dict[str, np.ndarray]:
+    """
+    Embed each "## " section of a CV separately, caching one vector per
+    (CV, section) along with the hash of the content it was computed from.
+    Only sections whose content changed since the last call are encoded (in
+    one batch). Repeated titles are merged.
+    """
+    sections: Dict[str, str] = {}
+    for section in split_sections(text):
+        title = section_title(section, SECTION_PROFILE)
+        sections[title] = f"{sections[title]}\n{section}" if title in sections else section
+
+    hashes = {title: embedding_key(preprocess(body)) for title, body in sections.items()}
+    vectors: Dict[str, np.ndarray] = {}
+    async for doc in section_embeddings_collection.find({"cv_id": cv_id, "model": MODEL_ID}):
+        if hashes.get(doc["section"]) == doc["content_hash"]:
+            vectors[doc["section"]] = np.asarray(doc["vector"], dtype=np.float32)
+
+    missing = [title for title in sections if title not in vectors]
+    if missing:
+        encoded = await encode_texts([preprocess(sections[title]) for title in missing])
+        for title, vector in zip(missing, encoded):
+            vectors[title] = np.asarray(vector, dtype=np.float32)
+            try:
+                await section_embeddings_collection.update_one(
+                    {"cv_id": cv_id, "section": title},
+                    {"$set": {"content_hash": hashes[title], "vector": [float(x) for x in vector], "model": MODEL_ID}},
+                    upsert=True
+                )
+            except DuplicateKeyError:
+                pass  # a concurrent request cached the same section first
+
+    return {title: vectors[title] for title in sections}
+
+async def invalidate_section_embeddings(user_id: str, section: str) -> None:
+    """
+    Drop the cached vector of one section of the user's profile-built CVs
+    (called by that section's CRUD routes). Uploaded CVs do not change with
+    the profile and keep theirs.
+    """
+    cv_ids = [str(cv["_id"]) async for cv in cvs_collection.find({"user_id": user_id, "from_profile": True}, {"_id": 1})]
+    if cv_ids:
+        await section_embeddings_collection.delete_many({"cv_id": {"$in": cv_ids}, "section": section})
+
+async def _section_source_text(cv: dict) -> str:
+    """A profile-built CV is scored on the current profile, not on its snapshot at creation."""
+    if cv.get("from_profile") and cv.get("user_id"):
+        try:
+            return await cv_profile_to_text(str(cv["user_id"]))
+        except ValueError:
+            pass  # profile deleted since: fall back to the stored text
+    return cv.get("raw_text", "")
+
+async def compute_section_similarity(cv: dict, job: dict) -> dict:
+    """
+    Structured similarity: score every CV section against the job and
+    combine the section vectors into an overall score.
+    """
+    section_vectors = await get_section_vectors(str(cv["_id"]), await _section_source_text(cv))
+    job_vector = await get_document_vector(jobs_collection, job, job_text_of(job))
+    if not section_vectors:
+        return {"overall": 0.0, "sections": {}}
+
+    overall = pool_embeddings(np.vstack(list(section_vectors.values())), "mean")
+    return {
+        "overall": vector_similarity(overall, job_vector),
+        "sections": {
+            title: vector_similarity(vector, job_vector)
+            for title, vector in section_vectors.items()
+        }
+    }
+
+async def compute_similarity(cv_text: str, job_text: str) -> float:
+    """Similarity of two raw texts (no caching), encoded in one batch."""
+    cv_emb, job_emb = await encode_texts([preprocess(cv_text), preprocess(job_text)])
+    return vector_similarity(cv_emb, job_emb)
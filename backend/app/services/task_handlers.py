@@ -0,0 +1,122 @@
+"""
+Task Handlers: the background work executed by `python -m app.worker`.
+
+- ner.cv / ner.job: entity extraction for an uploaded CV or job,
+  written back to the document's `entities`
+- generate.tailored: tailored CV generation (DOCX + tailored_cvs record)
+"""
+import logging
+from typing import List, Optional
+
+from bson import ObjectId
+from pymongo import UpdateOne
+from fastapi import HTTPException
+
+from app.config import settings
+from app.database import cvs_collection, jobs_collection
+from app.services import task_queue
+from app.services.generation_service import get_or_generate, load_generation_inputs
+from app.services.llm_scheduler import BATCH
+from app.services.ner_service import extract_and_structure_entities
+from app.services.task_queue import PermanentTaskError, register
+
+logger = logging.getLogger(__name__)
+
+NER_CV = "ner.cv"
+NER_JOB = "ner.job"
+GENERATE_TAILORED = "generate.tailored"
+
+
+async def _extract_entities_into(collection, doc_id: str, text_field: str, mode: Optional[str] = None) -> dict:
+    doc = await collection.find_one({"_id": ObjectId(doc_id)}, {text_field: 1})
+    if not doc:
+        raise PermanentTaskError(f"Document {doc_id} no longer exists")
+
+    entities = await extract_and_structure_entities(doc.get(text_field) or "", mode)
+    await collection.update_one({"_id": doc["_id"]}, {"$set": {"entities": entities}})
+    return {"document_id": doc_id, "entities": entities}
+
+
+@register(NER_CV)
+async def extract_cv_entities(task: dict) -> dict:
+    payload = task["payload"]
+    return await _extract_entities_into(cvs_collection, payload["cv_id"], "raw_text", payload.get("mode"))
+
+
+@register(NER_JOB)
+async def extract_job_entities(task: dict) -> dict:
+    payload = task["payload"]
+    return await _extract_entities_into(jobs_collection, payload["job_id"], "job_text", payload.get("mode"))
+
+
+def _ner_target(task_type: str):
+    """The collection and payload id field of a NER task type."""
+    return (cvs_collection, "cv_id") if task_type == NER_CV else (jobs_collection, "job_id")
+
+
+async def schedule_entity_extraction(
+    task_type: str, doc_id: str, text: str, mode: Optional[str] = None, user_id: Optional[str] = None
+) -> Optional[str]:
+    """
+    Extract entities for a freshly stored CV/job. "fast" mode needs no LLM
+    and runs inline (returns None); otherwise a NER task is enqueued and
+    its id returned and recorded on the document as `ner_task_id`.
+    """
+    collection, id_field = _ner_target(task_type)
+    if (mode or settings.NER_MODE) == "fast":
+        entities = await extract_and_structure_entities(text, "fast")
+        await collection.update_one({"_id": ObjectId(doc_id)}, {"$set": {"entities": entities}})
+        return None
+
+    payload = {id_field: doc_id}
+    if mode:
+        payload["mode"] = mode
+    task_id = await task_queue.enqueue(task_type, payload, user_id=user_id)
+    await collection.update_one({"_id": ObjectId(doc_id)}, {"$set": {"ner_task_id": task_id}})
+    return task_id
+
+
+async def enqueue_entity_extraction_many(
+    task_type: str, doc_ids: List[str], mode: Optional[str] = None, user_id: Optional[str] = None
+) -> List[str]:
+    """
+    Bulk counterpart of `schedule_entity_extraction` for the worker path:
+    one insert for the NER tasks and one bulk write recording each
+    `ner_task_id`. Returns the task ids in the order of `doc_ids`.
+    """
+    if not doc_ids:
+        return []
+    collection, id_field = _ner_target(task_type)
+    payloads = [{id_field: doc_id, **({"mode": mode} if mode else {})} for doc_id in doc_ids]
+    task_ids = await task_queue.enqueue_many(task_type, payloads, user_id=user_id)
+    await collection.bulk_write(
+        [UpdateOne({"_id": ObjectId(doc_id)}, {"$set": {"ner_task_id": task_id}}) for doc_id, task_id in zip(doc_ids, task_ids)],
+        ordered=False,
+    )
+    return task_ids
+
+
+@register(GENERATE_TAILORED)
+async def generate_tailored(task: dict) -> dict:
+    cv_id, job_id = task["payload"]["cv_id"], task["payload"]["job_id"]
+    try:
+        inputs = await load_generation_inputs(cv_id, job_id)
+    except HTTPException as e:
+        if e.status_code < 500:
+            raise PermanentTaskError(e.detail)
+        raise
+    if "skipped" in inputs:
+        return inputs["skipped"]
+
+    result = await get_or_generate(
+        cv_id, job_id, inputs, force=task["payload"].get("force", False), priority=BATCH
+    )
+    generated_id = result["generated_id"]
+    return {
+        "status": "generated",
+        "similarity": inputs["similarity"],
+        "generated_id": generated_id,
+        "snippet": result["tailored_text"][:300] + "...",
+        "download_url": f"/generate/download/{generated_id}",
+        "reused": result["reused"]
+    }
@@ -0,0 +1,200 @@
+"""
+Task Queue: durable background tasks stored in MongoDB.
+
+Slow work (LLM entity extraction, tailored CV generation) is enqueued by the
+API and executed by worker processes (`python -m app.worker`), so requests
+return immediately and a restart loses nothing.
+
+A task moves queued -> running -> succeeded | failed:
+- a worker claims a task atomically and holds a lease on it for
+  TASK_VISIBILITY_TIMEOUT seconds, extended by heartbeats while it runs;
+- if the worker dies, the lease expires and another worker picks the task up;
+- a failed attempt is re-queued with exponential backoff until
+  TASK_MAX_ATTEMPTS is reached, then the task is marked failed.
+"""
+import logging
+import random
+from datetime import datetime, timedelta, UTC
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional
+
+from bson import ObjectId
+from pymongo import ASCENDING, ReturnDocument
+
+from app.config import settings
+from app.database import tasks_collection
+
+logger = logging.getLogger(__name__)
+
+QUEUED, RUNNING, SUCCEEDED, FAILED = "queued", "running", "succeeded", "failed"
+
+
+class PermanentTaskError(Exception):
+    """Raised by a handler when retrying cannot help (e.g. the document was deleted)."""
+
+
+TaskHandler = Callable[[dict], Awaitable[Optional[dict]]]
+HANDLERS: Dict[str, TaskHandler] = {}
+
+
+def register(task_type: str) -> Callable[[TaskHandler], TaskHandler]:
+    """Decorator registering the coroutine that executes `task_type` tasks."""
+    def decorator(handler: TaskHandler) -> TaskHandler:
+        HANDLERS[task_type] = handler
+        return handler
+    return decorator
+
+
+def retry_delay(attempt: int) -> float:
+    """Backoff before retrying after the `attempt`-th failure (1-based), with jitter."""
+    delay = min(settings.TASK_RETRY_MAX_DELAY, settings.TASK_RETRY_BASE_DELAY * 2 ** max(0, attempt - 1))
+    return delay * random.uniform(0.8, 1.2)
+
+
+async def ensure_indexes() -> None:
+    await tasks_collection.create_index([("status", ASCENDING), ("available_at", ASCENDING)])
+    await tasks_collection.create_index([("status", ASCENDING), ("lease_expires_at", ASCENDING)])
+
+
+def _new_task(task_type: str, payload: dict, user_id: Optional[str], max_attempts: Optional[int], now: datetime) -> dict:
+    return {
+        "type": task_type,
+        "payload": payload,
+        "user_id": user_id,
+        "status": QUEUED,
+        "attempts": 0,
+        "max_attempts": max_attempts or settings.TASK_MAX_ATTEMPTS,
+        "available_at": now,
+        "lease_owner": None,
+        "lease_expires_at": None,
+        "result": None,
+        "error": None,
+        "created_at": now,
+        "updated_at": now,
+    }
+
+
+async def enqueue(task_type: str, payload: dict, user_id: Optional[str] = None, max_attempts: Optional[int] = None) -> str:
+    """Add a task to the queue and return its id."""
+    result = await tasks_collection.insert_one(_new_task(task_type, payload, user_id, max_attempts, datetime.now(UTC)))
+    logger.info(f"Enqueued {task_type} task {result.inserted_id}")
+    return str(result.inserted_id)
+
+
+async def enqueue_many(
+    task_type: str, payloads: List[dict], user_id: Optional[str] = None, max_attempts: Optional[int] = None
+) -> List[str]:
+    """Add one task per payload with a single insert; returns their ids in order."""
+    if not payloads:
+        return []
+    now = datetime.now(UTC)
+    result = await tasks_collection.insert_many(
+        [_new_task(task_type, payload, user_id, max_attempts, now) for payload in payloads]
+    )
+    logger.info(f"Enqueued {len(payloads)} {task_type} tasks")
+    return [str(task_id) for task_id in result.inserted_ids]
+
+
+async def get_task(task_id: str) -> Optional[dict]:
+    if not ObjectId.is_valid(task_id):
+        return None
+    return await tasks_collection.find_one({"_id": ObjectId(task_id)})
+
+
+async def claim(worker_id: str, task_types: Optional[Iterable[str]] = None) -> Optional[dict]:
+    """
+    Atomically lease the next runnable task: a queued task whose backoff has
+    elapsed, or a running task whose lease expired (its worker died).
+    """
+    now = datetime.now(UTC)
+    query = {"$or": [
+        {"status": QUEUED, "available_at": {"$lte": now}},
+        {"status": RUNNING, "lease_expires_at": {"$lte": now}},
+    ]}
+    if task_types:
+        query["type"] = {"$in": list(task_types)}
+
+    return await tasks_collection.find_one_and_update(
+        query,
+        {
+            "$set": {
+                "status": RUNNING,
+                "lease_owner": worker_id,
+                "lease_expires_at": now + timedelta(seconds=settings.TASK_VISIBILITY_TIMEOUT),
+                "started_at": now,
+                "updated_at": now,
+            },
+            "$inc": {"attempts": 1},
+        },
+        sort=[("available_at", ASCENDING)],
+        return_document=ReturnDocument.AFTER,
+    )
+
+
+def _owned(task: dict, worker_id: str) -> dict:
+    # Only the current lease holder may touch a running task: a worker whose
+    # lease expired must not overwrite the retry that replaced it
+    return {"_id": task["_id"], "status": RUNNING, "lease_owner": worker_id, "attempts": task["attempts"]}
+
+
+async def heartbeat(task: dict, worker_id: str) -> bool:
+    """Extend the lease; False if the task is no longer ours."""
+    now = datetime.now(UTC)
+    result = await tasks_collection.update_one(
+        _owned(task, worker_id),
+        {"$set": {"lease_expires_at": now + timedelta(seconds=settings.TASK_VISIBILITY_TIMEOUT), "updated_at": now}},
+    )
+    return result.modified_count == 1
+
+
+async def complete(task: dict, worker_id: str, result: Optional[dict]) -> bool:
+    now = datetime.now(UTC)
+    update = await tasks_collection.update_one(
+        _owned(task, worker_id),
+        {"$set": {
+            "status": SUCCEEDED,
+            "result": result,
+            "error": None,
+            "lease_owner": None,
+            "lease_expires_at": None,
+            "finished_at": now,
+            "updated_at": now,
+        }},
+    )
+    return update.modified_count == 1
+
+
+async def fail(task: dict, worker_id: str, error: str, retry: bool = True) -> bool:
+    """Record a failed attempt: re-queue with backoff, or fail for good."""
+    now = datetime.now(UTC)
+    if not retry or task["attempts"] >= task["max_attempts"]:
+        changes = {"status": FAILED, "finished_at": now}
+        logger.error(f"Task {task['_id']} ({task['type']}) failed after {task['attempts']} attempts: {error}")
+    else:
+        delay = retry_delay(task["attempts"])
+        changes = {"status": QUEUED, "available_at": now + timedelta(seconds=delay)}
+        logger.warning(f"Task {task['_id']} ({task['type']}) attempt {task['attempts']} failed, retrying in {delay:.1f}s: {error}")
+
+    update = await tasks_collection.update_one(
+        _owned(task, worker_id),
+        {"$set": {**changes, "error": error, "lease_owner": None, "lease_expires_at": None, "updated_at": now}},
+    )
+    return update.modified_count == 1
+
+
+def task_to_response(task: dict) -> dict:
+    """Public view of a task for /tasks/{id}."""
+    def iso(value):
+        return value.isoformat() if value else None
+
+    return {
+        "task_id": str(task["_id"]),
+        "type": task["type"],
+        "status": task["status"],
+        "attempts": task["attempts"],
+        "max_attempts": task["max_attempts"],
+        "result": task.get("result"),
+        "error": task.get("error"),
+        "created_at": iso(task.get("created_at")),
+        "updated_at": iso(task.get("updated_at")),
+        "finished_at": iso(task.get("finished_at")),
+    }
@@ -0,0 +1,83 @@
+"""
+Aho-Corasick automaton: find every occurrence of many patterns in one pass.
+
+Matching a gazetteer of a few hundred terms costs O(len(text) + matches)
+instead of one scan per term. Patterns map to a value (e.g. the canonical
+spelling of a technology) returned with each match.
+"""
+from collections import deque
+from typing import Callable, Dict, Generic, Iterator, List, Optional, Tuple, TypeVar
+
+V = TypeVar("V")
+
+
+class AhoCorasick(Generic[V]):
+    def __init__(self):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        # (pattern length, value) for every pattern ending at a state,
+        # including those reached through failure links
+        self._out: List[List[Tuple[int, V]]] = [[]]
+        self._built = False
+
+    def add(self, pattern: str, value: V) -> None:
+        if not pattern:
+            raise ValueError("Empty pattern")
+        state = 0
+        for char in pattern:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            state = next_state
+        self._out[state].append((len(pattern), value))
+        self._built = False
+
+    def build(self) -> "AhoCorasick[V]":
+        """Compute failure links (breadth-first); called automatically before matching."""
+        queue = deque(self._goto[0].values())
+        for state in queue:
+            self._fail[state] = 0
+        while queue:
+            state = queue.popleft()
+            for char, child in self._goto[state].items():
+                queue.append(child)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[child] = target if target != child else 0
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+        self._built = True
+        return self
+
+    def iter(self, text: str) -> Iterator[Tuple[int, int, V]]:
+        """Yield (start, end, value) for every pattern occurrence, overlaps included."""
+        if not self._built:
+            self.build()
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        for end, char in enumerate(text, start=1):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for length, value in out[state]:
+                yield end - length, end, value
+
+    def longest_matches(self, text: str, accept: Optional[Callable[[str, int, int], bool]] = None) -> List[Tuple[int, int, V]]:
+        """
+        Leftmost-longest, non-overlapping matches ("react native" wins over
+        "react"). `accept(text, start, end)` can reject a match, e.g. one
+        that is not on word boundaries.
+        """
+        matches = [m for m in self.iter(text) if accept is None or accept(text, m[0], m[1])]
+        matches.sort(key=lambda m: (m[0], m[0] - m[1]))
+        selected, covered_until = [], 0
+        for start, end, value in matches:
+            if start >= covered_until:
+                selected.append((start, end, value))
+                covered_until = end
+        return selected
@@ -0,0 +1,110 @@
+"""
+Text chunking helpers.
+
+Documents built by cv_profile_service.cv_profile_to_text (and most uploaded
+CVs) are organised in "## Section" blocks. Chunks never straddle two
+sections: small sections are packed together, long ones are cut into
+overlapping windows (chunk_text) or on paragraph boundaries
+(chunk_paragraphs).
+"""
+import re
+from typing import List
+
+SECTION_HEADING = re.compile(r"^\s*##(?!#)", re.MULTILINE)
+PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+
+
+def split_sections(text: str) -> List[str]:
+    """Split text before every '## ' heading (the preamble is its own section)."""
+    starts = [m.start() for m in SECTION_HEADING.finditer(text)]
+    bounds = [0] + [s for s in starts if s > 0] + [len(text)]
+    sections = [text[a:b].strip() for a, b in zip(bounds, bounds[1:])]
+    return [s for s in sections if s]
+
+
+def section_title(section: str, default: str = "") -> str:
+    """Title of a section returned by split_sections ('' or `default` for the preamble)."""
+    first_line = section.split("\n", 1)[0]
+    if SECTION_HEADING.match(first_line):
+        return first_line.strip().lstrip("#").strip()
+    return default
+
+
+def _windows(text: str, max_chars: int, overlap: int) -> List[str]:
+    """Cut text into overlapping windows, preferring to break on whitespace."""
+    step_floor = max(1, max_chars - overlap)
+    windows, start = [], 0
+    while start < len(text):
+        end = min(len(text), start + max_chars)
+        if end < len(text):
+            space = text.rfind(" ", start + step_floor, end)
+            if space != -1:
+                end = space
+        windows.append(text[start:end].strip())
+        if end >= len(text):
+            break
+        next_start = max(start + 1, end - overlap)
+        space = text.find(" ", next_start, end)
+        start = space + 1 if space != -1 else next_start
+    return [w for w in windows if w]
+
+
+def chunk_text(text: str, max_chars: int = 1500, overlap: int = 200) -> List[str]:
+    """
+    Split text into section-aligned chunks of at most `max_chars` characters.
+    Consecutive short sections share a chunk; a longer section is split into
+    windows overlapping by `overlap` characters.
+    """
+    chunks: List[str] = []
+    current = ""
+    for section in split_sections(text):
+        if len(section) > max_chars:
+            if current:
+                chunks.append(current)
+                current = ""
+            chunks.extend(_windows(section, max_chars, overlap))
+        elif current and len(current) + 2 + len(section) > max_chars:
+            chunks.append(current)
+            current = section
+        else:
+            current = f"{current}\n\n{section}" if current else section
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def _pack(pieces: List[str], max_chars: int) -> List[str]:
+    """Greedily join consecutive pieces (blank-line separated) up to `max_chars`."""
+    packed: List[str] = []
+    current = ""
+    for piece in pieces:
+        if current and len(current) + 2 + len(piece) > max_chars:
+            packed.append(current)
+            current = piece
+        else:
+            current = f"{current}\n\n{piece}" if current else piece
+    if current:
+        packed.append(current)
+    return packed
+
+
+def _split_long(block: str, max_chars: int) -> List[str]:
+    """Cut a block on paragraph, then line, then whitespace boundaries."""
+    if len(block) <= max_chars:
+        return [block]
+    for separator in (PARAGRAPH_BREAK, re.compile(r"\n")):
+        parts = [p.strip() for p in separator.split(block) if p.strip()]
+        if len(parts) > 1:
+            pieces = [piece for part in parts for piece in _split_long(part, max_chars)]
+            return _pack(pieces, max_chars)
+    return _windows(block, max_chars, 0)
+
+
+def chunk_paragraphs(text: str, max_chars: int = 4000) -> List[str]:
+    """
+    Split text into non-overlapping chunks of at most `max_chars` characters,
+    cut on section boundaries first, then paragraphs, then lines. Meant for
+    per-chunk extraction where every passage must be seen exactly once.
+    """
+    pieces = [piece for section in split_sections(text) for piece in _split_long(section, max_chars)]
+    return _pack(pieces, max_chars)
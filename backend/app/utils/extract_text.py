@@ -1,9 +1,30 @@
 
+"""
+Text extraction from uploaded PDF, DOCX and TXT files.
+
+`extract_text_from_file` does the parsing synchronously. PDFs are read page
+by page with PyMuPDF, pdfplumber only re-reads the pages that came back
+empty, and the CV routes read at most PDF_MAX_PAGES pages (job postings
+and other documents are read whole). The upload routes call
+`extract_text_async`, which runs it on a bounded set of worker processes:
+parsing never blocks the event loop, a document taking longer than
+EXTRACT_TIMEOUT (all its page ranges together) is abandoned and only the
+worker it was stuck on is killed, and workers are replaced after
+EXTRACT_MAX_TASKS_PER_WORKER documents so memory a parser leaks on a
+pathological PDF never accumulates in the API process.
+"""
+import asyncio
 import logging
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from pathlib import Path
+from typing import Any, Callable, List, Optional, Set, Tuple
 
 from fastapi import HTTPException
 
+from app.config import settings
+
 try:
     import fitz  # type: ignore
 except ImportError:  # pragma: no cover
@@ -21,50 +42,93 @@ except ImportError:  # pragma: no cover
 
 logger = logging.getLogger(__name__)
 
-def extract_text_from_file(file_path: Path) -> str:
-    """
-    Extract text from PDF or DOCX using PyMuPDF (fast) with pdfplumber fallback.
+def _pdf_page_texts_pymupdf(file_path: Path, start: int, stop: Optional[int]) -> Tuple[List[str], int]:
+    with fitz.open(file_path) as pdf:  # type: ignore[operator]
+        page_count = pdf.page_count
+        stop = page_count if stop is None else min(stop, page_count)
+        return [pdf.load_page(number).get_text("text") for number in range(start, stop)], page_count
+
+
+def extract_pdf_pages(file_path: Path, start: int = 0, stop: Optional[int] = None) -> Tuple[List[str], int]:
     """
-    ext = file_path.suffix.lower()
+    Text of pages [start, stop) of a PDF and the document's page count.
 
-    # --- PDF files ---
-    if ext == ".pdf":
-        if fitz is None and pdfplumber is None:
-            raise HTTPException(status_code=500, detail="PDF extraction requires PyMuPDF or pdfplumber")
+    PyMuPDF reads every page; pdfplumber is only used for the pages it
+    returned empty (or for all of them if PyMuPDF cannot open the file).
+    When pdfplumber reads every page, the pages it finds empty are left
+    out, as they were when it was only a whole-document fallback.
+    """
+    if fitz is None and pdfplumber is None:
+        raise HTTPException(status_code=500, detail="PDF extraction requires PyMuPDF or pdfplumber")
 
+    texts: List[str] = []
+    page_count = 0
+    opened = False
+    if fitz is not None:
         try:
-            text = ""
-            if fitz is None:
-                raise RuntimeError("PyMuPDF not available")
+            texts, page_count = _pdf_page_texts_pymupdf(file_path, start, stop)
+            opened = True
+        except Exception as e:
+            logger.warning(f"PyMuPDF failed on {file_path.name}, falling back to pdfplumber: {e}")
+            texts = []
 
-            with fitz.open(file_path) as pdf:  # type: ignore[operator]
-                for page in pdf:
-                    text += page.get_text("text") + "\n"
+    empty = [i for i, text in enumerate(texts) if not text.strip()]
+    if opened and not empty:
+        # Includes a PDF without pages: nothing for pdfplumber to add
+        return texts, page_count
+    # No text at all from PyMuPDF: pdfplumber reads every page
+    whole = not opened or len(empty) == len(texts)
 
-            # If PyMuPDF returns almost empty text, use fallback
-            if not text.strip():
-                raise ValueError("Empty text from PyMuPDF")
+    try:
+        if pdfplumber is None:
+            raise RuntimeError("pdfplumber not available")
+        with pdfplumber.open(file_path) as pdf:  # type: ignore[operator]
+            if not opened:
+                page_count = len(pdf.pages)
+                last = page_count if stop is None else min(stop, page_count)
+                texts = [""] * max(0, last - start)
+                empty = range(len(texts))
+            for i in empty:
+                texts[i] = pdf.pages[start + i].extract_text() or ""
+        if opened:
+            logger.info(f"pdfplumber fallback on {len(empty)} empty page(s) of {file_path.name}")
+        if whole:
+            texts = [text for text in texts if text]
+    except Exception as e:
+        if not opened:
+            logger.error(f"Both PyMuPDF and pdfplumber failed: {e}")
+            raise HTTPException(status_code=500, detail="Failed to extract text from PDF")
+        # Keep what PyMuPDF found; the empty pages stay empty
+        logger.warning(f"pdfplumber fallback failed on {file_path.name}: {e}")
+    return texts, page_count
 
-            return text.strip()
 
-        except Exception as e:
-            logger.warning(f"PyMuPDF failed on {file_path.name}, falling back to pdfplumber: {e}")
-            try:
-                if pdfplumber is None:
-                    raise RuntimeError("pdfplumber not available")
-                text = ""
-                with pdfplumber.open(file_path) as pdf:  # type: ignore[operator]
-                    for page in pdf.pages:
-                        page_text = page.extract_text()
-                        if page_text:
-                            text += page_text + "\n"
-                return text.strip()
-            except Exception as e2:
-                logger.error(f"Both PyMuPDF and pdfplumber failed: {e2}")
-                raise HTTPException(status_code=500, detail="Failed to extract text from PDF")
+def join_pages(texts: List[str]) -> str:
+    # Same layout as the whole-document extractor: a newline after each page
+    return "".join(text + "\n" for text in texts).strip()
+
+
+def _log_truncation(file_path: Path, page_count: int, max_pages: int) -> None:
+    if max_pages and page_count > max_pages:
+        logger.info(f"Read the first {max_pages} of {page_count} pages of {file_path.name}")
+
+
+def extract_text_from_file(file_path: Path, max_pages: int = 0) -> str:
+    """
+    Extract text from PDF or DOCX using PyMuPDF (fast) with pdfplumber fallback.
+
+    PDFs are read up to `max_pages` pages (0 = all).
+    """
+    ext = file_path.suffix.lower()
+
+    # --- PDF files ---
+    if ext == ".pdf":
+        texts, page_count = extract_pdf_pages(file_path, 0, max_pages or None)
+        _log_truncation(file_path, page_count, max_pages)
+        return join_pages(texts)
 
     # --- DOCX files ---
-    elif ext == ".docx":
+    if ext == ".docx":
         if Document is None:
             raise HTTPException(status_code=500, detail="python-docx is required for DOCX extraction")
 
@@ -89,3 +153,167 @@ def extract_text_from_file(file_path: Path) -> str:
             status_code=400,
             detail="Unsupported file format (PDF/DOCX/TXT only)"
         )
+
+
+def _worker_call(func: Callable[..., Any], *args: Any) -> Tuple[Optional[int], Any]:
+    """Pool entry point: (None, result), or (status_code, detail) for an HTTP error (HTTPException does not pickle)."""
+    try:
+        return None, func(*args)
+    except HTTPException as e:
+        return e.status_code, str(e.detail)
+
+
+class Deadline:
+    """
+    Time budget of one document, shared by its page ranges. It starts when
+    the first range gets a worker (time spent waiting for a free worker
+    before that does not count).
+    """
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.at: Optional[float] = None
+
+    def remaining(self, now: float) -> float:
+        if self.at is None:
+            self.at = now + self.seconds
+        return self.at - now
+
+
+def _timed_out() -> HTTPException:
+    return HTTPException(
+        status_code=422,
+        detail="Text extraction timed out: the document is too large or too complex"
+    )
+
+
+class ExtractionPool:
+    """
+    `workers` single-process executors, each running one extraction at a
+    time; calls beyond that wait for a free worker. An extraction exceeding
+    its deadline only costs its own worker: that process is killed and
+    replaced while the other extractions keep running (a process pool
+    shared by all calls breaks as a whole when one of its processes dies).
+    With `workers=0` extraction runs in a thread of this process.
+    """
+
+    def __init__(self, workers: int, timeout: float, max_tasks_per_worker: int):
+        self.workers = workers
+        self.timeout = timeout
+        self.max_tasks_per_worker = max_tasks_per_worker
+        # Free workers; None is a slot whose executor is started on first use
+        self._idle: Optional[asyncio.Queue] = None
+        self._executors: Set[Executor] = set()
+
+    def _new_executor(self) -> Executor:
+        if self.workers > 0:
+            executor: Executor = ProcessPoolExecutor(
+                max_workers=1,
+                # spawn: workers do not inherit the API's memory (and
+                # recycling with max_tasks_per_child requires it)
+                mp_context=multiprocessing.get_context("spawn"),
+                max_tasks_per_child=self.max_tasks_per_worker or None,
+            )
+        else:
+            executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="extract")
+        self._executors.add(executor)
+        return executor
+
+    def _kill(self, executor: Executor) -> None:
+        """Stop a worker that is stuck or died; its slot gets a fresh one on next use."""
+        self._executors.discard(executor)
+        # shutdown() lets a running task finish; a stuck parser has to be killed
+        # (taken before shutdown, which forgets the worker process)
+        processes = list((getattr(executor, "_processes", None) or {}).values())
+        executor.shutdown(wait=False, cancel_futures=True)
+        for process in processes:
+            process.kill()
+
+    async def run(
+        self,
+        func: Callable[..., Any],
+        *args: Any,
+        timeout: Optional[float] = None,
+        deadline: Optional[Deadline] = None,
+    ) -> Any:
+        """
+        Run `func(*args)` on a free worker; HTTP 422 once `deadline` (shared
+        by the calls of one document) or, without one, `timeout` is exceeded.
+        """
+        if self._idle is None:
+            self._idle = asyncio.Queue()
+            for _ in range(max(1, self.workers)):
+                self._idle.put_nowait(None)
+        deadline = deadline or Deadline(timeout or self.timeout)
+
+        executor = await self._idle.get() or self._new_executor()
+        try:
+            for attempt in (1, 2):
+                budget = deadline.remaining(asyncio.get_running_loop().time())
+                if budget <= 0:
+                    raise _timed_out()
+                future = asyncio.wrap_future(executor.submit(func, *args))
+                try:
+                    return await asyncio.wait_for(future, budget)
+                except asyncio.TimeoutError:
+                    logger.error(f"Text extraction exceeded its {deadline.seconds}s deadline, killing its worker")
+                    self._kill(executor)
+                    executor = None
+                    raise _timed_out()
+                except BrokenProcessPool:
+                    # The worker crashed (e.g. a parser segfault): retry once on a fresh one
+                    self._kill(executor)
+                    executor = self._new_executor()
+                    if attempt == 2:
+                        logger.error("Text extraction worker crashed twice")
+                        raise HTTPException(status_code=500, detail="Text extraction failed")
+        finally:
+            self._idle.put_nowait(executor)
+
+    def shutdown(self) -> None:
+        for executor in list(self._executors):
+            self._kill(executor)
+        self._idle = None
+
+
+extraction_pool = ExtractionPool(
+    settings.EXTRACT_WORKERS, settings.EXTRACT_TIMEOUT, settings.EXTRACT_MAX_TASKS_PER_WORKER
+)
+
+
+async def _run_extraction(func: Callable[..., Any], *args: Any, deadline: Optional[Deadline] = None) -> Any:
+    status_code, value = await extraction_pool.run(_worker_call, func, *args, deadline=deadline)
+    if status_code is not None:
+        raise HTTPException(status_code=status_code, detail=value)
+    return value
+
+
+async def extract_text_async(file_path: Path, max_pages: int = 0) -> str:
+    """
+    Awaitable `extract_text_from_file` running in the extraction process pool.
+
+    A PDF is read PDF_PAGES_PER_TASK pages at a time: the first range also
+    returns the page count, the remaining ranges are extracted in parallel
+    by several workers (up to `max_pages`, 0 = all).
+    """
+    step = settings.PDF_PAGES_PER_TASK
+    if file_path.suffix.lower() != ".pdf" or step <= 0:
+        return await _run_extraction(extract_text_from_file, file_path, max_pages)
+
+    # EXTRACT_TIMEOUT bounds the whole document, not each of its page ranges
+    deadline = Deadline(extraction_pool.timeout)
+    first_stop = min(step, max_pages) if max_pages else step
+    texts, page_count = await _run_extraction(extract_pdf_pages, file_path, 0, first_stop, deadline=deadline)
+    _log_truncation(file_path, page_count, max_pages)
+
+    last = min(page_count, max_pages) if max_pages else page_count
+    ranges = [(start, min(start + step, last)) for start in range(first_stop, last, step)]
+    for range_texts, _ in await asyncio.gather(*(
+        _run_extraction(extract_pdf_pages, file_path, start, stop, deadline=deadline) for start, stop in ranges
+    )):
+        texts.extend(range_texts)
+    return join_pages(texts)
+
+
+def shutdown_pool() -> None:
+    extraction_pool.shutdown()
@@ -0,0 +1,131 @@
+"""
+In-process metrics: counters, gauges and histograms exposed on /metrics.
+
+Metrics are per worker process and kept in memory; a histogram keeps
+its totals plus a bounded window of recent observations for percentiles.
+"""
+import threading
+from collections import deque
+from typing import Deque, Dict, Union
+
+
+class Counter:
+    def __init__(self, name: str, description: str = ""):
+        self.name = name
+        self.description = description
+        self._value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: int = 1) -> None:
+        with self._lock:
+            self._value += amount
+
+    @property
+    def value(self) -> int:
+        return self._value
+
+    def snapshot(self) -> dict:
+        return {"type": "counter", "description": self.description, "value": self._value}
+
+
+class Gauge:
+    def __init__(self, name: str, description: str = ""):
+        self.name = name
+        self.description = description
+        self._value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1) -> None:
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount: float = 1) -> None:
+        with self._lock:
+            self._value -= amount
+
+    def set(self, value: float) -> None:
+        with self._lock:
+            self._value = value
+
+    @property
+    def value(self) -> float:
+        return self._value
+
+    def snapshot(self) -> dict:
+        return {"type": "gauge", "description": self.description, "value": self._value}
+
+
+class Histogram:
+    def __init__(self, name: str, description: str = "", window: int = 1024):
+        self.name = name
+        self.description = description
+        self._count = 0
+        self._sum = 0.0
+        self._max = 0.0
+        self._recent: Deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        with self._lock:
+            self._count += 1
+            self._sum += value
+            self._max = max(self._max, value)
+            self._recent.append(value)
+
+    @property
+    def count(self) -> int:
+        return self._count
+
+    def percentile(self, q: float) -> float:
+        with self._lock:
+            values = sorted(self._recent)
+        if not values:
+            return 0.0
+        return values[min(len(values) - 1, int(q * len(values)))]
+
+    def snapshot(self) -> dict:
+        return {
+            "type": "histogram",
+            "description": self.description,
+            "count": self._count,
+            "sum": round(self._sum, 6),
+            "mean": round(self._sum / self._count, 6) if self._count else 0.0,
+            "max": round(self._max, 6),
+            "p50": round(self.percentile(0.5), 6),
+            "p95": round(self.percentile(0.95), 6),
+            "p99": round(self.percentile(0.99), 6),
+        }
+
+
+Metric = Union[Counter, Gauge, Histogram]
+_registry: Dict[str, Metric] = {}
+_registry_lock = threading.Lock()
+
+
+def _get_or_create(cls, name: str, description: str) -> Metric:
+    with _registry_lock:
+        metric = _registry.get(name)
+        if metric is None:
+            metric = _registry[name] = cls(name, description)
+        elif not isinstance(metric, cls):
+            raise TypeError(f"Metric '{name}' is already registered as {type(metric).__name__}")
+        return metric
+
+
+def counter(name: str, description: str = "") -> Counter:
+    return _get_or_create(Counter, name, description)
+
+
+def gauge(name: str, description: str = "") -> Gauge:
+    return _get_or_create(Gauge, name, description)
+
+
+def histogram(name: str, description: str = "") -> Histogram:
+    return _get_or_create(Histogram, name, description)
+
+
+def snapshot() -> Dict[str, dict]:
+    """Current value of every registered metric, by name."""
+    with _registry_lock:
+        metrics = dict(_registry)
+    return {name: metric.snapshot() for name, metric in sorted(metrics.items())}
@@ -0,0 +1,108 @@
+"""
+Upload ingestion: stream an UploadFile to content-addressed storage.
+
+Memory per upload stays at one chunk whatever the file size, disk writes
+run off the event loop, the SHA-256 of the content is computed on the way
+and uploads over UPLOAD_MAX_BYTES are refused with HTTP 413 as soon as the
+limit is crossed.
+
+Files are stored by content hash under a two-level sharded directory
+(root/ab/cd/abcd...ef.pdf), so same-named uploads never overwrite each
+other and a byte-identical re-upload is stored once. The file is written
+to a temporary name and moved into place once complete, so a rejected or
+failed upload leaves nothing behind.
+"""
+import asyncio
+import hashlib
+import logging
+import os
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from typing import BinaryIO, Optional, Tuple
+
+from fastapi import HTTPException, UploadFile
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class StoredUpload:
+    path: Path
+    size: int
+    sha256: str
+    existed: bool = False  # an identical file was already stored
+
+
+def _too_large(max_bytes: int) -> HTTPException:
+    return HTTPException(
+        status_code=413,
+        detail=f"File too large (maximum {max_bytes / (1024 * 1024):g} MB)"
+    )
+
+
+def _write_chunk(handle: BinaryIO, digest, chunk: bytes) -> None:
+    digest.update(chunk)
+    handle.write(chunk)
+
+
+def content_path(root: Path, sha256: str, suffix: str) -> Path:
+    """Where a file with this hash is stored: root/<2 hex>/<2 hex>/<hash><suffix>."""
+    return root / sha256[:2] / sha256[2:4] / f"{sha256}{suffix.lower()}"
+
+
+async def _stream_to(file: UploadFile, partial: Path, max_bytes: int, chunk_size: int) -> Tuple[int, str]:
+    digest = hashlib.sha256()
+    size = 0
+    handle = await asyncio.to_thread(open, partial, "wb")
+    try:
+        while chunk := await file.read(chunk_size):
+            size += len(chunk)
+            if size > max_bytes:
+                raise _too_large(max_bytes)
+            await asyncio.to_thread(_write_chunk, handle, digest, chunk)
+    finally:
+        await asyncio.to_thread(handle.close)
+    return size, digest.hexdigest()
+
+
+def _move_into_place(partial: Path, destination: Path) -> bool:
+    """Move the upload to its content path; False (and drop it) if already stored."""
+    if destination.exists():
+        partial.unlink(missing_ok=True)
+        return False
+    destination.parent.mkdir(parents=True, exist_ok=True)
+    os.replace(partial, destination)
+    return True
+
+
+async def store_upload(
+    file: UploadFile,
+    root: Path,
+    max_bytes: Optional[int] = None,
+    chunk_size: Optional[int] = None,
+) -> StoredUpload:
+    """
+    Stream `file` into content-addressed storage under `root`, keeping its
+    extension; raises HTTP 413 past `max_bytes` (default UPLOAD_MAX_BYTES).
+    """
+    max_bytes = max_bytes or settings.UPLOAD_MAX_BYTES
+    chunk_size = chunk_size or settings.UPLOAD_CHUNK_SIZE
+
+    # The multipart parser already knows the size of a spooled upload
+    if file.size is not None and file.size > max_bytes:
+        raise _too_large(max_bytes)
+
+    partial = root / f".upload-{uuid.uuid4().hex}.part"
+    try:
+        size, sha256 = await _stream_to(file, partial, max_bytes, chunk_size)
+        destination = content_path(root, sha256, Path(file.filename or "").suffix)
+        stored = await asyncio.to_thread(_move_into_place, partial, destination)
+    except BaseException:
+        await asyncio.to_thread(partial.unlink, missing_ok=True)
+        raise
+
+    logger.info(f"Stored upload {file.filename} as {destination.name} ({size} bytes{'' if stored else ', already stored'})")
+    return StoredUpload(path=destination, size=size, sha256=sha256, existed=not stored)
@@ -0,0 +1,114 @@
+"""
+Background worker: executes tasks from the MongoDB task queue.
+
+Usage (from backend/):
+    python -m app.worker
+    python -m app.worker --types ner.cv ner.job --concurrency 4
+
+Run as many worker processes as the LLM can serve; NER and generation can be
+split across workers with --types. SIGINT/SIGTERM stop claiming new tasks
+and let the running ones finish.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import signal
+import socket
+import uuid
+from typing import List, Optional
+
+from app.config import settings
+from app.services import llm_client, task_queue
+from app.services import task_handlers  # noqa: F401  (registers the handlers)
+
+logger = logging.getLogger("app.worker")
+
+
+async def run_task(task: dict, worker_id: str) -> None:
+    """Execute one claimed task, keeping its lease alive while it runs."""
+    task_id, task_type = task["_id"], task["type"]
+
+    if task["attempts"] > task["max_attempts"]:
+        # Lease expired on the last attempt: the worker died mid-task
+        await task_queue.fail(task, worker_id, "Lease expired (worker lost)", retry=False)
+        return
+
+    handler = task_queue.HANDLERS.get(task_type)
+    if handler is None:
+        await task_queue.fail(task, worker_id, f"No handler for task type '{task_type}'", retry=False)
+        return
+
+    async def keep_lease():
+        while True:
+            await asyncio.sleep(settings.TASK_VISIBILITY_TIMEOUT / 3)
+            if not await task_queue.heartbeat(task, worker_id):
+                logger.warning(f"Lost the lease on task {task_id}")
+                return
+
+    heartbeat = asyncio.create_task(keep_lease())
+    try:
+        result = await handler(task)
+    except task_queue.PermanentTaskError as e:
+        await task_queue.fail(task, worker_id, str(e), retry=False)
+    except Exception as e:
+        logger.error(f"Task {task_id} ({task_type}) raised: {e}", exc_info=True)
+        detail = getattr(e, "detail", None) or str(e) or type(e).__name__
+        await task_queue.fail(task, worker_id, str(detail))
+    else:
+        if await task_queue.complete(task, worker_id, result):
+            logger.info(f"Task {task_id} ({task_type}) succeeded")
+    finally:
+        heartbeat.cancel()
+
+
+async def worker_loop(worker_id: str, task_types: Optional[List[str]], stopping: asyncio.Event) -> None:
+    while not stopping.is_set():
+        try:
+            task = await task_queue.claim(worker_id, task_types)
+        except Exception as e:
+            logger.error(f"Claiming a task failed: {e}")
+            task = None
+
+        if task is None:
+            try:
+                await asyncio.wait_for(stopping.wait(), timeout=settings.TASK_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            continue
+
+        await run_task(task, worker_id)
+
+
+async def main(task_types: Optional[List[str]], concurrency: int) -> None:
+    worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+    stopping = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stopping.set)
+        except NotImplementedError:  # Windows
+            pass
+
+    await task_queue.ensure_indexes()
+    await llm_client.start()
+    logger.info(f"Worker {worker_id} started (types: {', '.join(task_types or task_queue.HANDLERS)}, concurrency: {concurrency})")
+    try:
+        await asyncio.gather(*(worker_loop(worker_id, task_types, stopping) for _ in range(concurrency)))
+    finally:
+        await llm_client.close()
+        logger.info(f"Worker {worker_id} stopped")
+
+
+def cli() -> None:
+    parser = argparse.ArgumentParser(description="Run background tasks from the MongoDB queue")
+    parser.add_argument("--types", nargs="+", choices=sorted(task_queue.HANDLERS), help="Task types to run (default: all)")
+    parser.add_argument("--concurrency", type=int, default=settings.TASK_WORKER_CONCURRENCY)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    asyncio.run(main(args.types, max(1, args.concurrency)))
+
+
+if __name__ == "__main__":
+    cli()
@@ -2,6 +2,8 @@ import os
 import sys
 from pathlib import Path
 
+import pytest
+
 
 BACKEND_ROOT = Path(__file__).resolve().parents[1]
 
@@ -24,3 +26,16 @@ DEFAULT_ENV = {
 for key, value in DEFAULT_ENV.items():
     os.environ.setdefault(key, value)
 
+
+
+@pytest.fixture
+def fake_ollama(monkeypatch):
+    """Route llm_client to an in-process fake Ollama (app/bench/fake_ollama.py); tweak it via `.config`."""
+    import httpx
+
+    from app.bench.fake_ollama import FakeOllama
+    from app.services import llm_client
+
+    fake = FakeOllama()
+    monkeypatch.setattr(llm_client, "_client", httpx.AsyncClient(transport=fake.transport()))
+    return fake
@@ -0,0 +1,27 @@
+from app.utils.aho_corasick import AhoCorasick
+
+
+def _automaton(*patterns):
+    automaton = AhoCorasick()
+    for pattern in patterns:
+        automaton.add(pattern, pattern)
+    return automaton
+
+
+def test_iter_finds_overlapping_matches():
+    matches = list(_automaton("he", "she", "his", "hers").iter("ushers"))
+    assert sorted(matches) == [(1, 4, "she"), (2, 4, "he"), (2, 6, "hers")]
+
+
+def test_longest_matches_prefers_leftmost_longest():
+    automaton = _automaton("react", "react native", "native")
+    assert automaton.longest_matches("react native and react") == [
+        (0, 12, "react native"),
+        (17, 22, "react"),
+    ]
+
+
+def test_longest_matches_respects_accept():
+    automaton = _automaton("java")
+    on_word = lambda text, start, end: end == len(text) or not text[end].isalpha()
+    assert automaton.longest_matches("javascript and java", on_word) == [(15, 19, "java")]
@@ -0,0 +1,67 @@
+import numpy as np
+
+from app.services.ann_index import IVFIndex, top_k_indices
+
+
+def _random_vectors(n, dim=16, seed=0):
+    rng = np.random.default_rng(seed)
+    return rng.normal(size=(n, dim)).astype(np.float32)
+
+
+def test_top_k_indices_orders_best_first():
+    scores = np.array([0.1, 0.9, 0.5, 0.7])
+    assert top_k_indices(scores, 2).tolist() == [1, 3]
+    assert top_k_indices(scores, 10).tolist() == [1, 3, 2, 0]
+    assert top_k_indices(scores, 0).size == 0
+
+
+def test_exact_search_returns_nearest_vector():
+    vectors = _random_vectors(50)
+    index = IVFIndex(exact_threshold=1000)
+    index.add([f"job{i}" for i in range(50)], vectors)
+
+    results = index.search(vectors[7], k=3)
+    assert results[0][0] == "job7"
+    assert round(results[0][1], 4) == 1.0
+    assert len(results) == 3
+
+
+def test_remove_tombstones_and_compacts():
+    vectors = _random_vectors(10)
+    index = IVFIndex(exact_threshold=1000, compact_ratio=0.5)
+    index.add([f"job{i}" for i in range(10)], vectors)
+
+    assert index.remove("job3") is True
+    assert index.remove("job3") is False
+    assert index.tombstones == 1
+    assert "job3" not in {doc_id for doc_id, _ in index.search(vectors[3], k=10)}
+
+    for i in range(4, 9):
+        index.remove(f"job{i}")
+    assert index.tombstones == 0  # compacted past the ratio
+    assert len(index) == 4
+
+
+def test_ivf_search_finds_exact_match_after_training():
+    vectors = _random_vectors(400)
+    index = IVFIndex(n_lists=8, nprobe=8, exact_threshold=100)
+    index.add([f"job{i}" for i in range(400)], vectors)
+
+    assert index.is_trained
+    assert index.search(vectors[123], k=1)[0][0] == "job123"
+
+
+def test_snapshot_roundtrip(tmp_path):
+    vectors = _random_vectors(300)
+    index = IVFIndex(n_lists=4, exact_threshold=100)
+    index.add([f"job{i}" for i in range(300)], vectors)
+    index.remove("job0")
+
+    path = tmp_path / "jobs.npz"
+    index.save(path, model="m", last_id="abc")
+    restored, meta = IVFIndex.load(path)
+
+    assert meta == {"model": "m", "last_id": "abc"}
+    assert len(restored) == 299
+    assert restored.is_trained
+    assert restored.search(vectors[42], k=1)[0][0] == "job42"
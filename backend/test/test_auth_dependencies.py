@@ -0,0 +1,43 @@
+import asyncio
+
+import pytest
+from bson import ObjectId
+from fastapi import HTTPException
+
+from app.auth import dependencies
+
+
+class FakeJobs:
+    def __init__(self, *docs):
+        self.docs = {doc["_id"]: doc for doc in docs}
+
+    async def find_one(self, query):
+        return self.docs.get(query["_id"])
+
+
+@pytest.fixture
+def jobs(monkeypatch):
+    owner, other = {"_id": ObjectId()}, {"_id": ObjectId()}
+    owned = {"_id": ObjectId(), "user_id": str(owner["_id"])}
+    anonymous = {"_id": ObjectId(), "user_id": None}
+    monkeypatch.setattr(dependencies, "jobs_collection", FakeJobs(owned, anonymous))
+    return owner, other, owned, anonymous
+
+
+def _status(job_id, user):
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(dependencies.get_owned_job(job_id, user))
+    return exc.value.status_code
+
+
+def test_only_the_uploader_gets_the_job(jobs):
+    owner, other, owned, anonymous = jobs
+    assert asyncio.run(dependencies.get_owned_job(str(owned["_id"]), owner)) is owned
+    assert _status(str(owned["_id"]), other) == 403
+    assert _status(str(anonymous["_id"]), owner) == 403
+    assert _status(str(ObjectId()), owner) == 404
+    assert _status("not-an-id", owner) == 400
+
+
+def test_optional_user_is_none_without_a_token():
+    assert asyncio.run(dependencies.get_optional_user(None)) is None
@@ -0,0 +1,184 @@
+import asyncio
+import io
+import zipfile
+
+import pytest
+from bson import ObjectId
+from fastapi import UploadFile
+
+from app.config import settings
+from app.services import bulk_upload
+from app.services.bulk_upload import FAILED, SKIPPED, STORED, bulk_ingest, bulk_report
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def sort(self, key, direction):
+        self.docs = sorted(self.docs, key=lambda d: d[key], reverse=direction < 0)
+        return self
+
+    def __aiter__(self):
+        async def gen():
+            for doc in self.docs:
+                yield doc
+        return gen()
+
+
+class FakeCollection:
+    name = "jobs"
+
+    def __init__(self, docs=()):
+        self.docs = list(docs)
+        self.insert_calls = 0
+
+    def find(self, query, projection=None):
+        hashes = query["file_sha256"]["$in"]
+        return FakeCursor([d for d in self.docs if d.get("file_sha256") in hashes])
+
+    async def insert_many(self, documents, ordered=True):
+        self.insert_calls += 1
+        for document in documents:
+            document["_id"] = ObjectId()
+        self.docs.extend(documents)
+
+
+@pytest.fixture
+def pipeline(monkeypatch):
+    """Fake extraction, embedding and task queue; records what ran."""
+    calls = {"extracted": [], "enqueued": []}
+
+    async def extract_text_async(path, max_pages=0):
+        calls["extracted"].append(path.name)
+        return path.read_text()
+
+    async def build_embedding(text):
+        return {"vector": [1.0, 0.0]}
+
+    async def enqueue_many(task_type, doc_ids, mode=None, user_id=None):
+        calls["enqueued"].append(list(doc_ids))
+        return [f"task-{i}" for i in range(len(doc_ids))]
+
+    monkeypatch.setattr(bulk_upload, "extract_text_async", extract_text_async)
+    monkeypatch.setattr(bulk_upload, "build_embedding", build_embedding)
+    monkeypatch.setattr(bulk_upload, "enqueue_entity_extraction_many", enqueue_many)
+    monkeypatch.setattr(settings, "NER_MODE", "hybrid")
+    return calls
+
+
+def _zip(entries):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, data in entries.items():
+            archive.writestr(name, data)
+    buffer.seek(0)
+    return UploadFile(buffer, filename="pack.zip")
+
+
+def _file(name, data):
+    return UploadFile(io.BytesIO(data), filename=name)
+
+
+def _ingest(files, collection, tmp_path, ner_mode=None):
+    return asyncio.run(bulk_ingest(
+        files,
+        root=tmp_path,
+        extensions=(".pdf", ".txt"),
+        collection=collection,
+        text_field="job_text",
+        task_type="ner.job",
+        make_document=lambda item: {"file_sha256": item.upload.sha256, "job_text": item.text, "entities": item.entities},
+        ner_mode=ner_mode,
+    ))
+
+
+def test_archive_and_loose_files_get_per_file_statuses(tmp_path, pipeline):
+    collection = FakeCollection()
+    archive = _zip({
+        "jobs/backend.txt": "Backend developer",
+        "jobs/frontend.txt": "Frontend developer",
+        "jobs/backend-copy.txt": "Backend developer",
+        "jobs/readme.md": "not a job",
+        "jobs/empty.txt": "",
+        "__MACOSX/jobs/._backend.txt": "resource fork",
+    })
+
+    items = _ingest([archive, _file("data.txt", b"Data engineer")], collection, tmp_path)
+    report = {f["filename"]: f for f in bulk_report(items)["files"]}
+
+    assert {name: f["status"] for name, f in report.items()} == {
+        "pack.zip/jobs/backend.txt": STORED,
+        "pack.zip/jobs/frontend.txt": STORED,
+        "pack.zip/jobs/backend-copy.txt": STORED,
+        "pack.zip/jobs/readme.md": SKIPPED,
+        "pack.zip/jobs/empty.txt": FAILED,
+        "data.txt": STORED,
+    }
+    # The copy is extracted once, everything is written with one insert
+    assert len(pipeline["extracted"]) == 3
+    assert report["pack.zip/jobs/backend-copy.txt"]["reused_extraction"]
+    assert collection.insert_calls == 1 and len(collection.docs) == 4
+    assert pipeline["enqueued"] == [[report[name]["id"] for name in report if report[name]["status"] == STORED]]
+    # The spooled archive is removed, only the extracted files remain
+    assert not list(tmp_path.glob(".bulk-*"))
+
+
+def test_earlier_upload_is_reused_without_extraction_or_ner(tmp_path, pipeline):
+    text = "Backend developer"
+    first = _ingest([_file("a.txt", text.encode())], FakeCollection(), tmp_path)[0]
+    previous = {
+        "_id": ObjectId(), "file_sha256": first.upload.sha256, "job_text": text,
+        "entities": {"raw": {"SKILLS": ["APIs"]}, "structured": {}}, "embedding": {},
+    }
+    pipeline["extracted"].clear()
+    pipeline["enqueued"].clear()
+
+    item = _ingest([_file("b.txt", text.encode())], FakeCollection([previous]), tmp_path)[0]
+
+    assert item.status == STORED and item.reused_extraction
+    assert item.entities == previous["entities"] and item.task_id is None
+    assert pipeline["extracted"] == []
+    assert pipeline["enqueued"] == [[]]
+
+
+def test_fast_mode_extracts_entities_inline(tmp_path, pipeline, monkeypatch):
+    async def fast_entities(text, mode):
+        assert mode == "fast"
+        return {"raw": {"SKILLS": [text]}, "structured": {}}
+
+    monkeypatch.setattr(bulk_upload, "extract_and_structure_entities", fast_entities)
+    item = _ingest([_file("a.txt", b"Python")], FakeCollection(), tmp_path, ner_mode="fast")[0]
+
+    assert item.entities["raw"] == {"SKILLS": ["Python"]}
+    assert pipeline["enqueued"] == [[]]
+
+
+def test_limits_fail_single_files_not_the_batch(tmp_path, pipeline, monkeypatch):
+    monkeypatch.setattr(settings, "UPLOAD_MAX_BYTES", 10)
+    monkeypatch.setattr(settings, "BULK_UPLOAD_MAX_FILES", 2)
+    archive = _zip({"big.txt": "x" * 100, "ok.txt": "small", "late.txt": "small too"})
+    broken = UploadFile(io.BytesIO(b"not a zip"), filename="broken.zip")
+
+    statuses = [(item.filename, item.status) for item in _ingest([archive, broken], FakeCollection(), tmp_path)]
+
+    assert statuses == [
+        ("pack.zip/big.txt", FAILED),
+        ("pack.zip/ok.txt", STORED),
+        ("pack.zip/late.txt", SKIPPED),
+        ("broken.zip", FAILED),
+    ]
+
+
+def test_failed_extraction_is_reported_per_file(tmp_path, pipeline, monkeypatch):
+    async def extract_text_async(path, max_pages=0):
+        if "broken" in path.read_text():
+            raise RuntimeError("corrupt document")
+        return path.read_text()
+
+    monkeypatch.setattr(bulk_upload, "extract_text_async", extract_text_async)
+    items = _ingest([_file("a.txt", b"broken"), _file("b.txt", b"fine")], FakeCollection(), tmp_path)
+
+    assert [item.status for item in items] == [FAILED, STORED]
+    assert "corrupt document" in items[0].detail
+    assert items[1].task_id == "task-0"
@@ -0,0 +1,59 @@
+from app.utils.chunking import chunk_paragraphs, chunk_text, section_title, split_sections
+
+
+PROFILE_TEXT = (
+    "Jane Doe\nEmail: jane@example.com\n"
+    "\n## Competences\n- Leadership\n"
+    "\n## Technologies\n\n### Backend\nPython, FastAPI\n"
+    "\n## Languages\n- French: Native"
+)
+
+
+def test_split_sections_keeps_subsections_together():
+    sections = split_sections(PROFILE_TEXT)
+    assert sections[0].startswith("Jane Doe")
+    assert sections[1] == "## Competences\n- Leadership"
+    assert sections[2].startswith("## Technologies") and "### Backend" in sections[2]
+    assert len(sections) == 4
+
+
+def test_chunk_text_packs_short_sections():
+    chunks = chunk_text(PROFILE_TEXT, max_chars=1000)
+    assert len(chunks) == 1
+    assert "## Languages" in chunks[0]
+
+
+def test_chunk_text_never_straddles_sections_when_full():
+    chunks = chunk_text(PROFILE_TEXT, max_chars=60)
+    assert all(chunk.count("## ") <= 2 for chunk in chunks)
+    assert any(chunk.startswith("## Languages") for chunk in chunks)
+
+
+def test_chunk_text_windows_long_sections_with_overlap():
+    body = " ".join(f"word{i}" for i in range(200))
+    chunks = chunk_text(f"## Professional Experience\n{body}", max_chars=300, overlap=60)
+    assert len(chunks) > 1
+    assert all(len(chunk) <= 300 for chunk in chunks)
+    # consecutive windows share words and never start mid-word
+    first_tail = set(chunks[0].split()[-5:])
+    assert first_tail & set(chunks[1].split()[:15])
+    assert all(chunk.split()[0].startswith(("word", "##")) for chunk in chunks)
+
+
+def test_section_title():
+    sections = split_sections(PROFILE_TEXT)
+    assert section_title(sections[0], "Profile") == "Profile"
+    assert section_title(sections[1]) == "Competences"
+    assert section_title(sections[2]) == "Technologies"
+
+
+def test_chunk_paragraphs_splits_on_paragraphs_without_losing_text():
+    paragraphs = [f"paragraph {i} " + "word " * 20 for i in range(12)]
+    text = "## Experience\n" + "\n\n".join(paragraphs) + "\n## Education\nMSc"
+    chunks = chunk_paragraphs(text, max_chars=300)
+    assert all(len(chunk) <= 300 for chunk in chunks)
+    assert len(chunks) > 1
+    joined = "\n\n".join(chunks)
+    for paragraph in paragraphs:
+        assert joined.count(paragraph.strip()) == 1
+    assert chunks[-1].endswith("## Education\nMSc")
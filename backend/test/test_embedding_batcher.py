@@ -0,0 +1,81 @@
+import asyncio
+
+import numpy as np
+
+from app.services.embedding_batcher import MicroBatcher
+
+
+class RecordingEncoder:
+    def __init__(self, fail=False):
+        self.batches = []
+        self.fail = fail
+
+    async def __call__(self, texts):
+        self.batches.append(list(texts))
+        if self.fail:
+            raise RuntimeError("model crashed")
+        return np.asarray([[float(len(t))] for t in texts])
+
+
+def test_concurrent_requests_share_one_batch():
+    encoder = RecordingEncoder()
+    batcher = MicroBatcher(encoder, max_batch_size=8, max_wait_ms=20, name="test_shared")
+
+    async def run():
+        return await asyncio.gather(*(batcher.encode(t) for t in ["a", "bb", "ccc"]))
+
+    results = asyncio.run(run())
+    assert encoder.batches == [["a", "bb", "ccc"]]
+    assert [r.tolist() for r in results] == [[1.0], [2.0], [3.0]]
+
+
+def test_full_batch_is_flushed_without_waiting():
+    encoder = RecordingEncoder()
+    batcher = MicroBatcher(encoder, max_batch_size=2, max_wait_ms=10_000, name="test_full")
+
+    async def run():
+        return await asyncio.wait_for(batcher.encode_many(["a", "b", "c", "d"]), timeout=1)
+
+    vectors = asyncio.run(run())
+    assert encoder.batches == [["a", "b"], ["c", "d"]]
+    assert vectors.shape == (4, 1)
+
+
+def test_encode_errors_reach_every_caller():
+    batcher = MicroBatcher(RecordingEncoder(fail=True), max_batch_size=4, max_wait_ms=1, name="test_fail")
+
+    async def run():
+        return await asyncio.gather(batcher.encode("a"), batcher.encode("b"), return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert all(isinstance(r, RuntimeError) for r in results)
+
+
+def test_batch_metrics_are_recorded():
+    batcher = MicroBatcher(RecordingEncoder(), max_batch_size=4, max_wait_ms=1, name="test_metrics")
+    asyncio.run(batcher.encode_many(["a", "b", "c"]))
+    assert batcher._batch_size.count == 1
+    assert batcher._queue_delay.count == 3
+
+
+def test_running_batches_are_held_until_done():
+    release = None
+
+    async def slow_encoder(texts):
+        await release.wait()
+        return np.asarray([[1.0] for _ in texts])
+
+    batcher = MicroBatcher(slow_encoder, max_batch_size=2, max_wait_ms=1, name="test_running")
+
+    async def run():
+        nonlocal release
+        release = asyncio.Event()
+        pending = asyncio.ensure_future(batcher.encode_many(["a", "b"]))
+        await asyncio.sleep(0.01)
+        running = len(batcher._running)
+        release.set()
+        await pending
+        return running
+
+    assert asyncio.run(run()) == 1
+    assert not batcher._running
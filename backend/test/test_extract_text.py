@@ -1,6 +1,10 @@
+import asyncio
+import os
+import time
 from pathlib import Path
 
 import pytest
+from fastapi import HTTPException
 
 from app.utils import extract_text
 from app.utils.extract_text import extract_text_from_file
@@ -46,3 +50,182 @@ def test_extract_text_unsupported_extension(tmp_path):
     with pytest.raises(Exception):
         extract_text_from_file(file_path)
 
+
+
+def test_extract_text_async_runs_in_worker_process(tmp_path):
+    file_path = tmp_path / "sample.txt"
+    file_path.write_text("hello from a worker\n")
+    pool = extract_text.ExtractionPool(workers=1, timeout=60, max_tasks_per_worker=1)
+    try:
+        async def run():
+            text = await pool.run(extract_text._worker_call, extract_text_from_file, file_path)
+            # max_tasks_per_worker=1: the second call gets a fresh worker
+            pids = [await pool.run(os.getpid) for _ in range(2)]
+            return text, pids
+
+        text, pids = asyncio.run(run())
+    finally:
+        pool.shutdown()
+    assert text == (None, "hello from a worker")
+    assert os.getpid() not in pids
+    assert pids[0] != pids[1]
+
+
+def test_extract_text_async_maps_worker_http_errors(monkeypatch, tmp_path):
+    monkeypatch.setattr(extract_text, "extraction_pool", extract_text.ExtractionPool(0, 60, 0))
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(extract_text.extract_text_async(tmp_path / "cv.odt"))
+    assert exc.value.status_code == 400
+
+
+def test_extraction_timeout_kills_worker_and_pool_recovers():
+    pool = extract_text.ExtractionPool(workers=1, timeout=60, max_tasks_per_worker=0)
+    try:
+        async def run():
+            with pytest.raises(HTTPException) as exc:
+                await pool.run(time.sleep, 30, timeout=1)
+            return exc.value.status_code, await pool.run(len, "abc")
+
+        status_code, result = asyncio.run(run())
+    finally:
+        pool.shutdown()
+    assert status_code == 422
+    assert result == 3
+
+
+def test_extraction_timeout_only_kills_its_own_worker():
+    pool = extract_text.ExtractionPool(workers=2, timeout=60, max_tasks_per_worker=0)
+    try:
+        async def run():
+            # The second worker is busy when the first one times out
+            return await asyncio.gather(
+                pool.run(time.sleep, 30, timeout=2),
+                pool.run(_sleep_then_return, 4, "done"),
+                return_exceptions=True,
+            )
+
+        stuck, other = asyncio.run(run())
+    finally:
+        pool.shutdown()
+    assert isinstance(stuck, HTTPException) and stuck.status_code == 422
+    assert other == "done"
+
+
+def test_deadline_is_shared_by_the_calls_of_a_document():
+    pool = extract_text.ExtractionPool(workers=0, timeout=60, max_tasks_per_worker=0)
+    deadline = extract_text.Deadline(1.0)
+    try:
+        async def run():
+            await pool.run(time.sleep, 0.6, deadline=deadline)
+            # Within 1s on its own, but not together with the first call
+            with pytest.raises(HTTPException) as exc:
+                await pool.run(time.sleep, 0.6, deadline=deadline)
+            return exc.value.status_code
+
+        assert asyncio.run(run()) == 422
+    finally:
+        pool.shutdown()
+
+
+def _sleep_then_return(seconds, value):
+    time.sleep(seconds)
+    return value
+
+
+def _pdf(path, pages):
+    fitz = pytest.importorskip("fitz")
+    document = fitz.open()
+    for text in pages:
+        document.new_page().insert_text((72, 72), text)
+    document.save(path)
+    document.close()
+    return path
+
+
+def _whole_document_text(path, pages=None):
+    """What the whole-document PyMuPDF extractor returned: each page's text followed by a newline."""
+    import fitz
+
+    with fitz.open(path) as pdf:
+        return "".join(page.get_text("text") + "\n" for page in list(pdf)[:pages]).strip()
+
+
+def test_pdf_page_cap(tmp_path):
+    file_path = _pdf(tmp_path / "long.pdf", [f"page {i}" for i in range(5)])
+    assert extract_text_from_file(file_path, max_pages=2) == _whole_document_text(file_path, 2)
+    assert extract_text_from_file(file_path, max_pages=0) == _whole_document_text(file_path)
+
+
+def test_pdf_without_pages_is_not_a_failed_open(monkeypatch, tmp_path):
+    def pdfplumber_open(path):
+        raise AssertionError("pdfplumber must not be used for a PDF that opened")
+
+    monkeypatch.setattr(extract_text, "fitz", object())
+    monkeypatch.setattr(extract_text, "_pdf_page_texts_pymupdf", lambda path, start, stop: ([], 0))
+    monkeypatch.setattr(extract_text, "pdfplumber", type("pdfplumber", (), {"open": staticmethod(pdfplumber_open)}))
+
+    assert extract_text.extract_pdf_pages(tmp_path / "empty.pdf") == ([], 0)
+    assert extract_text_from_file(tmp_path / "empty.pdf") == ""
+
+
+def test_page_cap_only_applies_when_asked_and_is_logged(monkeypatch, tmp_path, caplog):
+    file_path = _pdf(tmp_path / "long.pdf", [f"page {i}" for i in range(5)])
+    monkeypatch.setattr(extract_text, "extraction_pool", extract_text.ExtractionPool(0, 60, 0))
+    monkeypatch.setattr(extract_text.settings, "PDF_PAGES_PER_TASK", 2)
+    monkeypatch.setattr(extract_text.settings, "PDF_MAX_PAGES", 1)
+
+    with caplog.at_level("INFO", logger=extract_text.__name__):
+        # PDF_MAX_PAGES is for the CV routes to pass; the default reads everything
+        assert asyncio.run(extract_text.extract_text_async(file_path)).count("page") == 5
+        assert not caplog.records
+        assert asyncio.run(extract_text.extract_text_async(file_path, max_pages=3)) == _whole_document_text(file_path, 3)
+    assert "first 3 of 5 pages of long.pdf" in caplog.text
+
+
+def test_pdfplumber_fallback_only_reads_empty_pages(monkeypatch, tmp_path):
+    if extract_text.pdfplumber is None:
+        pytest.skip("pdfplumber not available in this environment")
+    file_path = tmp_path / "scanned.pdf"
+    file_path.write_bytes(b"%PDF-1.4")
+
+    class Page:
+        def __init__(self, text):
+            self.text = text
+
+        def extract_text(self):
+            if self.text is None:
+                raise AssertionError("page already extracted by PyMuPDF")
+            return self.text
+
+    class DummyPdf:
+        pages = [Page(None), Page("scanned page"), Page(None)]
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, exc_type, exc, tb):
+            return False
+
+    monkeypatch.setattr(extract_text, "fitz", object())
+    monkeypatch.setattr(extract_text, "_pdf_page_texts_pymupdf", lambda path, start, stop: (["page one", " \n", "page three"], 3))
+    monkeypatch.setattr("app.utils.extract_text.pdfplumber.open", lambda _: DummyPdf())
+
+    assert extract_text_from_file(file_path) == "page one\nscanned page\npage three"
+
+
+def test_extract_text_async_splits_pdf_into_page_ranges(monkeypatch, tmp_path):
+    file_path = _pdf(tmp_path / "long.pdf", [f"page {i}" for i in range(5)])
+    monkeypatch.setattr(extract_text, "extraction_pool", extract_text.ExtractionPool(0, 60, 0))
+    monkeypatch.setattr(extract_text.settings, "PDF_PAGES_PER_TASK", 2)
+    ranges = []
+    extract_pdf_pages = extract_text.extract_pdf_pages
+
+    def recording(path, start, stop):
+        ranges.append((start, stop))
+        return extract_pdf_pages(path, start, stop)
+
+    monkeypatch.setattr(extract_text, "extract_pdf_pages", recording)
+
+    text = asyncio.run(extract_text.extract_text_async(file_path))
+    assert text == _whole_document_text(file_path)
+    assert sorted(ranges) == [(0, 2), (2, 4), (4, 5)]
@@ -0,0 +1,68 @@
+import asyncio
+import json
+import random
+
+import httpx
+import pytest
+
+from app.bench.fake_ollama import CANNED_CV, FakeOllama, parse_latency, tokenize
+from app.config import settings
+from app.services import llm_client, ner_service
+from app.services.llm_client import LLMError
+from app.services.ollama_client import build_tailored_cv_messages
+
+
+def test_parse_latency_specs():
+    rng = random.Random(0)
+    assert parse_latency("fixed:0.25")(rng) == 0.25
+    assert 1.0 <= parse_latency("uniform:1:2")(rng) <= 2.0
+    assert parse_latency("normal:0:5")(rng) >= 0.0
+    assert parse_latency("lognormal:1:0.5")(rng) > 0.0
+    with pytest.raises(ValueError):
+        parse_latency("lognormal:1")
+    with pytest.raises(ValueError):
+        parse_latency("gamma:1:2")
+
+
+def test_tokenize_round_trips():
+    assert "".join(tokenize(CANNED_CV)) == CANNED_CV
+
+
+def test_ner_reply_has_exactly_the_requested_types(fake_ollama):
+    messages = [{"role": "system", "content": ner_service.RESIDUAL_NER_SYSTEM_PROMPT}, {"role": "user", "content": "cv"}]
+    reply = json.loads(asyncio.run(llm_client.chat(messages, format="json")))
+    assert list(reply) == ner_service.RESIDUAL_ENTITY_TYPES
+
+
+def test_llm_ner_runs_end_to_end_against_the_fake(fake_ollama, monkeypatch):
+    monkeypatch.setattr(settings, "NER_CACHE_ENABLED", False)
+    entities = asyncio.run(ner_service.extract_entities("Jane Doe, backend developer", mode="llm"))
+    assert entities["TECHNOLOGIES"] == ["Python", "FastAPI", "MongoDB", "Docker"]
+    assert fake_ollama.requests == 1
+
+
+def test_streaming_and_non_streaming_return_the_same_cv(fake_ollama):
+    messages = build_tailored_cv_messages("cv", "job")
+
+    async def stream():
+        return [chunk async for chunk in llm_client.stream_chat(messages)]
+
+    chunks = asyncio.run(stream())
+    assert len(chunks) > 1
+    assert "".join(chunks) == CANNED_CV == asyncio.run(llm_client.chat(messages))
+
+
+def test_injected_errors_surface_as_upstream_failures(fake_ollama):
+    fake_ollama.config.error_rate = 1.0
+    with pytest.raises(LLMError) as exc:
+        asyncio.run(llm_client.chat([{"role": "user", "content": "hi"}]))
+    assert exc.value.status_code == 502
+    assert fake_ollama.errors == 1
+
+
+def test_serve_on_a_real_port():
+    fake = FakeOllama()
+    with fake.serve() as base_url:
+        response = httpx.post(f"{base_url}/api/chat", json={"messages": [], "stream": False})
+    assert response.status_code == 200
+    assert response.json()["message"]["content"] == CANNED_CV
@@ -0,0 +1,198 @@
+import asyncio
+
+import pytest
+
+from app.services import generation_service
+
+
+class FakeTailoredCollection:
+    def __init__(self):
+        self.docs = {}
+
+    async def update_one(self, query, update, upsert=False):
+        doc = self.docs.setdefault(f"tailored_{query['cv_id']}_{query['job_id']}", {})
+        doc.update(update["$set"])
+
+    async def find_one(self, query, sort=None):
+        matches = [d for d in self.docs.values() if d.get("generation_key") == query["generation_key"]]
+        return matches[-1] if matches else None
+
+
+@pytest.fixture
+def generation(monkeypatch, tmp_path):
+    calls = []
+
+    async def generate_tailored_cv(cv_text, job_text, priority=None):
+        calls.append((cv_text, job_text, priority))
+        await asyncio.sleep(0.01)
+        return f"tailored {cv_text} for {job_text}"
+
+    def create_docx(content, output_path, job_title):
+        output_path.write_text(content)
+
+    collection = FakeTailoredCollection()
+    monkeypatch.setattr(generation_service, "tailored_cvs_collection", collection)
+    monkeypatch.setattr(generation_service, "generate_tailored_cv", generate_tailored_cv)
+    monkeypatch.setattr(generation_service, "create_docx", create_docx)
+    monkeypatch.setattr(generation_service, "GENERATED_DIR", tmp_path)
+    return calls, collection
+
+
+def _inputs(cv_text="cv", job_text="job"):
+    return {"similarity": 0.9, "cv_text": cv_text, "job_text": job_text, "job_title": "Dev"}
+
+
+def test_generation_key_changes_with_texts_model_and_prompt():
+    key = generation_service.generation_key("cv", "job")
+    assert key == generation_service.generation_key("cv", "job")
+    assert key != generation_service.generation_key("cv", "other job")
+    assert key != generation_service.generation_key("cv", "job", model="other-model")
+    assert key != generation_service.generation_key("cv", "job", prompt_version="v2")
+
+
+def test_concurrent_identical_requests_share_one_llm_call(generation):
+    calls, collection = generation
+
+    async def run():
+        return await asyncio.gather(*(
+            generation_service.get_or_generate("cv1", "job1", _inputs()) for _ in range(3)
+        ))
+
+    results = asyncio.run(run())
+    assert len(calls) == 1
+    assert {r["generated_id"] for r in results} == {"tailored_cv1_job1"}
+    assert [r["reused"] for r in results].count(False) == 1
+    assert len(collection.docs) == 1
+    assert generation_service._in_flight == {}
+
+
+def test_repeat_request_reuses_result_unless_forced(generation):
+    calls, _ = generation
+
+    first = asyncio.run(generation_service.get_or_generate("cv1", "job1", _inputs()))
+    again = asyncio.run(generation_service.get_or_generate("cv1", "job1", _inputs()))
+    assert len(calls) == 1
+    assert not first["reused"] and again["reused"]
+    assert again["tailored_text"] == first["tailored_text"]
+
+    forced = asyncio.run(generation_service.get_or_generate("cv1", "job1", _inputs(), force=True))
+    assert len(calls) == 2
+    assert not forced["reused"]
+
+
+def test_identical_texts_for_another_pair_reuse_text_under_their_own_id(generation, tmp_path):
+    calls, collection = generation
+
+    asyncio.run(generation_service.get_or_generate("cv1", "job1", _inputs()))
+    other = asyncio.run(generation_service.get_or_generate("cv2", "job1", _inputs()))
+    assert len(calls) == 1
+    assert other["generated_id"] == "tailored_cv2_job1"
+    assert collection.docs["tailored_cv2_job1"]["cv_id"] == "cv2"
+    assert (tmp_path / "tailored_cv2_job1.docx").exists()
+
+
+def test_failed_generation_reaches_every_waiter_and_is_not_kept(generation, monkeypatch):
+    async def broken(cv_text, job_text, priority=None):
+        await asyncio.sleep(0.01)
+        raise RuntimeError("model crashed")
+
+    monkeypatch.setattr(generation_service, "generate_tailored_cv", broken)
+
+    async def run():
+        return await asyncio.gather(
+            *(generation_service.get_or_generate("cv1", "job1", _inputs()) for _ in range(2)),
+            return_exceptions=True,
+        )
+
+    results = asyncio.run(run())
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert generation_service._in_flight == {}
+
+
+def test_pairs_created_in_the_same_second_get_their_own_record(generation):
+    # ObjectIds made in the same second share their first 8 hex digits (the timestamp)
+    cv_a, cv_b, job = "65f0c2a1" + "0" * 16, "65f0c2a1" + "1" * 16, "65f0c2a1" + "2" * 16
+
+    first = asyncio.run(generation_service.get_or_generate(cv_a, job, _inputs("cv a")))
+    second = asyncio.run(generation_service.get_or_generate(cv_b, job, _inputs("cv b")))
+
+    assert first["generated_id"] != second["generated_id"]
+    _, collection = generation
+    assert {d["cv_id"] for d in collection.docs.values()} == {cv_a, cv_b}
+
+
+@pytest.fixture
+def streaming(generation, monkeypatch):
+    """Fake streamed LLM output; the route skips the match check and the stored-result lookup."""
+    from app.routes import generate_routes
+
+    streams = []
+
+    async def stream_tailored_cv(cv_text, job_text, priority=None):
+        streams.append(cv_text)
+        for chunk in ("tailored ", cv_text):
+            await asyncio.sleep(0.01)
+            yield chunk
+
+    async def load_generation_inputs(cv_id, job_id):
+        return _inputs()
+
+    async def reuse_generated(*args):
+        return None
+
+    monkeypatch.setattr(generation_service, "stream_tailored_cv", stream_tailored_cv)
+    monkeypatch.setattr(generate_routes, "load_generation_inputs", load_generation_inputs)
+    monkeypatch.setattr(generate_routes, "reuse_generated", reuse_generated)
+    return streams
+
+
+def _stream_events(body):
+    import json
+
+    return [json.loads(line) for line in "".join(body).splitlines()]
+
+
+def test_concurrent_identical_streams_share_one_llm_call(generation, streaming):
+    from app.routes import generate_routes
+
+    _, collection = generation
+
+    async def stream():
+        response = await generate_routes.generate_cv_stream(cv_id="cv1", job_id="job1", format="ndjson", force=False)
+        return _stream_events([chunk async for chunk in response.body_iterator])
+
+    async def run():
+        return await asyncio.gather(stream(), stream())
+
+    first, second = asyncio.run(run())
+    assert streaming == ["cv"]
+    assert len(collection.docs) == 1
+    done = [events[-1] for events in (first, second)]
+    assert all(event["event"] == "done" and event["generated_id"] == "tailored_cv1_job1" for event in done)
+    assert sorted(event["reused"] for event in done) == [False, True]
+    # The joining request gets the whole text at once
+    assert "".join(e["content"] for e in second if e["event"] == "token") == "tailored cv"
+    assert generation_service._in_flight == {}
+
+
+def test_closed_stream_keeps_generating_only_for_joined_requests(generation, streaming):
+    _, collection = generation
+
+    async def run():
+        alone = generation_service.StreamingGeneration("cv1", "job1", _inputs(), "alone")
+        await asyncio.sleep(0)
+        alone.close()
+        with pytest.raises(asyncio.CancelledError):
+            await alone.result()
+
+        key = generation_service.generation_key("cv", "job")
+        shared = generation_service.StreamingGeneration("cv1", "job1", _inputs(), key)
+        waiter = asyncio.create_task(generation_service.get_or_generate("cv1", "job1", _inputs(), force=True))
+        await asyncio.sleep(0)
+        shared.close()
+        return await waiter
+
+    result = asyncio.run(run())
+    assert result["tailored_text"] == "tailored cv" and result["reused"]
+    assert list(collection.docs) == ["tailored_cv1_job1"]
+    assert generation_service._in_flight == {}
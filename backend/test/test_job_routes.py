@@ -0,0 +1,42 @@
+import asyncio
+
+from bson import ObjectId
+
+from app.routes import job_routes
+
+
+class FakeJobs:
+    def __init__(self):
+        self.docs = []
+
+    async def insert_one(self, doc):
+        doc["_id"] = ObjectId()
+        self.docs.append(doc)
+        return type("InsertOneResult", (), {"inserted_id": doc["_id"]})()
+
+
+class BrokenIndex:
+    async def add_many(self, doc_ids, vectors):
+        raise RuntimeError("index unavailable")
+
+
+def test_upload_succeeds_when_the_index_update_fails(monkeypatch):
+    async def build_embedding(text):
+        return {"vector": [1.0, 0.0]}
+
+    async def schedule_entity_extraction(task_type, job_id, text, mode):
+        return "task-1"
+
+    jobs = FakeJobs()
+    monkeypatch.setattr(job_routes, "jobs_collection", jobs)
+    monkeypatch.setattr(job_routes, "job_index", BrokenIndex())
+    monkeypatch.setattr(job_routes, "build_embedding", build_embedding)
+    monkeypatch.setattr(job_routes, "schedule_entity_extraction", schedule_entity_extraction)
+
+    response = asyncio.run(job_routes.upload_job(
+        title="Dev", description=None, file=None, text="Python developer", ner_mode=None, current_user=None
+    ))
+
+    # Saved and reported: the next index refresh picks the job up
+    assert response["job_id"] == str(jobs.docs[0]["_id"])
+    assert response["task_id"] == "task-1"
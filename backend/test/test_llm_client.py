@@ -0,0 +1,98 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from app.services import llm_client
+from app.services.llm_client import LLMError
+
+
+def _response(status_code=200, **kwargs):
+    return httpx.Response(status_code, request=httpx.Request("POST", llm_client.OLLAMA_CHAT_ENDPOINT), **kwargs)
+
+
+def test_parse_chat_response_direct_json():
+    response = _response(json={"message": {"content": '{"ok": true}'}})
+    assert llm_client.parse_chat_response(response) == '{"ok": true}'
+
+
+def test_parse_chat_response_line_fallback():
+    text = '{"message": {"content": "partial"}}\nnot json\n{"response": "value"}'
+    assert llm_client.parse_chat_response(_response(text=text)) == "value"
+
+
+def test_parse_chat_response_error_status():
+    with pytest.raises(LLMError) as exc:
+        llm_client.parse_chat_response(_response(500, json={"error": "boom"}))
+    assert "boom" in str(exc.value)
+    assert exc.value.status_code == 502
+
+
+def test_parse_chat_response_empty_content():
+    with pytest.raises(LLMError):
+        llm_client.parse_chat_response(_response(json={"message": {"content": ""}}))
+
+
+def test_chat_uses_pooled_client_and_maps_timeouts(monkeypatch):
+    payloads = []
+
+    def handler(request):
+        payloads.append(request.content)
+        if b"slow" in request.content:
+            raise httpx.ReadTimeout("timed out", request=request)
+        return httpx.Response(200, json={"message": {"content": "hello"}})
+
+    async def run():
+        monkeypatch.setattr(llm_client, "_client", httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+        try:
+            reply = await llm_client.chat([{"role": "user", "content": "hi"}])
+            with pytest.raises(LLMError) as exc:
+                await llm_client.chat([{"role": "user", "content": "slow"}], timeout=1)
+            return reply, exc.value.status_code
+        finally:
+            await llm_client.close()
+
+    reply, status = asyncio.run(run())
+    assert reply == "hello"
+    assert status == 504
+    assert len(payloads) == 2
+    assert llm_client._client is None
+
+
+def test_stream_chat_yields_chunks_until_done(monkeypatch):
+    lines = [
+        {"message": {"content": "## Profile"}, "done": False},
+        {"message": {"content": "\nPython"}, "done": False},
+        {"message": {"content": ""}, "done": True},
+    ]
+    body = "\n".join(json.dumps(line) for line in lines) + "\n"
+
+    def handler(request):
+        assert json.loads(request.content)["stream"] is True
+        return httpx.Response(200, text=body)
+
+    async def run():
+        monkeypatch.setattr(llm_client, "_client", httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+        try:
+            return [chunk async for chunk in llm_client.stream_chat([{"role": "user", "content": "hi"}])]
+        finally:
+            await llm_client.close()
+
+    assert asyncio.run(run()) == ["## Profile", "\nPython"]
+
+
+def test_stream_chat_raises_on_error_status(monkeypatch):
+    def handler(request):
+        return httpx.Response(404, json={"error": "model 'x' not found"})
+
+    async def run():
+        monkeypatch.setattr(llm_client, "_client", httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+        try:
+            async for _ in llm_client.stream_chat([{"role": "user", "content": "hi"}]):
+                pass
+        finally:
+            await llm_client.close()
+
+    with pytest.raises(LLMError, match="not found"):
+        asyncio.run(run())
@@ -0,0 +1,169 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app.services import llm_client
+from app.services.llm_client import LLMError
+from app.services.llm_scheduler import BATCH, INTERACTIVE, NER, LLMScheduler, SchedulerFull
+
+
+def _scheduler(max_concurrency=1, limit=4):
+    return LLMScheduler(max_concurrency, {INTERACTIVE: limit, NER: limit, BATCH: limit})
+
+
+def test_free_slots_go_to_the_most_urgent_class_first():
+    scheduler = _scheduler()
+    order = []
+
+    async def call(name, priority):
+        async with scheduler.slot(priority):
+            order.append(name)
+            await asyncio.sleep(0)
+
+    async def run():
+        async with scheduler.slot(BATCH):
+            tasks = [
+                asyncio.create_task(call("batch", BATCH)),
+                asyncio.create_task(call("ner-1", NER)),
+                asyncio.create_task(call("interactive", INTERACTIVE)),
+                asyncio.create_task(call("ner-2", NER)),
+            ]
+            await asyncio.sleep(0)
+            assert scheduler.queue_depth(NER) == 2
+        await asyncio.gather(*tasks)
+
+    asyncio.run(run())
+    assert order == ["interactive", "ner-1", "ner-2", "batch"]
+
+
+def test_concurrency_never_exceeds_the_cap():
+    scheduler = _scheduler(max_concurrency=2, limit=16)
+    running, peak = 0, 0
+
+    async def call():
+        nonlocal running, peak
+        async with scheduler.slot(NER):
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.001)
+            running -= 1
+
+    async def run():
+        await asyncio.gather(*(call() for _ in range(10)))
+
+    asyncio.run(run())
+    assert peak == 2
+    assert scheduler._running == 0
+
+
+def test_full_queue_is_rejected_with_retry_after():
+    scheduler = _scheduler(limit=1)
+
+    async def run():
+        async with scheduler.slot(INTERACTIVE):
+            waiter = asyncio.create_task(scheduler.slot(BATCH).__aenter__())
+            await asyncio.sleep(0)
+            with pytest.raises(SchedulerFull) as exc:
+                async with scheduler.slot(BATCH):
+                    pass
+            waiter.cancel()
+            await asyncio.gather(waiter, return_exceptions=True)
+            return exc.value
+
+    error = asyncio.run(run())
+    assert error.priority == BATCH
+    assert error.retry_after >= 1
+
+
+def test_cancelled_waiter_leaves_the_queue():
+    scheduler = _scheduler()
+
+    async def run():
+        async with scheduler.slot(INTERACTIVE):
+            waiter = asyncio.create_task(scheduler.slot(NER).__aenter__())
+            await asyncio.sleep(0)
+            waiter.cancel()
+            await asyncio.gather(waiter, return_exceptions=True)
+            assert scheduler.queue_depth(NER) == 0
+        async with scheduler.slot(NER):
+            pass
+
+    asyncio.run(run())
+    assert scheduler._running == 0
+    assert scheduler._waiters == []
+
+
+def test_unknown_priority_is_refused():
+    async def run():
+        async with _scheduler().slot("urgent"):
+            pass
+
+    with pytest.raises(ValueError):
+        asyncio.run(run())
+
+
+def test_chat_maps_a_full_queue_to_429(monkeypatch):
+    scheduler = _scheduler(limit=0)
+    monkeypatch.setattr(llm_client, "scheduler", scheduler)
+    monkeypatch.setattr(llm_client, "_client", httpx.AsyncClient(
+        transport=httpx.MockTransport(lambda request: httpx.Response(200, json={"message": {"content": "ok"}}))
+    ))
+
+    async def run():
+        async with scheduler.slot(INTERACTIVE):
+            await llm_client.chat([{"role": "user", "content": "hi"}], priority=BATCH)
+
+    with pytest.raises(LLMError) as exc:
+        asyncio.run(run())
+    assert exc.value.status_code == 429
+    assert exc.value.headers == {"Retry-After": str(exc.value.retry_after)}
+
+
+def test_check_refuses_only_when_a_call_would_be_rejected():
+    scheduler = _scheduler(max_concurrency=1, limit=1)
+
+    async def run():
+        scheduler.check(NER)  # free slot
+        async with scheduler.slot(BATCH):
+            scheduler.check(NER)  # busy, but room in the queue
+            waiter = asyncio.create_task(_hold(scheduler, NER))
+            await asyncio.sleep(0)
+            with pytest.raises(SchedulerFull) as exc:
+                scheduler.check(NER)
+            scheduler.check(INTERACTIVE)  # other classes have their own queue
+        await waiter
+        return exc.value
+
+    assert asyncio.run(run()).retry_after >= 1
+
+
+async def _hold(scheduler, priority):
+    async with scheduler.slot(priority):
+        await asyncio.sleep(0)
+
+
+def test_stream_route_answers_429_before_streaming(monkeypatch):
+    from fastapi import HTTPException
+
+    from app.routes import generate_routes
+
+    async def load_generation_inputs(cv_id, job_id):
+        return {"similarity": 0.9, "cv_text": "cv", "job_text": "job", "job_title": "Dev"}
+
+    async def reuse_generated(*args):
+        return None
+
+    full = _scheduler(max_concurrency=1, limit=0)
+    monkeypatch.setattr(generate_routes, "load_generation_inputs", load_generation_inputs)
+    monkeypatch.setattr(generate_routes, "reuse_generated", reuse_generated)
+    monkeypatch.setattr(generate_routes, "scheduler", full)
+
+    async def run():
+        async with full.slot(BATCH):
+            await generate_routes.generate_cv_stream(cv_id="cv", job_id="job", format="sse", force=False)
+
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(run())
+    assert exc.value.status_code == 429
+    assert int(exc.value.headers["Retry-After"]) >= 1
@@ -0,0 +1,39 @@
+from app.services.local_ner import extract_contacts, extract_dates, extract_gazetteer_entities, extract_local_entities
+
+
+def test_gazetteer_returns_canonical_names_on_word_boundaries():
+    entities = extract_gazetteer_entities("Built APIs in python, ReactJS and React Native; JavaScript not Java-less. C++ and C#.")
+    assert entities["TECHNOLOGIES"][:5] == ["Python", "React", "React Native", "JavaScript", "Java"]
+    assert "C++" in entities["TECHNOLOGIES"] and "C#" in entities["TECHNOLOGIES"]
+
+
+def test_gazetteer_short_acronyms_are_case_sensitive():
+    assert "Artificial Intelligence" in extract_gazetteer_entities("Expert AI et ML")["SKILLS"]
+    assert extract_gazetteer_entities("j'ai une voiture")["SKILLS"] == []
+
+
+def test_extract_dates_prefers_ranges():
+    dates = extract_dates("Jan 2020 - Present at ACME; 09/2017 – 12/2019; Master (2016)")
+    assert dates == ["Jan 2020 - Present", "09/2017 – 12/2019", "2016"]
+
+
+def test_extract_contacts():
+    contacts = extract_contacts("alice@example.com | +33 6 12 34 56 78 | linkedin.com/in/alice | 2018 - 2021")
+    assert contacts == ["alice@example.com", "linkedin.com/in/alice", "+33 6 12 34 56 78"]
+
+
+def test_extract_local_entities_types():
+    entities = extract_local_entities("Docker and Scrum since 2019, bob@example.org")
+    assert entities == {
+        "TECHNOLOGIES": ["Docker"],
+        "SKILLS": ["Scrum"],
+        "DATE": ["2019"],
+        "CONTACT": ["bob@example.org"],
+    }
+
+
+def test_gazetteer_ignores_technology_names_used_as_english_words():
+    text = "I excel at teamwork and will express ideas. The rest of the team joined in Spring 2021"
+    assert extract_gazetteer_entities(text)["TECHNOLOGIES"] == []
+    entities = extract_gazetteer_entities("Node, Express and REST APIs; Spring Boot and Spring; Excel, Spark on Oracle")
+    assert entities["TECHNOLOGIES"] == ["Node.js", "Express", "REST API", "Spring Boot", "Spring", "Excel", "Spark", "Oracle"]
@@ -0,0 +1,37 @@
+import pytest
+
+from app.utils import metrics
+
+
+def test_counter_and_gauge_are_registered_once():
+    c = metrics.counter("test_requests_total", "Requests")
+    assert metrics.counter("test_requests_total") is c
+    c.inc()
+    c.inc(2)
+
+    g = metrics.gauge("test_queue_depth")
+    g.inc()
+    g.inc()
+    g.dec()
+
+    snap = metrics.snapshot()
+    assert snap["test_requests_total"]["value"] == 3
+    assert snap["test_queue_depth"]["value"] == 1
+
+
+def test_metric_type_conflict_raises():
+    metrics.counter("test_conflict")
+    with pytest.raises(TypeError):
+        metrics.gauge("test_conflict")
+
+
+def test_histogram_percentiles():
+    h = metrics.histogram("test_latency_seconds")
+    for value in range(1, 101):
+        h.observe(value / 100)
+
+    snap = h.snapshot()
+    assert snap["count"] == 100
+    assert snap["max"] == 1.0
+    assert snap["p50"] == pytest.approx(0.51)
+    assert snap["p99"] == pytest.approx(1.0)
@@ -1,45 +1,11 @@
+import asyncio
 import json
 
 import pytest
-import requests
 from fastapi import HTTPException
 
 from app.services import ner_service
-
-
-class DummyResponse:
-    def __init__(self, status_code=200, json_data=None, text=""):
-        self.status_code = status_code
-        self._json_data = json_data
-        self.text = text or ""
-
-    def json(self):
-        if self._json_data is None:
-            raise json.JSONDecodeError("Invalid", self.text, 0)
-        return self._json_data
-
-    def raise_for_status(self):
-        if self.status_code >= 400:
-            raise requests.HTTPError(f"HTTP {self.status_code}")
-
-
-def test_parse_ollama_response_direct_json():
-    response = DummyResponse(json_data={"message": {"content": '{"ok": true}'}})
-    content = ner_service._parse_ollama_response(response)
-    assert content == '{"ok": true}'
-
-
-def test_parse_ollama_response_line_fallback():
-    text = '{"response": "value"}'
-    response = DummyResponse(json_data=None, text=text)
-    content = ner_service._parse_ollama_response(response)
-    assert content == "value"
-
-
-def test_parse_ollama_response_error_status():
-    response = DummyResponse(status_code=500, json_data={"error": "boom"})
-    with pytest.raises(HTTPException):
-        ner_service._parse_ollama_response(response)
+from app.services.llm_client import LLMError
 
 
 def test_clean_json_content_strips_markdown():
@@ -70,11 +36,198 @@ def test_organize_entities_creates_blocks():
     assert structured["EDUCATION_BLOCKS"][0]["school"] == "ACME"
 
 
+def test_build_occurrence_index_is_case_insensitive_and_sorted():
+    index = ner_service.build_occurrence_index("ACME, then Acme again; acme.", ["ACME", "Globex"])
+    assert index == {"ACME": [0, 11, 23]}
+
+
+def test_build_occurrence_index_offsets_survive_case_folding():
+    # 'İ'.lower() is two characters: offsets are taken on the original text
+    text = "İzmir office, then ACME"
+    index = ner_service.build_occurrence_index(text, ["acme"])
+    assert index == {"acme": [text.index("ACME")]}
+
+
+def test_organize_entities_passes_non_string_items_through():
+    experience = {"title": "Engineer", "company": "ACME"}
+    entities = {"EXPERIENCE": [experience, "CTO"], "ORGANIZATION": ["ACME", {"name": "Globex"}], "DATE": [], "LOCATION": []}
+    structured = ner_service.organize_entities(entities, "CTO at ACME")
+    assert structured["EXPERIENCE_BLOCKS"] == [
+        {"title": experience, "company": "ACME", "date": "", "location": ""},
+        {"title": "CTO", "company": "ACME", "date": "", "location": ""},
+    ]
+
+
+def test_organize_entities_links_each_title_to_its_nearest_entities():
+    entities = {
+        "EXPERIENCE": ["Data Engineer", "Backend Developer"],
+        "ORGANIZATION": ["Globex", "ACME"],
+        "DATE": ["2019 - 2021", "2021 - 2024"],
+        "LOCATION": ["Lyon", "Paris"],
+        "EDUCATION": ["MSc Computer Science"],
+    }
+    text = (
+        "Backend Developer - ACME, Paris (2021 - 2024)\n"
+        "Built APIs and services.\n\n"
+        "Data Engineer - Globex, Lyon (2019 - 2021)\n"
+        "Ran the data pipelines.\n\n"
+        "Education\nMSc Computer Science, ACME University, Paris, 2019"
+    )
+    structured = ner_service.organize_entities(entities, text)
+    blocks = {b["title"]: b for b in structured["EXPERIENCE_BLOCKS"]}
+    assert blocks["Backend Developer"] == {
+        "title": "Backend Developer", "company": "ACME", "date": "2021 - 2024", "location": "Paris"
+    }
+    assert blocks["Data Engineer"] == {
+        "title": "Data Engineer", "company": "Globex", "date": "2019 - 2021", "location": "Lyon"
+    }
+    assert structured["EDUCATION_BLOCKS"][0]["school"] == "ACME"
+
+
+def test_organize_entities_title_missing_from_text_gets_earliest_entities():
+    entities = {"EXPERIENCE": ["CTO"], "ORGANIZATION": ["Initech", "ACME"], "DATE": [], "LOCATION": []}
+    structured = ner_service.organize_entities(entities, "ACME first, Initech later")
+    assert structured["EXPERIENCE_BLOCKS"] == [{"title": "CTO", "company": "ACME", "date": "", "location": ""}]
+
+
 def test_extract_entities_safe_handles_exceptions(monkeypatch):
-    def boom(_):
+    async def boom(_):
         raise RuntimeError("fail")
 
     monkeypatch.setattr(ner_service, "extract_and_structure_entities", boom)
-    result = ner_service.extract_entities_safe("text")
+    result = asyncio.run(ner_service.extract_entities_safe("text"))
     assert result == {"raw": {}, "structured": {}}
 
+
+
+def test_extract_entities_maps_llm_errors(monkeypatch):
+    async def timeout(*args, **kwargs):
+        raise LLMError("timed out", status_code=504)
+
+    monkeypatch.setattr(ner_service.settings, "NER_CACHE_ENABLED", False)
+    monkeypatch.setattr(ner_service.llm_client, "chat", timeout)
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(ner_service.extract_entities_using_llm("Alice at ACME"))
+    assert exc.value.status_code == 504
+
+
+class FakeCache:
+    def __init__(self):
+        self.docs = {}
+
+    async def find_one(self, query, projection=None):
+        return self.docs.get(query["_id"])
+
+    async def insert_one(self, doc):
+        self.docs[doc["_id"]] = doc
+
+
+def test_extract_entities_uses_cache_keyed_by_prompt_version(monkeypatch):
+    calls = []
+
+    async def chat(messages, timeout=None, priority=None):
+        calls.append(messages)
+        return '{"PERSON": ["Alice"]}'
+
+    monkeypatch.setattr(ner_service, "ner_cache_collection", FakeCache())
+    monkeypatch.setattr(ner_service.llm_client, "chat", chat)
+
+    first = asyncio.run(ner_service.extract_entities_using_llm("Alice at ACME"))
+    second = asyncio.run(ner_service.extract_entities_using_llm("Alice at ACME"))
+    assert first == second and first["PERSON"] == ["Alice"]
+    assert len(calls) == 1
+
+    monkeypatch.setattr(ner_service, "NER_PROMPT_VERSION", "edited-prompt")
+    asyncio.run(ner_service.extract_entities_using_llm("Alice at ACME"))
+    assert len(calls) == 2
+
+
+def test_ner_cache_key_depends_on_text_model_and_prompt():
+    base = ner_service.ner_cache_key("text")
+    assert base == ner_service.ner_cache_key("text")
+    assert base != ner_service.ner_cache_key("text ")
+    assert base != ner_service.ner_cache_key("text", model="other-model")
+    assert base != ner_service.ner_cache_key("text", prompt_version="v2")
+
+
+def test_default_mode_is_llm_only(monkeypatch):
+    from app.config import Settings
+
+    prompts = []
+
+    async def chat(messages, timeout=None, priority=None):
+        prompts.append(messages[0]["content"])
+        return '{"PERSON": ["Alice"]}'
+
+    # The local tier is opt-in: existing deployments keep LLM-only extraction
+    assert Settings.model_fields["NER_MODE"].default == "llm"
+    monkeypatch.setattr(ner_service.settings, "NER_MODE", "llm")
+    monkeypatch.setattr(ner_service.settings, "NER_CACHE_ENABLED", False)
+    monkeypatch.setattr(ner_service.llm_client, "chat", chat)
+    entities = asyncio.run(ner_service.extract_entities("Alice, Python developer"))
+    assert prompts == [ner_service.NER_SYSTEM_PROMPT]
+    assert entities["PERSON"] == ["Alice"]
+
+
+def test_extract_entities_fast_mode_skips_llm(monkeypatch):
+    async def chat(*args, **kwargs):
+        raise AssertionError("LLM must not be called in fast mode")
+
+    monkeypatch.setattr(ner_service.llm_client, "chat", chat)
+    entities = asyncio.run(ner_service.extract_entities("Alice, Python developer since 2019", mode="fast"))
+    assert entities["TECHNOLOGIES"] == ["Python"]
+    assert entities["DATE"] == ["2019"]
+    assert entities["PERSON"] == []
+
+
+def test_extract_entities_hybrid_mode_asks_llm_for_residual_types(monkeypatch):
+    prompts = []
+
+    async def chat(messages, timeout=None, priority=None):
+        prompts.append(messages[0]["content"])
+        return '{"PERSON": ["Alice"], "TECHNOLOGIES": ["Cobol"]}'
+
+    monkeypatch.setattr(ner_service.settings, "NER_CACHE_ENABLED", False)
+    monkeypatch.setattr(ner_service.llm_client, "chat", chat)
+    entities = asyncio.run(ner_service.extract_entities("Alice, Python developer", mode="hybrid"))
+    assert prompts == [ner_service.RESIDUAL_NER_SYSTEM_PROMPT]
+    assert "TECHNOLOGIES" not in prompts[0]
+    assert entities["PERSON"] == ["Alice"]
+    assert entities["TECHNOLOGIES"] == ["Python"]
+
+
+def test_merge_entities_dedupes_case_insensitively():
+    merged = ner_service.merge_entities([
+        {"ORGANIZATION": ["ACME Corp", "Globex"], "SKILLS": ["Python"]},
+        {"ORGANIZATION": ["acme  corp.", "Initech"], "SKILLS": [" python "]},
+    ])
+    assert merged["ORGANIZATION"] == ["ACME Corp", "Globex", "Initech"]
+    assert merged["SKILLS"] == ["Python"]
+    assert merged["PERSON"] == []
+
+
+def test_long_text_is_extracted_in_parallel_chunks(monkeypatch):
+    running, peak, prompts = 0, 0, []
+
+    async def chat(messages, timeout=None, priority=None):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        chunk = messages[1]["content"]
+        prompts.append(chunk)
+        org = "ACME" if "ACME" in chunk else "Globex"
+        return json.dumps({"ORGANIZATION": [org, "acme"]})
+
+    monkeypatch.setattr(ner_service.settings, "NER_CACHE_ENABLED", False)
+    monkeypatch.setattr(ner_service.settings, "NER_CHUNK_CHARS", 120)
+    monkeypatch.setattr(ner_service.settings, "NER_CHUNK_CONCURRENCY", 2)
+    monkeypatch.setattr(ner_service.llm_client, "chat", chat)
+
+    text = "\n\n".join(f"## Experience {i}\nEngineer at {'ACME' if i == 0 else 'Globex'} " + "x" * 80 for i in range(5))
+    entities = asyncio.run(ner_service.extract_entities_using_llm(text))
+
+    assert len(prompts) == 5
+    assert peak == 2
+    assert entities["ORGANIZATION"] == ["ACME", "Globex"]
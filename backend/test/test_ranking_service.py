@@ -0,0 +1,162 @@
+import asyncio
+
+import numpy as np
+import pytest
+from bson import ObjectId
+
+from app.services import ranking_service
+from app.services.similarity_service import embedding_signature
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self._docs = docs
+
+    def batch_size(self, _):
+        return self
+
+    def sort(self, *_):
+        return self
+
+    def __aiter__(self):
+        self._iter = iter(self._docs)
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._iter)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+class FakeCollection:
+    name = "jobs"
+
+    def __init__(self, docs):
+        self.docs = docs
+
+    def find(self, query, projection):
+        if "_id" in query:
+            ids = set(query["_id"]["$in"])
+            return FakeCursor([doc for doc in self.docs if doc["_id"] in ids])
+        return FakeCursor(self.docs)
+
+    async def estimated_document_count(self):
+        return len(self.docs)
+
+
+def _collection(vectors):
+    docs = [
+        {"_id": ObjectId(), "embedding": {"signature": embedding_signature(), "vector": v.tolist()}}
+        for v in vectors
+    ]
+    return FakeCollection(docs), docs
+
+
+def test_cursor_roundtrip_and_validation():
+    cursor = ranking_service.encode_cursor(0.75, "abc")
+    assert ranking_service.decode_cursor(cursor) == (0.75, "abc")
+    with pytest.raises(ValueError):
+        ranking_service.decode_cursor("not-a-cursor")
+
+
+def test_rank_collection_pages_cover_every_document_once():
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(23, 4)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    vectors[5] = vectors[6]  # tied scores must not be skipped or duplicated
+    collection, docs = _collection(vectors)
+    query = vectors[0]
+
+    async def run():
+        seen, cursor = [], None
+        while True:
+            page, cursor = await ranking_service.rank_collection(
+                collection, None, query, limit=5, cursor=cursor, batch_size=4
+            )
+            seen.extend(page)
+            if cursor is None:
+                return seen
+
+    seen = asyncio.run(run())
+    expected = sorted(
+        (-float(v @ query), str(doc["_id"])) for v, doc in zip(vectors, docs)
+    )
+    assert [doc_id for doc_id, _ in seen] == [doc_id for _, doc_id in expected]
+    assert seen[0][0] == str(docs[0]["_id"])
+
+
+def test_snapshot_is_compacted_on_the_loop_and_written_from_copies(tmp_path, monkeypatch):
+    index = ranking_service.EmbeddingIndex(FakeCollection([]), None, snapshot_path=tmp_path / "jobs.npz")
+    index._loaded = True
+    vectors = np.eye(4, dtype=np.float32)
+    index.index.add(["a", "b", "c", "d"], vectors)
+    index.index.remove("b")
+    written = {}
+
+    def write_snapshot(path, arrays, **meta):
+        # Runs in a worker thread: the live index must already be compacted
+        # and the arrays must not alias it
+        written["tombstones"] = index.index.tombstones
+        written["aliased"] = np.shares_memory(arrays["vectors"], index.index._vectors)
+        written["ids"] = list(arrays["ids"])
+
+    monkeypatch.setattr(ranking_service, "write_snapshot", write_snapshot)
+    asyncio.run(index.snapshot())
+
+    assert written == {"tombstones": 0, "aliased": False, "ids": ["a", "c", "d"]}
+
+
+def test_snapshot_is_reconciled_with_deletes_made_while_down(tmp_path):
+    vectors = np.eye(3, dtype=np.float32)
+    kept, deleted, added = (
+        {"_id": ObjectId(), "embedding": {"signature": embedding_signature(), "vector": v.tolist()}} for v in vectors
+    )
+    path = tmp_path / "jobs.npz"
+    snapshot = ranking_service.IVFIndex()
+    snapshot.add([str(kept["_id"]), str(deleted["_id"])], vectors[:2])
+    snapshot.save(path, signature=embedding_signature(), last_id=str(deleted["_id"]))
+
+    # One job deleted and one added since the snapshot: same count, so only reconciling catches it
+    index = ranking_service.EmbeddingIndex(FakeCollection([kept, added]), None, snapshot_path=path)
+    asyncio.run(index.refresh())
+
+    assert sorted(index.index.ids()) == sorted([str(kept["_id"]), str(added["_id"])])
+    assert str(deleted["_id"]) not in [doc_id for doc_id, _ in asyncio.run(index.top_k(vectors[1], k=3))]
+
+
+def _job(vector, _id=None):
+    return {"_id": _id or ObjectId(), "embedding": {"signature": embedding_signature(), "vector": vector.tolist()}}
+
+
+def test_job_inserted_with_an_older_id_is_indexed(monkeypatch):
+    monkeypatch.setattr(ranking_service.settings, "ANN_RECONCILE_SECONDS", 3600)
+    vectors = np.eye(3, dtype=np.float32)
+    older_id, newer = ObjectId(), _job(vectors[0])
+    collection = FakeCollection([newer])
+    index = ranking_service.EmbeddingIndex(collection, None)
+    asyncio.run(index.refresh())
+
+    # Another process inserts a job whose ObjectId sorts before the indexed one
+    collection.docs.append(_job(vectors[1], older_id))
+    results = asyncio.run(index.top_k(vectors[1], k=1))
+
+    assert results[0][0] == str(older_id)
+
+
+def test_delete_plus_insert_elsewhere_is_caught_by_periodic_reconcile(monkeypatch):
+    vectors = np.eye(3, dtype=np.float32)
+    kept, deleted, added = (_job(v) for v in vectors)
+    collection = FakeCollection([kept, deleted])
+    index = ranking_service.EmbeddingIndex(collection, None)
+    monkeypatch.setattr(ranking_service.settings, "ANN_RECONCILE_SECONDS", 3600)
+    asyncio.run(index.refresh())
+
+    collection.docs = [kept, added]
+    # Same size: only the count is checked until a reconcile is due
+    asyncio.run(index.refresh())
+    assert str(added["_id"]) not in index.index
+
+    monkeypatch.setattr(ranking_service.settings, "ANN_RECONCILE_SECONDS", 0)
+    asyncio.run(index.refresh())
+    assert sorted(index.index.ids()) == sorted([str(kept["_id"]), str(added["_id"])])
@@ -0,0 +1,267 @@
+import asyncio
+import json
+import subprocess
+import sys
+import types
+from pathlib import Path
+
+import numpy as np
+import pytest
+from fastapi import HTTPException
+
+from app.services import similarity_service
+from app.services.embedding_backends import parity_report
+
+
+class FakeModel:
+    """Deterministic stand-in for the SentenceTransformer encoder."""
+
+    def __init__(self):
+        self.calls = []
+
+    def encode(self, texts, normalize_embeddings=False, **kwargs):
+        self.calls.append(texts)
+        single = isinstance(texts, str)
+        batch = [texts] if single else texts
+        vectors = np.asarray([[len(t) + 1.0, t.count("a") + 1.0, 1.0] for t in batch], dtype=np.float32)
+        if normalize_embeddings:
+            vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors[0] if single else vectors
+
+
+@pytest.fixture
+def fake_model(monkeypatch):
+    model = FakeModel()
+    monkeypatch.setattr(similarity_service, "_model", model)
+    return model
+
+
+def test_preprocess_truncates_and_strips_symbols():
+    text = "Python   developer ★\n" + "x" * 5000
+    processed = similarity_service.preprocess(text)
+    assert processed.startswith("Python developer ")
+    assert "★" not in processed
+    assert len(processed) == 3000
+
+
+def test_document_key_depends_on_text():
+    key = similarity_service.document_key("Python developer")
+    assert key == similarity_service.document_key("Python   developer")
+    assert key != similarity_service.document_key("Java developer")
+
+
+def test_cached_vector_requires_matching_key():
+    document = {"embedding": {"key": similarity_service.document_key("cv text"), "vector": [1.0, 0.0]}}
+    assert similarity_service.cached_vector(document, "cv text").tolist() == [1.0, 0.0]
+    assert similarity_service.cached_vector(document, "edited cv text") is None
+    assert similarity_service.cached_vector({}, "cv text") is None
+
+
+@pytest.mark.parametrize("strategy", ["mean", "max", "attention"])
+def test_pool_embeddings_returns_unit_vector(strategy):
+    vectors = np.array([[1.0, 0.0, 0.0], [0.0, 1.0, 0.0], [0.9, 0.1, 0.0]])
+    pooled = similarity_service.pool_embeddings(vectors, strategy)
+    assert pooled.shape == (3,)
+    assert np.linalg.norm(pooled) == pytest.approx(1.0)
+
+
+def test_attention_pooling_downweights_outlier_chunk():
+    vectors = np.array([[1.0, 0.0], [1.0, 0.0], [0.0, 1.0]])
+    mean = similarity_service.pool_embeddings(vectors, "mean")
+    attention = similarity_service.pool_embeddings(vectors, "attention")
+    assert attention[0] > mean[0]
+
+
+def test_compute_similarity_encodes_in_one_batch(fake_model):
+    score = asyncio.run(similarity_service.compute_similarity("abc", "abc"))
+    assert score == pytest.approx(1.0)
+    assert len(fake_model.calls) == 1
+
+
+def test_encode_async_rejects_when_queue_full(fake_model, monkeypatch):
+    monkeypatch.setattr(similarity_service.settings, "EMBEDDING_QUEUE_SIZE", 0)
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(similarity_service.encode_async("text"))
+    assert exc.value.status_code == 503
+    assert exc.value.headers["Retry-After"]
+
+
+def test_parity_report_identical_vectors_have_no_drift():
+    vectors = np.random.default_rng(0).normal(size=(6, 8))
+    report = parity_report(vectors, vectors.copy())
+    assert report["vector_cosine_min"] == pytest.approx(1.0)
+    assert report["score_drift_max"] == pytest.approx(0.0, abs=1e-6)
+
+
+def test_parity_report_measures_score_drift():
+    rng = np.random.default_rng(1)
+    reference = rng.normal(size=(6, 8))
+    candidate = reference + rng.normal(scale=0.05, size=reference.shape)
+    report = parity_report(reference, candidate)
+    assert 0.9 < report["vector_cosine_mean"] < 1.0
+    assert report["score_drift_max"] > 0
+
+
+def test_import_does_not_load_the_model():
+    # A fresh interpreter: in this one the module is already imported
+    code = (
+        "import sys\n"
+        "from app.services import embedding_backends\n"
+        "def load_backend(*args):\n"
+        "    raise SystemExit('model loaded at import')\n"
+        "embedding_backends.load_backend = load_backend\n"
+        "from app.services import similarity_service\n"
+        "assert similarity_service._model is None\n"
+        "assert similarity_service.model_status()['state'] == 'not_loaded'\n"
+        "assert 'torch' not in sys.modules and 'sentence_transformers' not in sys.modules\n"
+    )
+    result = subprocess.run([sys.executable, "-c", code], cwd=Path(__file__).resolve().parents[1], capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+
+
+@pytest.fixture
+def unloaded_model(monkeypatch):
+    """A model not loaded yet; `load` is what load_backend returns or raises."""
+    monkeypatch.setattr(similarity_service, "_model", None)
+    monkeypatch.setattr(similarity_service, "_model_state", {"state": "not_loaded", "error": None, "load_seconds": None})
+    monkeypatch.setitem(sys.modules, "torch", types.SimpleNamespace(set_num_threads=lambda threads: None))
+    gate = {"load": FakeModel()}
+
+    def load_backend(backend, name, onnx_file):
+        if isinstance(gate["load"], Exception):
+            raise gate["load"]
+        return gate["load"]
+
+    monkeypatch.setattr(similarity_service, "load_backend", load_backend)
+    return gate
+
+
+def _readiness():
+    from app.routes import health_routes
+
+    response = asyncio.run(health_routes.readiness())
+    return response.status_code, json.loads(response.body)
+
+
+def test_readiness_is_503_until_warm_up_finishes(unloaded_model):
+    status_code, body = _readiness()
+    assert status_code == 503
+    assert body["status"] == "not_ready" and body["embedding_model"]["state"] == "not_loaded"
+
+    # Loaded but not warmed up yet
+    similarity_service.get_model()
+    status_code, body = _readiness()
+    assert status_code == 503 and body["embedding_model"]["state"] == "loaded"
+
+    asyncio.run(similarity_service.warm_up_async())
+    status_code, body = _readiness()
+    assert status_code == 200
+    assert body["status"] == "ready" and body["embedding_model"]["state"] == "ready"
+
+
+def test_readiness_reports_a_failed_load(unloaded_model):
+    unloaded_model["load"] = OSError("model files missing")
+
+    asyncio.run(similarity_service.warm_up_async())
+    status_code, body = _readiness()
+
+    assert status_code == 503
+    assert body["embedding_model"]["state"] == "failed"
+    assert body["embedding_model"]["error"] == "model files missing"
+
+
+class FakeSectionCache:
+    def __init__(self):
+        self.docs = {}
+
+    def find(self, query, projection=None):
+        async def gen():
+            for (cv_id, _), doc in list(self.docs.items()):
+                if cv_id == query["cv_id"] and doc["model"] == query["model"]:
+                    yield doc
+        return gen()
+
+    async def update_one(self, query, update, upsert=False):
+        key = (query["cv_id"], query["section"])
+        self.docs[key] = {**query, **update["$set"]}
+
+    async def delete_many(self, query):
+        for key in [k for k in self.docs if k[0] in query["cv_id"]["$in"] and k[1] == query["section"]]:
+            del self.docs[key]
+
+
+class FakeCvs:
+    def __init__(self, *cvs):
+        self.cvs = cvs
+
+    def find(self, query, projection=None):
+        async def gen():
+            for cv in self.cvs:
+                if cv["user_id"] == query["user_id"] and cv.get("from_profile") == query["from_profile"]:
+                    yield cv
+        return gen()
+
+
+@pytest.fixture
+def sections(monkeypatch):
+    """Section cache, encoder calls and the profile text a profile-built CV is rendered from."""
+    cache, encoded, profile = FakeSectionCache(), [], {"text": ""}
+
+    async def encode_texts(texts):
+        encoded.append(list(texts))
+        vectors = [np.asarray([len(t), 1.0], dtype=np.float32) for t in texts]
+        return [v / np.linalg.norm(v) for v in vectors]
+
+    async def get_document_vector(collection, document, text):
+        return np.asarray([1.0, 0.0], dtype=np.float32)
+
+    async def cv_profile_to_text(user_id):
+        return profile["text"]
+
+    monkeypatch.setattr(similarity_service, "section_embeddings_collection", cache)
+    monkeypatch.setattr(similarity_service, "encode_texts", encode_texts)
+    monkeypatch.setattr(similarity_service, "get_document_vector", get_document_vector)
+    monkeypatch.setattr(similarity_service, "cv_profile_to_text", cv_profile_to_text)
+    return cache, encoded, profile
+
+
+def test_section_similarity_scores_each_section(sections):
+    cv = {"_id": "cv1", "user_id": "u1", "raw_text": "Jane Doe\n## Technologies\nPython\n## Education\nMSc"}
+    result = asyncio.run(similarity_service.compute_section_similarity(cv, {"job_text": "job"}))
+
+    assert list(result["sections"]) == ["Profile", "Technologies", "Education"]
+    assert all(0.0 < score <= 1.0 for score in result["sections"].values())
+    assert 0.0 < result["overall"] <= 1.0
+
+
+def test_section_vectors_are_reused_and_only_edited_sections_re_encoded(sections):
+    cache, encoded, profile = sections
+    cv = {"_id": "cv1", "user_id": "u1", "from_profile": True, "raw_text": "stale snapshot"}
+    job = {"job_text": "job"}
+
+    profile["text"] = "Jane\n## Technologies\nPython\n## Education\nMSc"
+    asyncio.run(similarity_service.compute_section_similarity(cv, job))
+    asyncio.run(similarity_service.compute_section_similarity(cv, job))
+    assert len(encoded) == 1 and len(encoded[0]) == 3
+
+    # A profile edit changes the score input without re-creating the CV
+    profile["text"] = "Jane\n## Technologies\nPython, Rust\n## Education\nMSc"
+    asyncio.run(similarity_service.compute_section_similarity(cv, job))
+    assert len(encoded) == 2 and encoded[1] == [similarity_service.preprocess("## Technologies\nPython, Rust")]
+    assert len(cache.docs) == 3
+
+
+def test_invalidation_only_touches_the_users_profile_cvs(sections, monkeypatch):
+    cache, _, _ = sections
+    monkeypatch.setattr(similarity_service, "cvs_collection", FakeCvs(
+        {"_id": "profile-cv", "user_id": "u1", "from_profile": True},
+        {"_id": "uploaded-cv", "user_id": "u1"},
+    ))
+    for cv_id in ("profile-cv", "uploaded-cv", "other-user-cv"):
+        for section in ("Technologies", "Education"):
+            cache.docs[(cv_id, section)] = {"cv_id": cv_id, "section": section}
+
+    asyncio.run(similarity_service.invalidate_section_embeddings("u1", "Technologies"))
+
+    assert ("profile-cv", "Technologies") not in cache.docs
+    assert len(cache.docs) == 5
@@ -0,0 +1,71 @@
+import asyncio
+
+import pytest
+
+from app import worker
+from app.config import settings
+from app.services import task_queue
+
+
+def test_retry_delay_grows_exponentially_and_is_capped(monkeypatch):
+    monkeypatch.setattr(settings, "TASK_RETRY_BASE_DELAY", 2.0)
+    monkeypatch.setattr(settings, "TASK_RETRY_MAX_DELAY", 10.0)
+    monkeypatch.setattr(task_queue.random, "uniform", lambda a, b: 1.0)
+    assert [task_queue.retry_delay(n) for n in (1, 2, 3, 4)] == [2.0, 4.0, 8.0, 10.0]
+
+
+@pytest.fixture
+def recorded(monkeypatch):
+    calls = []
+
+    async def complete(task, worker_id, result):
+        calls.append(("complete", result))
+        return True
+
+    async def fail(task, worker_id, error, retry=True):
+        calls.append(("fail", error, retry))
+        return True
+
+    async def heartbeat(task, worker_id):
+        return True
+
+    monkeypatch.setattr(task_queue, "complete", complete)
+    monkeypatch.setattr(task_queue, "fail", fail)
+    monkeypatch.setattr(task_queue, "heartbeat", heartbeat)
+    return calls
+
+
+def _task(task_type, attempts=1, max_attempts=3):
+    return {"_id": "t1", "type": task_type, "payload": {}, "attempts": attempts, "max_attempts": max_attempts}
+
+
+def test_run_task_completes_with_handler_result(monkeypatch, recorded):
+    async def ok(task):
+        return {"done": True}
+
+    monkeypatch.setitem(task_queue.HANDLERS, "test.ok", ok)
+    asyncio.run(worker.run_task(_task("test.ok"), "w1"))
+    assert recorded == [("complete", {"done": True})]
+
+
+def test_run_task_retries_transient_errors_but_not_permanent_ones(monkeypatch, recorded):
+    async def flaky(task):
+        raise RuntimeError("ollama down")
+
+    async def gone(task):
+        raise task_queue.PermanentTaskError("document deleted")
+
+    monkeypatch.setitem(task_queue.HANDLERS, "test.flaky", flaky)
+    monkeypatch.setitem(task_queue.HANDLERS, "test.gone", gone)
+    asyncio.run(worker.run_task(_task("test.flaky"), "w1"))
+    asyncio.run(worker.run_task(_task("test.gone"), "w1"))
+    assert recorded == [("fail", "ollama down", True), ("fail", "document deleted", False)]
+
+
+def test_run_task_gives_up_when_lease_expired_on_last_attempt(monkeypatch, recorded):
+    async def never(task):
+        raise AssertionError("must not run")
+
+    monkeypatch.setitem(task_queue.HANDLERS, "test.never", never)
+    asyncio.run(worker.run_task(_task("test.never", attempts=4, max_attempts=3), "w1"))
+    assert recorded[0][0] == "fail" and recorded[0][2] is False
@@ -0,0 +1,85 @@
+import asyncio
+import hashlib
+import io
+from pathlib import Path
+
+import pytest
+from fastapi import HTTPException, UploadFile
+
+from app.services import document_dedup
+from app.utils.uploads import content_path, store_upload
+
+
+class CountingFile(io.BytesIO):
+    """In-memory upload that records the size of each read."""
+
+    def __init__(self, data):
+        super().__init__(data)
+        self.reads = []
+
+    def read(self, size=-1):
+        chunk = super().read(size)
+        self.reads.append(len(chunk))
+        return chunk
+
+
+def _files(root):
+    return sorted(p for p in root.rglob("*") if p.is_file())
+
+
+def test_content_path_is_sharded_by_hash():
+    sha = "abcdef" + "0" * 58
+    assert content_path(Path("up"), sha, ".PDF") == Path("up") / "ab" / "cd" / f"{sha}.pdf"
+
+
+def test_store_upload_streams_in_chunks_and_hashes(tmp_path):
+    data = bytes(range(256)) * 100
+    source = CountingFile(data)
+
+    stored = asyncio.run(store_upload(UploadFile(source, filename="cv.pdf"), tmp_path, max_bytes=10**6, chunk_size=4096))
+
+    sha = hashlib.sha256(data).hexdigest()
+    assert stored.sha256 == sha
+    assert stored.size == len(data)
+    assert stored.path == content_path(tmp_path, sha, ".pdf")
+    assert stored.path.read_bytes() == data
+    assert not stored.existed
+    assert max(source.reads) <= 4096
+    assert _files(tmp_path) == [stored.path]
+
+
+def test_identical_uploads_are_stored_once_and_names_never_collide(tmp_path):
+    first = asyncio.run(store_upload(UploadFile(io.BytesIO(b"same"), filename="a.docx"), tmp_path))
+    again = asyncio.run(store_upload(UploadFile(io.BytesIO(b"same"), filename="b.docx"), tmp_path))
+    other = asyncio.run(store_upload(UploadFile(io.BytesIO(b"other"), filename="a.docx"), tmp_path))
+
+    assert again.path == first.path and again.existed
+    assert other.path != first.path
+    assert _files(tmp_path) == sorted([first.path, other.path])
+
+
+def test_store_upload_rejects_oversized_stream_and_cleans_up(tmp_path):
+    upload = UploadFile(io.BytesIO(b"x" * 10_000), filename="big.pdf")
+
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(store_upload(upload, tmp_path, max_bytes=5_000, chunk_size=1024))
+
+    assert exc.value.status_code == 413
+    assert _files(tmp_path) == []
+
+
+def test_store_upload_rejects_known_size_before_reading(tmp_path):
+    source = CountingFile(b"x" * 10_000)
+    upload = UploadFile(source, filename="big.pdf", size=10_000)
+
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(store_upload(upload, tmp_path, max_bytes=5_000))
+
+    assert exc.value.status_code == 413
+    assert source.reads == []
+
+
+def test_has_entities_only_once_extraction_filled_them():
+    assert not document_dedup.has_entities({"entities": {"raw": {}, "structured": {}}})
+    assert not document_dedup.has_entities({})
+    assert document_dedup.has_entities({"entities": {"raw": {"SKILLS": ["Python"]}, "structured": {}}})